@@ -0,0 +1,40 @@
+"""
+Stand-in for the Hilltop data file API.
+
+Each site and measurement has a deterministic synthetic history. `latency` adds a delay
+to every read to mimic a large archive file, and `CALLS` counts the reads made.
+"""
+import time
+import zlib
+
+import numpy as np
+
+CALLS = {"GetData": 0, "PDist": 0}
+latency = 0.0
+points = 500
+
+
+def Connect(path):
+    return {"path": path}
+
+
+def Disconnect(handle):
+    pass
+
+
+def _series(site, measurement):
+    rng = np.random.default_rng(zlib.crc32(f"{site}|{measurement}".encode()))
+    return rng.normal(7.0, 0.6, points)
+
+
+def GetData(handle, site, measurement, start_date, end_date):
+    CALLS["GetData"] += 1
+    time.sleep(latency)
+    return _series(site, measurement)
+
+
+def PDist(handle, site, measurement, start_date, end_date):
+    CALLS["PDist"] += 1
+    time.sleep(latency)
+    series = _series(site, measurement)
+    return np.percentile(series, np.arange(1, 101)), {"Min": series.min(), "Max": series.max()}
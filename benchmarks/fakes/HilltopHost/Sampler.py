@@ -0,0 +1,67 @@
+"""
+Stand-ins for the HilltopHost.Sampler payload and QA check types.
+
+Saved QA checks are collected in `SAVED`.
+"""
+import enum
+
+SAVED = []
+
+
+class QACheckSeverity(enum.IntEnum):
+    OK = 0
+    Information = 1
+    Warning = 2
+    Critical = 3
+
+
+class QACheck:
+    def __init__(self):
+        self.RunID = None
+        self.SampleID = None
+        self.LabTestID = None
+        self.Label = None
+        self.Title = None
+        self.Severity = None
+        self.Details = None
+
+
+class QACheckResult:
+    def __init__(self, value):
+        self.ResultValue = value
+
+
+class QACheckLabTest:
+    def __init__(self, sample_id, lab_test_id, value=None, tests=None, qa_checks=None):
+        self.SampleID = sample_id
+        self.LabTestID = lab_test_id
+        self.Result = None if value is None else QACheckResult(value)
+        self.IsTestSet = tests is not None
+        self.Tests = tests or []
+        self.QAChecks = qa_checks or []
+
+
+class QACheckSample:
+    def __init__(self, sample_id, status_id, sample_time, tests, qa_checks=None):
+        self.SampleID = sample_id
+        self.StatusID = status_id
+        self.SampleTime = sample_time
+        self.Tests = tests
+        self.QAChecks = qa_checks or []
+
+
+class QACheckRun:
+    def __init__(self, run_id, run_name, samples, qa_checks=None):
+        self.RunID = run_id
+        self.RunName = run_name
+        self.Samples = samples
+        self.QAChecks = qa_checks or []
+
+
+class QAChecksPayload:
+    def __init__(self, runs):
+        self.Runs = runs
+
+
+def SaveQACheck(qa_check):
+    SAVED.append(qa_check)
@@ -0,0 +1,41 @@
+"""
+Stand-in for the HilltopHost bridge module that only exists inside the Hilltop host process.
+
+Log messages are collected in `LOG` instead of being written to the Hilltop log.
+"""
+from . import Sampler  # noqa: F401
+
+LOG = []
+echo = False
+
+
+def _log(level, message):
+    LOG.append((level, message))
+    if echo:
+        print(f"{level.upper():<8}{message}")
+
+
+def LogInfo(message):
+    _log("info", message)
+
+
+def LogWarning(message):
+    _log("warning", message)
+
+
+def LogError(message):
+    _log("error", message)
+
+
+class RunStatus:
+    NO_RESULTS_BACK = 1
+    SOME_RESULTS_BACK = 2
+    ALL_RESULTS_BACK = 3
+
+
+class System:
+    config_sections = {}
+
+    @staticmethod
+    def GetConfigSection(name):
+        return System.config_sections.get(name)
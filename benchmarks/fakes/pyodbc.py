@@ -0,0 +1,133 @@
+"""
+Stand-in for pyodbc backed by an in-memory copy of the Sampler tables.
+
+The cursor recognises the plugin's queries by the tables they read and answers them from
+`database`, which the benchmark fills with the synthetic payload's samples and lab tests.
+`latency` adds a delay to every statement to mimic a round trip to SQL Server. Worker processes
+started by the plugin load the database saved by the benchmark from BENCHMARK_DATABASE.
+"""
+import os
+import pickle
+import time
+
+SAMPLE_COLUMNS = (
+    "LabName", "TestName", "MeasurementName", "Units", "Divisor", "TestValue", "SampleID", "SiteID",
+    "SiteName", "RunID", "RunName", "RunDate", "SampleTypeCode", "ProjectID", "ProjectName", "TestID",
+    "LabTestName", "LabMethod", "LabTestID",
+)
+TEST_INFO_COLUMNS = ("SampleID", "TestID", "TestInfo")
+MEASUREMENT_COLUMNS = ("LabTestName", "LabMethod", "LabTestID", "LabName", "TestName", "MeasurementName")
+
+latency = 0.0
+queries = 0
+
+
+class Database:
+    def __init__(self):
+        self.lab_tests = {}  # LabTestID -> MeasurementName
+        self.samples = {}  # SampleID -> (RunID, SiteName, [LabTestID])
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            pickle.dump((self.lab_tests, self.samples), file)
+
+    def load(self, path):
+        with open(path, "rb") as file:
+            self.lab_tests, self.samples = pickle.load(file)
+
+    def measurement_row(self, lab_test_id):
+        return {
+            "LabTestName": f"Lab test {lab_test_id}",
+            "LabMethod": "Method",
+            "LabTestID": lab_test_id,
+            "LabName": "Benchmark Lab",
+            "TestName": f"Test {lab_test_id}",
+            "MeasurementName": self.lab_tests[lab_test_id],
+        }
+
+    def sample_rows(self, sample_id):
+        if sample_id not in self.samples:
+            return []
+        run_id, site, lab_test_ids = self.samples[sample_id]
+        rows = []
+        for lab_test_id in lab_test_ids:
+            row = dict.fromkeys(SAMPLE_COLUMNS)
+            row.update(self.measurement_row(lab_test_id))
+            row.update(SampleID=sample_id, SiteName=site, RunID=run_id, TestID=lab_test_id)
+            rows.append(row)
+        return rows
+
+    def test_info_rows(self, sample_id):
+        if sample_id not in self.samples:
+            return []
+        return [
+            {
+                "SampleID": sample_id,
+                "TestID": lab_test_id,
+                "TestInfo": f'<Test ID="{lab_test_id}"><Parameter Name="Method" Value="A"/></Test>',
+            }
+            for lab_test_id in self.samples[sample_id][2]
+        ]
+
+
+database = Database()
+if os.environ.get("BENCHMARK_DATABASE"):
+    database.load(os.environ["BENCHMARK_DATABASE"])
+
+
+class Connection:
+    def cursor(self):
+        return Cursor()
+
+    def close(self):
+        pass
+
+
+class Cursor:
+    def __init__(self):
+        self.description = []
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def execute(self, query, *params):
+        global queries
+        queries += 1
+        time.sleep(latency)
+        if "@@version" in query:
+            self._set(("Version",), [{"Version": "In-memory benchmark database"}])
+        elif "COUNT_BIG" in query:
+            self._set(("Count", "Checksum"), [{"Count": len(database.lab_tests), "Checksum": 0}])
+        elif "AS TestInfo" in query:
+            self._set(TEST_INFO_COLUMNS, [row for sample_id in params for row in database.test_info_rows(sample_id)])
+        elif "Samples smp" in query:
+            self._set(SAMPLE_COLUMNS, [row for sample_id in params for row in database.sample_rows(sample_id)])
+        elif "LabTests lt" in query:
+            rows = [database.measurement_row(i) for i in params if i in database.lab_tests]
+            self._set(MEASUREMENT_COLUMNS, rows)
+        else:
+            raise NotImplementedError(f"query not supported by the benchmark database: {query}")
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def fetchmany(self, size=1):
+        return self._rows[:size]
+
+    def _set(self, columns, rows):
+        self.description = [(column,) for column in columns]
+        self._rows = [tuple(row[column] for column in columns) for row in rows]
+
+
+def connect(connection_string):
+    return Connection()
@@ -0,0 +1,78 @@
+"""
+Synthetic QAChecksPayload generators for the benchmark.
+
+Requires the stand-in HilltopHost and pyodbc modules in benchmarks/fakes to be importable.
+"""
+from datetime import datetime, timedelta
+import random
+
+import HilltopHost
+import pyodbc
+from HilltopHost.Sampler import QACheckLabTest, QACheckRun, QACheckSample, QAChecksPayload
+
+MEASUREMENTS = (
+    ("pH", lambda rng: f"{rng.gauss(7.0, 0.8):.2f}"),
+    ("Nitrate - Nitrogen", lambda rng: f"{rng.uniform(0, 12):.3f}"),
+    ("Turbidity", lambda rng: f"{rng.uniform(0, 50):.1f}"),
+    ("E. coli", lambda rng: f"{rng.randint(1, 2000)}"),
+    ("Conductivity", lambda rng: f"{rng.uniform(50, 400):.1f}"),
+)
+
+
+def generate_payload(
+    runs: int,
+    samples: int,
+    tests: int,
+    test_sets: int = 0,
+    test_set_size: int = 5,
+    sites: int = 20,
+    blank_fraction: float = 0.05,
+    seed: int = 1,
+) -> QAChecksPayload:
+    """
+    Builds a payload of runs x samples x tests and loads matching rows into the stand-in database.
+
+    Args:
+        runs (int): Number of runs.
+        samples (int): Samples per run.
+        tests (int): Lab tests per sample.
+        test_sets (int): Number of test sets per sample; the last tests of each sample are grouped into them.
+        test_set_size (int): Tests per test set.
+        sites (int): Number of distinct sites the samples are spread across.
+        blank_fraction (float): Fraction of tests with no result yet.
+        seed (int): Random seed, so payloads are repeatable.
+    """
+    rng = random.Random(seed)
+    database = pyodbc.database
+    database.lab_tests.clear()
+    database.samples.clear()
+    for lab_test_id in range(1, tests + 1):
+        database.lab_tests[lab_test_id] = MEASUREMENTS[(lab_test_id - 1) % len(MEASUREMENTS)][0]
+    generators = dict(MEASUREMENTS)
+
+    grouped = min(tests, test_sets * test_set_size)
+    sample_time = (datetime.now() - timedelta(days=10)).isoformat(timespec="seconds")
+    payload_runs = []
+    for r in range(runs):
+        run_id = r + 1
+        payload_samples = []
+        for s in range(samples):
+            sample_id = run_id * 100000 + s
+            site = f"Site {rng.randrange(sites)}"
+            database.samples[sample_id] = (run_id, site, list(range(1, tests + 1)))
+
+            lab_tests = []
+            for lab_test_id in range(1, tests + 1):
+                value = None
+                if rng.random() >= blank_fraction:
+                    value = generators[database.lab_tests[lab_test_id]](rng)
+                lab_tests.append(QACheckLabTest(sample_id, lab_test_id, "" if value is None else value))
+
+            sample_tests = lab_tests[: tests - grouped]
+            for i in range(tests - grouped, tests, test_set_size):
+                sample_tests.append(QACheckLabTest(sample_id, 0, tests=lab_tests[i:i + test_set_size]))
+
+            status = rng.choice((HilltopHost.RunStatus.SOME_RESULTS_BACK, HilltopHost.RunStatus.ALL_RESULTS_BACK))
+            payload_samples.append(QACheckSample(sample_id, status, sample_time, sample_tests))
+        payload_runs.append(QACheckRun(run_id, f"Benchmark run {run_id} " + "x" * rng.randrange(120), payload_samples))
+    return QAChecksPayload(payload_runs)
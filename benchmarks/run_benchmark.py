@@ -0,0 +1,195 @@
+"""
+Offline benchmark for the sampler_qa_checks_demo plugin.
+
+Runs `sampler_qa_checks` against a synthetic payload using the stand-in HilltopHost, Hilltop
+and pyodbc modules in benchmarks/fakes, so no Hilltop or Sampler installation is needed.
+Reports invocation times, throughput and the per-check profile, and can compare the result
+with a saved baseline to catch regressions.
+
+Example:
+
+    python benchmarks/run_benchmark.py --runs 5 --samples 200 --tests 30 --test-sets 2 --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, "fakes"))
+sys.path.insert(1, os.path.dirname(BENCHMARKS_DIR))
+
+import yaml  # noqa: E402
+import Hilltop  # noqa: E402
+import HilltopHost  # noqa: E402
+import pyodbc  # noqa: E402
+from HilltopHost import Sampler  # noqa: E402
+from payloads import generate_payload  # noqa: E402
+from sampler_qa_checks_demo import SamplerQAChecksPluginDemo  # noqa: E402
+
+BENCHMARK_CONFIG = {
+    "db_server": "benchmark",
+    "db_name": "Hilltop",
+    "save_qachecks_to_database": True,
+    "RunNameCheck": {"name_max_length": 100},
+    "MissingResultsCheck": {"age_limit": 3},
+    "OutsideRangeCheck": {"pH": {"critical": {"min": 5, "max": 9}, "warning": {"min": 6, "max": 8}}},
+    "PercentileCheck": {
+        "data_file": "benchmark.hts",
+        "min_data_points": 20,
+        "period_years": 10,
+        "pH": {"critical": "5,95", "warning": "10,90"},
+        "Conductivity": {"critical": "1,99", "warning": "5,95"},
+    },
+    "ThresholdCheck": {"Nitrate - Nitrogen": {"Information": 1.0, "Warning": 3.0, "Critical": 10.0}},
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="runs in the payload")
+    parser.add_argument("--samples", type=int, default=100, help="samples per run")
+    parser.add_argument("--tests", type=int, default=20, help="lab tests per sample")
+    parser.add_argument("--test-sets", type=int, default=1, help="test sets per sample")
+    parser.add_argument("--test-set-size", type=int, default=5, help="tests per test set")
+    parser.add_argument("--sites", type=int, default=20, help="distinct sites")
+    parser.add_argument("--repeat", type=int, default=3, help="invocations to time")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="delay added to every query")
+    parser.add_argument("--hilltop-latency-ms", type=float, default=0.0, help="delay added to every Hilltop read")
+    parser.add_argument("--config", help="YAML file whose top-level keys override the benchmark configuration")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results previously written with --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--verbose", action="store_true", help="print the plugin log")
+    return parser.parse_args(argv)
+
+
+def build_config(path: str | None) -> dict:
+    config = json.loads(json.dumps(BENCHMARK_CONFIG))
+    if path:
+        with open(path, "r") as file:
+            config.update(yaml.safe_load(file) or {})
+    config.setdefault("profiling", {})["enabled"] = True
+    return config
+
+
+def run(args) -> dict:
+    pyodbc.latency = args.db_latency_ms / 1000
+    Hilltop.latency = args.hilltop_latency_ms / 1000
+    HilltopHost.echo = args.verbose
+
+    payload = generate_payload(
+        args.runs, args.samples, args.tests, args.test_sets, args.test_set_size, args.sites
+    )
+    tests = len(payload.Runs) * args.samples * args.tests
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = build_config(args.config)
+        profile_file = os.path.join(directory, "profile.json")
+        config["profiling"]["json_file"] = profile_file
+        database_file = os.path.join(directory, "database.pickle")
+        pyodbc.database.save(database_file)
+        os.environ["BENCHMARK_DATABASE"] = database_file  # for worker processes
+        config_file = os.path.join(directory, "sampler_qa_checks_demo.yaml")
+        with open(config_file, "w") as file:
+            yaml.safe_dump(config, file)
+        HilltopHost.System.config_sections["sampler_qa_checks_demo"] = {"ConfigFile": config_file}
+
+        invocations = []
+        for _ in range(args.repeat):
+            HilltopHost.LOG.clear()
+            Sampler.SAVED.clear()
+            pyodbc.queries = 0
+            Hilltop.CALLS.update(GetData=0, PDist=0)
+
+            start_time = time.perf_counter()
+            SamplerQAChecksPluginDemo().sampler_qa_checks(payload)
+            seconds = time.perf_counter() - start_time
+
+            errors = [message for level, message in HilltopHost.LOG if level == "error"]
+            if errors:
+                raise RuntimeError("plugin logged errors:\n" + "\n".join(errors))
+            with open(profile_file, "r") as file:
+                profile = json.load(file)
+            invocations.append(
+                {
+                    "seconds": seconds,
+                    "qa_checks": len(Sampler.SAVED),
+                    # from the profile, so reads made in worker processes are included
+                    "db_queries": profile["counters"].get("db_queries", 0),
+                    "hilltop_reads": profile["counters"].get("hilltop_getdata", 0)
+                    + profile["counters"].get("hilltop_pdist", 0),
+                    "profile": profile,
+                }
+            )
+
+    warm = [i["seconds"] for i in invocations[1:]] or [invocations[0]["seconds"]]
+    return {
+        "payload": {"runs": args.runs, "samples": args.samples, "tests": args.tests, "lab_tests": tests},
+        "cold_seconds": invocations[0]["seconds"],
+        "warm_median_seconds": statistics.median(warm),
+        "tests_per_second": tests / statistics.median(warm),
+        "invocations": invocations,
+    }
+
+
+def report(results: dict) -> None:
+    payload = results["payload"]
+    print(
+        f"payload: {payload['runs']} runs x {payload['samples']} samples x {payload['tests']} tests "
+        f"= {payload['lab_tests']} lab tests"
+    )
+    for n, invocation in enumerate(results["invocations"], 1):
+        print(
+            f"invocation {n}: {invocation['seconds']:.3f} s, {invocation['qa_checks']} QA checks, "
+            f"{invocation['db_queries']} queries, {invocation['hilltop_reads']} Hilltop reads"
+        )
+    print(f"cold: {results['cold_seconds']:.3f} s, warm median: {results['warm_median_seconds']:.3f} s, "
+          f"{results['tests_per_second']:.0f} lab tests/s")
+    print()
+    print(f"{'check':<24}{'calls':>8}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'emitted':>9}")
+    checks = results["invocations"][-1]["profile"]["checks"]
+    for name, c in sorted(checks.items(), key=lambda item: -item[1]["total_seconds"]):
+        print(
+            f"{name:<24}{c['calls']:>8}{c['total_seconds']:>10.3f}{c['p50_ms']:>10.3f}"
+            f"{c['p95_ms']:>10.3f}{c['emitted']:>9}"
+        )
+    phases = results["invocations"][-1]["profile"].get("phases") or {}
+    if phases:
+        print(f"{'phase':<24}{'calls':>8}{'total s':>10}")
+    for name, p in sorted(phases.items(), key=lambda item: -item[1]["total_seconds"]):
+        print(f"{name:<24}{p['calls']:>8}{p['total_seconds']:>10.3f}")
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    """
+    Returns False if the warm median is slower than the baseline by more than the tolerance.
+    """
+    with open(baseline_path, "r") as file:
+        baseline = json.load(file)
+    limit = baseline["warm_median_seconds"] * (1 + tolerance)
+    change = results["warm_median_seconds"] / baseline["warm_median_seconds"] - 1
+    print(f"\nbaseline: {baseline['warm_median_seconds']:.3f} s, change: {change:+.1%}")
+    if results["warm_median_seconds"] > limit:
+        print(f"REGRESSION: slower than the baseline by more than {tolerance:.0%}")
+        return False
+    return True
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(args)
+    report(results)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
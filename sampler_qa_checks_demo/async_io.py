@@ -0,0 +1,68 @@
+from typing import Callable, List
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+import HilltopHost
+from .checks.i_check import ICheck
+from .repository import Repository
+
+
+class AsyncPrefetcher:
+    """
+    Overlaps the I/O of a payload window before its checks are performed.
+
+    Repository metadata queries and then the checks' slow reads (e.g. PercentileCheck histories) are
+    issued as asyncio tasks that run the blocking calls on a thread pool, with at most `concurrency`
+    in flight at once so SQL Server and the data files aren't overwhelmed. The checks then run
+    against warm caches. The plugin entry point stays synchronous: each window is run to
+    completion with `asyncio.run`.
+    """
+
+    def __init__(self, concurrency: int = 4):
+        self.concurrency = max(1, concurrency)
+
+    def prefetch(self, repository: Repository, lab_tests: list, checks: List[ICheck], tests: list) -> bool:
+        """
+        Loads the metadata for the lab tests, then makes the checks' prefetch calls for the tests.
+
+        Returns:
+            bool: False if asyncio can't be used on this thread (the caller should prefetch synchronously).
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self._prefetch(repository, lab_tests, checks, tests))
+            return True
+        HilltopHost.LogWarning(
+            "sampler_qa_checks_demo - async I/O unavailable inside a running event loop, prefetching synchronously"
+        )
+        return False
+
+    async def _prefetch(self, repository: Repository, lab_tests: list, checks: List[ICheck], tests: list) -> None:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="sampler_qa_checks_demo_io"
+        ) as pool:
+
+            async def call(function: Callable, *args):
+                async with semaphore:
+                    return await loop.run_in_executor(pool, function, *args)
+
+            pairs = set(lab_tests)
+            if pairs:
+                try:
+                    await asyncio.gather(*(call(repository.fetch_sample_metadata, chunk)
+                                           for chunk in repository.sample_chunks(pairs)))
+                    missing = await asyncio.gather(*(call(repository.fetch_measurements, chunk)
+                                                     for chunk in repository.measurement_chunks(pairs)))
+                except Exception as e:
+                    HilltopHost.LogError(f"sampler_qa_checks_demo - Error occurred during prefetch: {str(e)}")
+                else:
+                    repository.complete_prefetch(pairs, set().union(*missing))
+
+            calls = [c for check in checks for c in check.prefetch_calls(tests)]
+            results = await asyncio.gather(*(call(c) for c in calls), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    HilltopHost.LogWarning(f"sampler_qa_checks_demo - prefetch read failed: {result}")
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A thread-safe, bounded cache with least-recently-used eviction and an optional time-to-live.
+
+    Instances can be held at module level so they survive across plugin invocations
+    in the Hilltop host process. Hit, miss and eviction counters are kept so they can
+    be reported at the end of each run.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_size: int = 1000, ttl_seconds: float | None = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    def configure(self, max_size: int | None = None, ttl_seconds: float | None = None) -> None:
+        """
+        Updates the size limit and time-to-live, evicting entries if the cache is now too big.
+
+        Args:
+            max_size (int): Maximum number of entries, or None to keep the current limit.
+            ttl_seconds (float): Seconds an entry stays valid, or None for no expiry.
+        """
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            self.ttl_seconds = ttl_seconds
+            self._evict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, self._MISSING)
+            if entry is self._MISSING:
+                self.misses += 1
+                return default
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """
+        Returns an unexpired entry without counting a hit or miss or marking it as recently used.
+        """
+        with self._lock:
+            entry = self._entries.get(key, self._MISSING)
+            if entry is self._MISSING:
+                return default
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                return default
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            expires = None
+            if self.ttl_seconds is not None:
+                expires = time.monotonic() + self.ttl_seconds
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def validate(self, version) -> bool:
+        """
+        Clears the cache if the underlying data has changed since it was filled.
+
+        Args:
+            version: Any comparable value describing the current state of the source data.
+
+        Returns:
+            bool: True if the cached entries are still valid, False if they were discarded.
+        """
+        with self._lock:
+            if self.version == version:
+                return True
+            self._entries.clear()
+            self.version = version
+            return False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions, "
+            f"{len(self)}/{self.max_size} entries"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
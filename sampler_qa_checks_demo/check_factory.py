@@ -1,8 +1,8 @@
-import pyodbc
 from typing import List
 from .checks.i_check import ICheck
 from .check_registry import CheckRegistry
 from .repository import Repository
+from .connection_pool import ConnectionPool
 
 
 class CheckFactory:
@@ -12,9 +12,10 @@ class CheckFactory:
     The factory uses CheckRegistry to get all available checks for a level,
     then filters them by the names listed in the configuration.
     """
-    def __init__(self, config: dict, connection: pyodbc.Connection):
+    def __init__(self, config: dict, pool: ConnectionPool):
         self.config = config
-        self.repository = Repository(connection)
+        test_info_cache = config.get("test_info_cache") or {}
+        self.repository = Repository(pool, test_info_cache.get("max_size", 10000))
 
     def create_run_checks(self) -> List[ICheck]:
         return self._create_checks("run_checks")
@@ -0,0 +1,65 @@
+from typing import List
+import threading
+
+from .checks.i_check import ICheck
+from .check_factory import CheckFactory
+from .connection_pool import ConnectionPool
+from .planner import CheckPlanner
+from .profiler import CheckCosts, Profiler
+
+
+class CheckPipeline:
+    """
+    The checks and repository built from one version of the configuration.
+
+    A pipeline is reused by every plugin invocation while the configuration file is unchanged,
+    so checks are not re-created (and data files not reconnected) on each call. `lock` is held
+    for the duration of a run because the pipeline keeps per-run state.
+    """
+
+    def __init__(self, config: dict, version: str, pool: ConnectionPool):
+        self.config = config
+        self.version = version
+        self.pool = pool
+        self.lock = threading.Lock()
+        factory = CheckFactory(config, pool)
+        self.repository = factory.repository
+        self.run_checks = factory.create_run_checks()
+        self.sample_checks = factory.create_sample_checks()
+        self.test_checks = factory.create_test_checks()
+        self.planner = CheckPlanner(self.test_checks, self.repository)
+        self.costs = CheckCosts()  # measured by time-budgeted runs
+
+    @property
+    def checks(self) -> List[ICheck]:
+        return self.run_checks + self.sample_checks + self.test_checks
+
+    def begin_run(self, profiler: Profiler) -> None:
+        """
+        Clears the state kept from the previous run and attaches this run's profiler.
+        """
+        self.repository.begin_run()
+        self.repository.profiler = profiler
+        for check in self.checks:
+            check.begin_run()
+
+
+_current: CheckPipeline | None = None
+_lock = threading.Lock()
+
+
+def get_pipeline(config: dict, version: str, pool: ConnectionPool) -> CheckPipeline:
+    """
+    Returns the current pipeline, building a new one if the configuration version or pool has changed.
+
+    A replacement pipeline is built in full before it is published, so a run never sees a
+    partially built pipeline.
+    """
+    global _current
+    with _lock:
+        pipeline = _current
+        if pipeline is not None and pipeline.version == version and pipeline.pool is pool:
+            return pipeline
+        pipeline = CheckPipeline(config, version, pool)
+        _current = pipeline
+        return pipeline
@@ -1,4 +1,5 @@
-from typing import List
+from typing import Callable, Iterator, List
+from decimal import Decimal
 import HilltopHost
 from HilltopHost.Sampler import QACheck
 from sampler_qa_checks_demo.repository import Repository
@@ -7,8 +8,18 @@ from sampler_qa_checks_demo.repository import Repository
 class ICheck:
     """
     Interface for all checks. Each check performs validation logic and returns a list of CheckResult objects.
+
+    Test checks can describe which tests they evaluate, so the CheckPlanner can skip the rest before any
+    metadata is read: `label` is the label of the QA checks they raise (tests that already have one are
+    skipped), `requires_result` skips tests without a result value, `uses_sample_metadata` marks checks
+    that read the sample metadata rather than only the lab test's measurement, and
+    `configured_measurements()` names the measurements they check.
     """
 
+    label: str | None = None
+    requires_result = False
+    uses_sample_metadata = False
+
     def __init__(self, config : dict, repository: Repository):
         """
         Initializes the check with the given configuration and repository.
@@ -39,7 +50,153 @@ class ICheck:
         Returns:
             A list of QACheck objects, or None if no checks were triggered
         """
-        raise NotImplementedError("Must implement perform_checks method.")
+        if type(self).iter_checks is ICheck.iter_checks:
+            raise NotImplementedError("Must implement perform_checks or iter_checks method.")
+        return list(self.iter_checks(run_id, context)) or None
+
+    def iter_checks(self, run_id : int, context) -> Iterator[QACheck]:
+        """
+        Perform checks on the given context and yield each QA check as it is raised.
+
+        The plugin consumes checks through this method. By default it yields the QA checks returned by
+        perform_checks; a check can override it instead of perform_checks to raise checks as a generator.
+
+        Args:
+            run_id: The ID of the run
+            context: The object to check (run, sample, or test)
+
+        Yields:
+            QACheck objects
+        """
+        if type(self).perform_checks is ICheck.perform_checks:
+            raise NotImplementedError("Must implement perform_checks or iter_checks method.")
+        qa_checks = self.perform_checks(run_id, context)
+        if qa_checks:
+            yield from qa_checks
+
+    def perform_checks_batch(self, run_id : int, contexts : list) -> List[QACheck]:
+        """
+        Perform checks on several contexts of the same run and level at once.
+
+        Override this to share per-batch work, such as the current time, parsed configuration or
+        repository lookups, across the contexts. The plugin uses it for checks that override it and
+        calls iter_checks once per context for the rest. By default it does the same.
+
+        Args:
+            run_id: The ID of the run the contexts belong to
+            contexts: The objects to check (runs, samples, or tests)
+
+        Returns:
+            A list of QACheck objects in context order, or None if no checks were triggered
+        """
+        qa_checks = []
+        for context in contexts:
+            qa_checks.extend(self.iter_checks(run_id, context))
+        return qa_checks or None
+
+    def perform_rule_checks_batch(
+        self, run_id: int, contexts: list, rule_sets: dict, build: Callable
+    ) -> List[QACheck]:
+        """
+        Checks a batch of tests against rule sets keyed by measurement, as perform_checks_batch of a
+        rule-based test check. Each lab test's measurement is looked up once and the results for each
+        measurement are evaluated together.
+
+        Args:
+            run_id: The ID of the run the tests belong to
+            contexts: The tests to check
+            rule_sets: Measurement name -> RuleSet
+            build: Called as build(run_id, context, measurement, result, rule) for each breached rule,
+                returning the QA checks to raise
+
+        Returns:
+            A list of QACheck objects in context order, or None if no checks were triggered
+        """
+        measurements = {}  # LabTestID -> measurement name, or None if its metadata wasn't found
+        groups = {}  # measurement -> [(index, context, result)]
+        for index, context in enumerate(contexts):
+            if self.has_check_result(context, self.label):
+                continue
+            if context.Result is None or context.Result.ResultValue == "":
+                continue
+            lab_test_id = context.LabTestID
+            if lab_test_id not in measurements:
+                metadata = self.repository.get_measurement_by_lab_test_id(lab_test_id)
+                if metadata is None:
+                    HilltopHost.LogWarning(
+                        f"sampler_qa_checks_demo - Metadata not found for lab test {lab_test_id}"
+                    )
+                measurements[lab_test_id] = metadata["MeasurementName"] if metadata is not None else None
+            measurement = measurements[lab_test_id]
+            if measurement not in rule_sets:
+                continue
+            groups.setdefault(measurement, []).append((index, context, self.result_value(context)))
+
+        qa_checks = []
+        for measurement, items in groups.items():
+            rules = rule_sets[measurement].evaluate_all([result for _, _, result in items])
+            for (index, context, result), rule in zip(items, rules):
+                if rule is not None:
+                    qa_checks.extend((index, qa_check) for qa_check in build(run_id, context, measurement, result, rule))
+        qa_checks.sort(key=lambda indexed: indexed[0])
+        return [qa_check for _, qa_check in qa_checks] or None
+
+    def supports_batch(self) -> bool:
+        """
+        Returns True if the check overrides perform_checks_batch.
+        """
+        return type(self).perform_checks_batch is not ICheck.perform_checks_batch
+
+    def begin_run(self) -> None:
+        """
+        Called at the start of each plugin invocation. Checks are reused across invocations while
+        the configuration is unchanged, so override this to clear any per-invocation state.
+        """
+        pass
+
+    def prefetch_calls(self, tests) -> List[Callable[[], object]]:
+        """
+        Returns the slow reads this check will make for the given tests, as calls that warm its caches.
+
+        They are called concurrently before the checks are performed when execution.async_io is enabled,
+        after the repository's metadata for the tests has been prefetched.
+
+        Args:
+            tests: A list of (run_id, context) tuples for the lab tests to be checked.
+
+        Returns:
+            A list of zero-argument callables; empty if the check has no reads to overlap.
+        """
+        return []
+
+    def configured_measurements(self) -> set | None:
+        """
+        Returns the names of the measurements this check evaluates, or None if it isn't specific to measurements.
+
+        Tests whose measurement is known and not in the set are not passed to the check.
+        """
+        return None
+
+    def planned_reads(self, tests) -> int:
+        """
+        Returns at most how many slow reads (e.g. Hilltop histories) the check would make for the given tests,
+        without making them. Used by the planner's explain mode.
+
+        Args:
+            tests: A list of (run_id, context) tuples for the lab tests planned for this check.
+        """
+        return 0
+
+    def state_key(self) -> str:
+        """
+        Returns any state other than the configuration and the result value that the check's outcome
+        depends on, e.g. the history period it compares against. Used to decide whether a test
+        evaluated in a previous pass needs to be evaluated again.
+
+        Returns:
+            str: An empty string if the outcome depends only on the configuration and result.
+        """
+        return ""
 
     def has_check_result(self, context, label) -> bool:
         """
@@ -52,6 +209,10 @@ class ICheck:
         Returns:
             bool: True if the specified label is found, otherwise False.
         """
+        labels = getattr(context, "Labels", None)
+        if labels is not None:  # a PayloadSnapshot view
+            return label in labels
+
         if context.QAChecks is None:
             return False
 
@@ -62,3 +223,21 @@ class ICheck:
             if check.Label == label:
                 return True
         return False
+
+    def result_value(self, context) -> Decimal:
+        """
+        Returns the numeric result of a test that has a result value.
+
+        Args:
+            context: The test, from the payload or a PayloadSnapshot.
+
+        Returns:
+            Decimal: The result, as parsed once by the snapshot for a PayloadSnapshot view.
+
+        Raises:
+            decimal.InvalidOperation: If the result isn't numeric.
+        """
+        value = getattr(context, "Value", None)
+        if value is not None:  # a PayloadSnapshot view
+            return value
+        return Decimal(context.Result.ResultValue)
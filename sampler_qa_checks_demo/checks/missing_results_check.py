@@ -20,6 +20,25 @@ class MissingResultsCheck(ICheck):
         )
 
     def perform_checks(self, run_id, context) -> List[QACheck]:
+        qa_check = self.check_sample(run_id, context, datetime.now() - timedelta(days=self.age_limit), {})
+        if qa_check is not None:
+            return [qa_check]
+
+    def perform_checks_batch(self, run_id, contexts) -> List[QACheck]:
+        # the age limit and parsed sample times are shared by the batch
+        n_days_ago = datetime.now() - timedelta(days=self.age_limit)
+        sample_times = {}
+        qa_checks = [self.check_sample(run_id, context, n_days_ago, sample_times) for context in contexts]
+        return [qa_check for qa_check in qa_checks if qa_check is not None] or None
+
+    def check_sample(self, run_id, context, n_days_ago: datetime, sample_times: dict) -> QACheck | None:
+        """
+        Args:
+            run_id: The ID of the run.
+            context: The sample to check.
+            n_days_ago (datetime): Samples taken before this are old enough to report.
+            sample_times (dict): Parsed sample times by their text, shared between calls.
+        """
         if self.has_check_result(context, "missing_results_check"):
             return
 
@@ -30,9 +49,9 @@ class MissingResultsCheck(ICheck):
         if not context.SampleTime:
             return
 
-        today = datetime.now()
-        n_days_ago = today - timedelta(days=self.age_limit)
-        sample_time = datetime.fromisoformat(context.SampleTime)
+        sample_time = sample_times.get(context.SampleTime)
+        if sample_time is None:
+            sample_time = sample_times[context.SampleTime] = datetime.fromisoformat(context.SampleTime)
         if sample_time < n_days_ago:
             details = (
                 f"Sample ID {context.SampleID} has only some results back,"
@@ -45,4 +64,4 @@ class MissingResultsCheck(ICheck):
             qa_check.Severity = QACheckSeverity.Warning
             qa_check.Details = details
             qa_check.Label = "missing_results_check"
-            return [qa_check]
+            return qa_check
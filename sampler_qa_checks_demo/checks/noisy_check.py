@@ -13,16 +13,25 @@ class NoisyCheck(ICheck):
     And it'll do it over and over again for the same sample, because it's noisy.
     """
     def perform_checks(self, run_id, context) -> List[QACheck]:
+        qa_check = self.make_noise(run_id, context, datetime.now().strftime('%y%m%d.%H%M%S.%f')[:17])
+        if qa_check is not None:
+            return [qa_check]
 
+    def perform_checks_batch(self, run_id, contexts) -> List[QACheck]:
+        now = datetime.now().strftime('%y%m%d.%H%M%S.%f')[:17]
+        qa_checks = [self.make_noise(run_id, context, now) for context in contexts]
+        return [qa_check for qa_check in qa_checks if qa_check is not None] or None
+
+    def make_noise(self, run_id, context, now: str) -> QACheck | None:
         x = random.random()
         if x > 0.5:
             return  # 50/50 chance of not adding a QA check
 
         qa_check = QACheck()
-        qa_check.Title = f"Noisy check for {context.SampleID} at {datetime.now().strftime('%y%m%d.%H%M%S.%f')[:17]}"
+        qa_check.Title = f"Noisy check for {context.SampleID} at {now}"
         qa_check.RunID = run_id
         qa_check.SampleID = context.SampleID
         qa_check.Severity = QACheckSeverity.Information
         qa_check.Details = f"This is a NoisyCheck QA check that's randomly added to samples.\nRandom: {x}"
         qa_check.Label = "noisy_check"
-        return [qa_check]
+        return qa_check
@@ -1,9 +1,9 @@
 from typing import List
-from decimal import Decimal
 
 from .i_check import ICheck
+from .rules import compile_range_rules
 import HilltopHost
-from HilltopHost.Sampler import QACheck, QACheckSeverity
+from HilltopHost.Sampler import QACheck
 
 
 class OutsideRangeCheck(ICheck):
@@ -11,6 +11,22 @@ class OutsideRangeCheck(ICheck):
     An implementation of the ICheck interface that checks test results against a fixed range for the measurement.
     """
 
+    label = "outside_range_check"
+    requires_result = True
+
+    def __init__(self, config, repository):
+        super().__init__(config, repository)
+        self.rules = {}
+        if self.disabled:
+            return
+        try:
+            self.rules = compile_range_rules(self.config)
+        except ValueError as e:
+            HilltopHost.LogError(
+                f"sampler_qa_checks_demo - OutsideRangeCheck configuration error, check disabled: {e}"
+            )
+            self.disabled = True
+
     def perform_checks(self, run_id: int, context) -> List[QACheck]:
         if self.has_check_result(context, "outside_range_check"):
             return
@@ -27,12 +43,25 @@ class OutsideRangeCheck(ICheck):
 
         measurement = metadata["MeasurementName"]
 
-        if measurement not in self.config:
+        if measurement not in self.rules:
             return
 
-        result = Decimal(context.Result.ResultValue)
+        result = self.result_value(context)
         return self.check_result_against_range(run_id, context, measurement, result)
 
+    def perform_checks_batch(self, run_id, contexts) -> List[QACheck]:
+        return self.perform_rule_checks_batch(
+            run_id,
+            contexts,
+            self.rules,
+            lambda run_id, context, measurement, result, rule: [
+                self.build_qa_check(run_id, context, measurement, result, rule)
+            ],
+        )
+
+    def configured_measurements(self) -> set:
+        return set(self.rules)
+
     def check_result_against_range(
         self, run_id, context, measurement, result
     ) -> List[QACheck] | None:
@@ -48,31 +77,27 @@ class OutsideRangeCheck(ICheck):
         Returns:
             A list of QACheck objects or None if no range violation is found
         """
+        rule = self.rules[measurement].evaluate(result)
+        if rule is None:
+            return
+        return [self.build_qa_check(run_id, context, measurement, result, rule)]
+
+    def build_qa_check(self, run_id, context, measurement, result, rule) -> QACheck:
+        """
+        Creates the QA check for a result outside the range of a rule.
+        """
         qa_check = QACheck()
         qa_check.RunID = run_id
         qa_check.SampleID = context.SampleID
         qa_check.LabTestID = context.LabTestID
         qa_check.Label = "outside_range_check"
-
-        min, max = self.get_range(measurement, "critical")
-        if min and max and (result < min or result > max):
-            qa_check.Title = f"Outside critical range: {measurement}"
-            qa_check.Severity = QACheckSeverity.Critical
-            qa_check.Details = f"""{measurement} is outside of the critical range
-Critical range: {min} to {max}
-Result: {result}
-            """
-            return [qa_check]
-
-        min, max = self.get_range(measurement, "warning")
-        if min and max and (result < min or result > max):
-            qa_check.Title = f"Outside warning range: {measurement}"
-            qa_check.Severity = QACheckSeverity.Warning
-            qa_check.Details = f"""{measurement} is outside of the warning range
-Warning range: {min} to {max}
+        qa_check.Title = f"Outside {rule.name} range: {measurement}"
+        qa_check.Severity = rule.severity
+        qa_check.Details = f"""{measurement} is outside of the {rule.name} range
+{rule.name.title()} range: {rule.lower_text} to {rule.upper_text}
 Result: {result}
             """
-            return [qa_check]
+        return qa_check
 
     def get_range(self, measurement: str, severity: str) -> tuple:
         """
@@ -85,7 +110,8 @@ Result: {result}
         Returns:
             tuple: A tuple containing the minimum and maximum values if available, otherwise (None, None).
         """
-        range_config = self.config.get(measurement, {}).get(severity)
-        if range_config and "min" in range_config and "max" in range_config:
-            return range_config["min"], range_config["max"]
-        return None, None
+        rule_set = self.rules.get(measurement)
+        rule = rule_set.get(severity) if rule_set else None
+        if rule is None:
+            return None, None
+        return rule.lower, rule.upper
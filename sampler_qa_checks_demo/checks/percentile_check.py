@@ -1,14 +1,19 @@
 from typing import List
 from decimal import Decimal
-from datetime import datetime, timedelta
 from dataclasses import dataclass
+from functools import partial
+import threading
 
+import numpy as np
 import HilltopHost
-import Hilltop
 
 from .i_check import ICheck
 from HilltopHost.Sampler import QACheck, QACheckSeverity
 from .. import utils
+from ..cache import LRUCache
+from ..hilltop_files import hilltop_files
+from ..history_stats import HistoryStatsProvider
+from ..percentile_index import PercentileIndex, configured_measurements, history_period, load_index
 
 
 class PercentileCheck(ICheck):
@@ -16,6 +21,10 @@ class PercentileCheck(ICheck):
     An implementation of the ICheck interface that checks test results against historical percentiles.
     """
 
+    label = "percentile_check"
+    requires_result = True
+    uses_sample_metadata = True
+
     @dataclass
     class ThresholdParams:
         metadata: dict
@@ -29,10 +38,19 @@ class PercentileCheck(ICheck):
         start_date: str
         end_date: str
         severity: QACheckSeverity
+        data_file: str = ""
 
     def __init__(self, config, repository):
         super().__init__(config, repository)
-        self.dfile1 = None
+        self.data_file = None
+        self.site_data_files = {}  # site -> data file
+        self._history = {}  # per-invocation history cache
+        self._history_lock = threading.Lock()  # guards the per-invocation history cache
+        self._history_reads = {}  # history key -> lock held while it is read
+        # (data file, site, measurement, start date, end date, source, interpolation) -> (point count, percentiles),
+        # kept across plugin invocations with the pipeline when history_cache_size is configured
+        self.history_cache: LRUCache | None = None
+        self.index: PercentileIndex | None = None
         if self.disabled:
             return
         self.period_years = self.config.get(
@@ -41,12 +59,41 @@ class PercentileCheck(ICheck):
         self.min_data_points = self.config.get(
             "min_data_points", 20
         )  # default to minimum 20 data points
+        self.history_cache_size = self.config.get(
+            "history_cache_size", 0
+        )  # default to caching history for this invocation only
+        try:
+            self.history_stats = HistoryStatsProvider(
+                source=self.config.get("history_source", "pdist"),
+                interpolation=self.config.get("percentile_interpolation", "linear"),
+                min_data_points=self.min_data_points,
+            )
+        except ValueError as e:
+            HilltopHost.LogError(
+                f"sampler_qa_checks_demo - PercentileCheck configuration error, check disabled: {e}"
+            )
+            self.disabled = True
+            return
+        if self.history_cache_size > 0:
+            self.history_cache = LRUCache(
+                max_size=self.history_cache_size,
+                ttl_seconds=self.config.get("history_cache_ttl_seconds", 3600),
+            )
         HilltopHost.LogInfo(
             (
                 f"sampler_qa_checks_demo - PercentileCheck is using a history limit of {self.period_years} years "
                 f"and {self.min_data_points} data points"
             )
         )
+        self.data_file_idle_timeout = self.config.get(
+            "data_file_idle_timeout_seconds", 600
+        )  # default to closing data files unused for 10 minutes
+        self.data_file_handles = self.config.get(
+            "data_file_handles", 1
+        )  # default to reading each data file from one thread at a time
+        for data_file, sites in (self.config.get("site_data_files") or {}).items():
+            for site in sites:
+                self.site_data_files[site] = data_file
         # if we're not disabled then connect to the Hilltop data file
         data_file = self.config.get("data_file")
         if data_file is None:
@@ -54,30 +101,97 @@ class PercentileCheck(ICheck):
                 "sampler_qa_checks_demo - data_file is required in PercentileCheck configuration"
             )
             return
-        self.dfile1 = Hilltop.Connect(data_file)
-        if self.dfile1 is None:
-            HilltopHost.LogError(
-                f"sampler_qa_checks_demo - Hilltop data file '{data_file}' not connected."
-            )
-            return
+        with hilltop_files.use(data_file, self.data_file_handles) as dfile:
+            if dfile is None:
+                return
         self.data_file = data_file
         HilltopHost.LogInfo(
-            f"sampler_qa_checks_demo - PercentileCheck connected to Hilltop data file '{data_file}'"
+            f"sampler_qa_checks_demo - PercentileCheck using Hilltop data file '{data_file}'"
         )
 
-    def __del__(self):
-        if self.dfile1 is not None:
-            try:
-                Hilltop.Disconnect(self.dfile1)
-            except Exception:
-                pass  # Suppress errors during cleanup
+    def begin_run(self):
+        with self._history_lock:
+            self._history = {}
+            self._history_reads = {}
+        hilltop_files.close_idle(None if self.disabled else self.data_file_idle_timeout)
+        self.index = self.load_percentile_index()
+
+    def load_percentile_index(self) -> PercentileIndex | None:
+        """
+        Returns the configured percentile index if it exists and was built with the current history settings
+        within percentile_index_max_age_days, otherwise None so histories are read from the data files.
+        """
+        path = self.config.get("percentile_index") if not self.disabled else None
+        if not path:
+            return
+        try:
+            index = load_index(path)
+        except Exception as e:
+            HilltopHost.LogWarning(f"sampler_qa_checks_demo - percentile index '{path}' could not be read: {e}")
+            return
+        if index is None:
+            HilltopHost.LogWarning(f"sampler_qa_checks_demo - percentile index '{path}' not found")
+            return
+        max_age_days = self.config.get(
+            "percentile_index_max_age_days", 7
+        )  # default to using an index built in the last week
+        if not index.covers(self.period_years, self.history_stats.source, self.history_stats.interpolation, max_age_days):
+            HilltopHost.LogWarning(
+                f"sampler_qa_checks_demo - percentile index '{path}' built {index.header['built']} is stale, "
+                "reading histories from data files"
+            )
+            return
+        return index
 
     def perform_checks(self, run_id, context) -> List[QACheck]:
+        metadata = self.get_checkable_metadata(context)
+        if metadata is None:
+            return
+
+        result = self.result_value(context)
+        return self.check_result_against_percentile_ranges(metadata, result)
+
+    def perform_checks_batch(self, run_id, contexts) -> List[QACheck]:
+        return self.perform_checks_vectorized([(run_id, context) for context in contexts])
+
+    def perform_checks_vectorized(self, tests) -> List[QACheck]:
+        """
+        Checks many tests at once, grouping them by site and measurement so each group's history
+        is fetched once and all of its results are compared against the percentiles in one NumPy pass.
+
+        Args:
+            tests: A list of (run_id, context) tuples for the lab tests to check.
+
+        Returns:
+            A list of QACheck objects in the same order as the tests, or None if no checks were triggered.
+        """
+        groups = {}  # (site, measurement) -> [(index, metadata, result)]
+        for index, (run_id, context) in enumerate(tests):
+            metadata = self.get_checkable_metadata(context)
+            if metadata is None:
+                continue
+            key = (metadata["SiteName"], metadata["MeasurementName"])
+            groups.setdefault(key, []).append(
+                (index, metadata, self.result_value(context))
+            )
+
+        qa_checks = []
+        for (site, measurement), items in groups.items():
+            qa_checks.extend(self.evaluate_group(site, measurement, items))
+        if not qa_checks:
+            return
+        qa_checks.sort(key=lambda indexed: indexed[0])
+        return [qa_check for _, qa_check in qa_checks]
+
+    def get_checkable_metadata(self, context) -> dict | None:
+        """
+        Returns the sample metadata for a test that has a result and a configured measurement, otherwise None.
+        """
         if self.has_check_result(context, "percentile_check"):
             return
         if context.Result is None or context.Result.ResultValue == "":
             return
-        if self.dfile1 is None:
+        if self.data_file is None:
             return
 
         sample_id = context.SampleID
@@ -95,9 +209,121 @@ class PercentileCheck(ICheck):
             measurement not in self.config
         ):  # No percentile range configured for {measurement}"
             return
+        return metadata
 
-        result = Decimal(context.Result.ResultValue)
-        return self.check_result_against_percentile_ranges(metadata, result)
+    def evaluate_group(self, site, measurement, items) -> list:
+        """
+        Evaluates every result for one site and measurement against the critical and warning percentiles.
+
+        Args:
+            site (str): The site the results were sampled at.
+            measurement (str): The measurement the results are for.
+            items (list): (index, metadata, result) tuples for the tests in the group.
+
+        Returns:
+            list: (index, QACheck) tuples for the results outside the configured percentiles.
+        """
+        critical_range = self.get_configured_percentile_range(measurement, "critical")
+        if critical_range is None:
+            return []
+        warning_range = self.get_configured_percentile_range(measurement, "warning")
+        if warning_range is None:
+            return []
+
+        start_date, end_date = self.get_history_period()
+        size, percentiles = self.get_history(site, measurement, start_date, end_date)
+        if size < self.min_data_points or percentiles is None:
+            return []
+
+        exact = [result for _, _, result in items]
+        results = np.array([float(result) for result in exact])
+        bounds = np.asarray(percentiles, dtype=float)
+        critical = self.outside(results, exact, bounds, critical_range)
+        warning = ~critical & self.outside(results, exact, bounds, warning_range)
+
+        qa_checks = []
+        for i in np.flatnonzero(critical | warning):
+            index, metadata, result = items[i]
+            if critical[i]:
+                key, percentile_range, severity = "critical", critical_range, QACheckSeverity.Critical
+            else:
+                key, percentile_range, severity = "warning", warning_range, QACheckSeverity.Warning
+            params = self.ThresholdParams(
+                metadata=metadata,
+                result=result,
+                percentiles=percentiles,
+                percentile_range=percentile_range,
+                key=key,
+                site=site,
+                measurement=measurement,
+                size=size,
+                start_date=start_date,
+                end_date=end_date,
+                severity=severity,
+                data_file=self.get_data_file(site, measurement),
+            )
+            qa_checks.append((index, self.build_qa_check(params)))
+        return qa_checks
+
+    @staticmethod
+    def outside(results, exact, percentiles, percentile_range):
+        """
+        Returns a boolean mask of the results outside the given percentile range.
+
+        Args:
+            results: The results as a float array.
+            exact: The same results as Decimals.
+            percentiles: The percentiles as a float array.
+            percentile_range (tuple): The lower and upper percentiles of the range.
+        """
+        lower, upper = percentile_range
+        lower_bound, upper_bound = percentiles[lower - 1], percentiles[upper - 1]
+        mask = (results < lower_bound) | (results > upper_bound)
+        # a result that rounds to a bound as a float is compared as a Decimal, as perform_checks does
+        for i in np.flatnonzero((results == lower_bound) | (results == upper_bound)):
+            mask[i] = exact[i] < lower_bound or exact[i] > upper_bound
+        return mask
+
+    def configured_measurements(self) -> set:
+        return set(configured_measurements(self.config)) if not self.disabled else set()
+
+    def planned_reads(self, tests) -> int:
+        """
+        Returns at most how many histories would be read for the tests: one per site and measurement not
+        already cached. A sample whose metadata hasn't been read is counted as a site of its own.
+        """
+        if self.data_file is None:
+            return 0
+        start_date, end_date = self.get_history_period()
+        histories = set()
+        for run_id, context in tests:
+            lab_test = self.repository.cached_measurement(context.LabTestID)
+            measurement = lab_test["MeasurementName"] if lab_test is not None else context.LabTestID
+            metadata = self.repository.cached_sample_metadata(context.SampleID, context.LabTestID)
+            if metadata is None:
+                histories.add((context.SampleID, measurement))
+                continue
+            site = metadata["SiteName"]
+            data_file = self.get_data_file(site, measurement)
+            key = (
+                data_file, site, measurement, start_date, end_date,
+                self.history_stats.source, self.history_stats.interpolation,
+            )
+            with self._history_lock:
+                if self.get_cached_history(key, data_file, site, measurement) is None:
+                    histories.add((site, measurement))
+        return len(histories)
+
+    def state_key(self) -> str:
+        # the history window moves every day
+        return "|".join(self.get_history_period())
+
+    def get_history_period(self) -> tuple:
+        """
+        Returns the (start_date, end_date) of the history to check against, in YYYY-MM-DD format.
+        """
+        # get the last x years of data based on the configuration
+        return history_period(self.period_years)
 
     def check_result_against_percentile_ranges(self, metadata, result):
         """
@@ -110,21 +336,11 @@ class PercentileCheck(ICheck):
         Returns:
             List[QACheck] or None: A single QACheck if the result is outside the percentile thresholds, otherwise None.
         """
-        # get the last x years of data based on the configuration
-        # this ignores leap years
-        start_date = (
-            datetime.today() - timedelta(days=self.period_years * 365)
-        ).strftime("%Y-%m-%d")
-        end_date = datetime.today().strftime("%Y-%m-%d")
+        start_date, end_date = self.get_history_period()
 
         measurement = metadata["MeasurementName"]
         site = metadata["SiteName"]
 
-        s1 = Hilltop.GetData(self.dfile1, site, measurement, start_date, end_date)
-
-        if s1.size < self.min_data_points:
-            return
-
         critical_range = self.get_configured_percentile_range(measurement, "critical")
         if critical_range is None:
             return
@@ -133,11 +349,8 @@ class PercentileCheck(ICheck):
         if warning_range is None:
             return
 
-        # Use Hilltop.PDist to get percentiles
-        percentiles = self.retrieve_percentile_values(
-            site, measurement, start_date, end_date
-        )
-        if percentiles is None:
+        size, percentiles = self.get_history(site, measurement, start_date, end_date)
+        if size < self.min_data_points or percentiles is None:
             return
 
         params = self.ThresholdParams(
@@ -148,10 +361,11 @@ class PercentileCheck(ICheck):
             key="critical",
             site=site,
             measurement=measurement,
-            size=s1.size,
+            size=size,
             start_date=start_date,
             end_date=end_date,
             severity=QACheckSeverity.Critical,
+            data_file=self.get_data_file(site, measurement),
         )
 
         qa_check = self.evaluate_percentile_thresholds(params)
@@ -187,6 +401,22 @@ class PercentileCheck(ICheck):
             otherwise None.
         """
 
+        lower, upper = params.percentile_range
+        percentile_lower = params.percentiles[lower - 1]
+        percentile_upper = params.percentiles[upper - 1]
+        if params.result < percentile_lower or params.result > percentile_upper:
+            return self.build_qa_check(params)
+
+    def build_qa_check(self, params: ThresholdParams) -> QACheck:
+        """
+        Creates the QA check for a result that breaches the percentile range in params.
+
+        Args:
+            params (ThresholdParams): The parameters of the breached threshold evaluation.
+
+        Returns:
+            QACheck: The QA check describing the breach.
+        """
         qa_check = QACheck()
         qa_check.RunID = params.metadata["RunID"]
         qa_check.SampleID = params.metadata["SampleID"]
@@ -198,13 +428,12 @@ class PercentileCheck(ICheck):
         upper_ordinal = utils.ordinal(upper)
         percentile_lower = params.percentiles[lower - 1]
         percentile_upper = params.percentiles[upper - 1]
-        if params.result < percentile_lower or params.result > percentile_upper:
-            qa_check.Title = (
-                f"{params.key.title()} percentile breach: {params.measurement}"
-            )
-            qa_check.Severity = params.severity
-            qa_check.Details = f"""{params.measurement} is outside of the configured {params.key} percentiles
-{self.data_file} has {params.size} data points for {params.measurement} at {params.site} \
+        qa_check.Title = (
+            f"{params.key.title()} percentile breach: {params.measurement}"
+        )
+        qa_check.Severity = params.severity
+        qa_check.Details = f"""{params.measurement} is outside of the configured {params.key} percentiles
+{params.data_file} has {params.size} data points for {params.measurement} at {params.site} \
 from {params.start_date} to {params.end_date}
 
 {params.key} percentile limits: {lower_ordinal} and {upper_ordinal}
@@ -212,34 +441,111 @@ from {params.start_date} to {params.end_date}
 {upper_ordinal} percentile: {percentile_upper}
 Result: {params.result}
             """
-            if params.result < percentile_lower:
-                qa_check.Details += f"\nResult is below the {lower_ordinal} percentile"
-            if params.result > percentile_upper:
-                qa_check.Details += f"\nResult is above the {upper_ordinal} percentile"
-            return qa_check
+        if params.result < percentile_lower:
+            qa_check.Details += f"\nResult is below the {lower_ordinal} percentile"
+        if params.result > percentile_upper:
+            qa_check.Details += f"\nResult is above the {upper_ordinal} percentile"
+        return qa_check
 
-    def retrieve_percentile_values(self, site, measurement, start_date, end_date):
+    def get_history(self, site, measurement, start_date, end_date):
         """
-        Retrieves percentile information from the data source.
+        Retrieves the number of historical data points and their percentiles, reading the data file
+        at most once per site, measurement and period.
+
+        Results are cached for this invocation and, if history_cache_size is configured,
+        across invocations. Each read uses its own data file handle, so reads from worker threads
+        are serialised unless data_file_handles allows more than one handle per file.
 
         Args:
             site (str): Name of the site to query.
-            measurement (str): Measurement to retrieve percentiles for.
+            measurement (str): Measurement to retrieve history for.
             start_date (str): Start date in YYYY-MM-DD format.
             end_date (str): End date in YYYY-MM-DD format.
 
         Returns:
-            list or None: List of percentile values or None if unavailable.
+            tuple: (point count, percentiles), where percentiles is None if there are too few
+            data points or no percentiles were returned.
         """
-        pdist = Hilltop.PDist(self.dfile1, site, measurement, start_date, end_date)
-        if not pdist:
-            HilltopHost.LogWarning(
-                f"sampler_qa_checks_demo - No percentiles returned for {measurement} at {site}"
+        data_file = self.get_data_file(site, measurement)
+        key = (
+            data_file, site, measurement, start_date, end_date, self.history_stats.source, self.history_stats.interpolation
+        )
+        with self._history_lock:
+            history = self.get_cached_history(key, data_file, site, measurement)
+            if history is not None:
+                self._history[key] = history
+                return history
+            read_lock = self._history_reads.setdefault(key, threading.Lock())
+        # one thread reads each history while others asking for it wait
+        with read_lock:
+            with self._history_lock:
+                history = self._history.get(key)
+            if history is None:
+                history = self.read_history(data_file, site, measurement, start_date, end_date)
+                if self.history_cache is not None:
+                    self.history_cache.put(key, history)
+                with self._history_lock:
+                    self._history[key] = history
+        return history
+
+    def get_cached_history(self, key, data_file, site, measurement):
+        """
+        Returns a history from this invocation, the shared history cache or the percentile index, or None.
+        """
+        history = self._history.get(key)
+        if history is None and self.history_cache is not None:
+            history = self.history_cache.get(key)
+        if history is None and self.index is not None:
+            history = self.index.get(data_file, site, measurement, self.min_data_points)
+            if history is not None:
+                self.repository.profiler.count("percentile_index")
+        return history
+
+    def prefetch_calls(self, tests) -> list:
+        """
+        Returns a history read for each site and measurement among the tests, so they can be read concurrently.
+        """
+        if self.data_file is None:
+            return []
+        start_date, end_date = self.get_history_period()
+        histories = set()
+        for run_id, context in tests:
+            if self.has_check_result(context, "percentile_check"):
+                continue
+            if context.Result is None or context.Result.ResultValue == "":
+                continue
+            metadata = self.repository.get_sample_metadata(context.SampleID, context.LabTestID)
+            if metadata is None or metadata["MeasurementName"] not in self.config:
+                continue
+            histories.add((metadata["SiteName"], metadata["MeasurementName"]))
+        return [
+            partial(self.get_history, site, measurement, start_date, end_date)
+            for site, measurement in sorted(histories)
+        ]
+
+    def read_history(self, data_file, site, measurement, start_date, end_date):
+        """
+        Reads the point count and percentiles for a site and measurement from a data file.
+
+        Returns:
+            tuple: (point count, percentiles or None)
+        """
+        with hilltop_files.use(data_file, self.data_file_handles) as dfile:
+            if dfile is None:
+                return 0, None
+            return self.history_stats.read(
+                dfile, site, measurement, start_date, end_date, self.repository.profiler
             )
-            return
-        # pdist is a tuple of (percentiles: numpy, extrema: dict)
-        percentiles, extrema = pdist
-        return percentiles
+
+    def get_data_file(self, site, measurement) -> str:
+        """
+        Returns the data file holding the history for a site and measurement: the measurement's own
+        data_file if configured, then the file for the site's group in site_data_files, then data_file.
+        """
+        measurement_config = self.config.get(measurement)
+        if isinstance(measurement_config, dict) and measurement_config.get("data_file"):
+            return measurement_config["data_file"]
+        return self.site_data_files.get(site, self.data_file)
 
     def get_configured_percentile_range(self, measurement, key):
         """
@@ -0,0 +1,128 @@
+from typing import Dict, List
+from decimal import Decimal, InvalidOperation
+
+from HilltopHost.Sampler import QACheckSeverity
+
+# configuration keys that are settings of the check rather than measurement names
+RESERVED_KEYS = ("disabled",)
+
+
+class Rule:
+    """
+    A single pre-parsed bound for one severity. A result breaches the rule if it is below
+    `lower` or above `upper`; either bound can be None.
+    """
+
+    __slots__ = ("name", "severity", "lower", "upper", "lower_text", "upper_text")
+
+    def __init__(self, name, severity, lower=None, upper=None, lower_text=None, upper_text=None):
+        self.name = name
+        self.severity = severity
+        self.lower = lower
+        self.upper = upper
+        self.lower_text = lower_text
+        self.upper_text = upper_text
+
+    def breached(self, result: Decimal) -> bool:
+        if self.lower is not None and result < self.lower:
+            return True
+        return self.upper is not None and result > self.upper
+
+
+class RuleSet:
+    """
+    The rules for one measurement, in evaluation order (most severe first).
+    """
+
+    __slots__ = ("measurement", "rules")
+
+    def __init__(self, measurement: str, rules: tuple):
+        self.measurement = measurement
+        self.rules = rules
+
+    def evaluate(self, result: Decimal) -> Rule | None:
+        """
+        Returns the first rule the result breaches, or None if it breaches none.
+        """
+        for rule in self.rules:
+            if rule.breached(result):
+                return rule
+
+    def evaluate_all(self, results: List[Decimal]) -> List[Rule | None]:
+        """
+        Evaluates a batch of results, returning the breached rule (or None) for each.
+        """
+        return [self.evaluate(result) for result in results]
+
+    def get(self, name: str) -> Rule | None:
+        for rule in self.rules:
+            if rule.name == name:
+                return rule
+
+
+def compile_range_rules(config: dict) -> Dict[str, RuleSet]:
+    """
+    Compiles an OutsideRangeCheck configuration into rule sets keyed by measurement.
+
+    Raises:
+        ValueError: If a measurement block or range is malformed.
+    """
+    severities = (("critical", QACheckSeverity.Critical), ("warning", QACheckSeverity.Warning))
+    rule_sets = {}
+    for measurement, block in _measurement_blocks(config):
+        rules = []
+        for name, severity in severities:
+            range_config = block.get(name)
+            if range_config is None:
+                continue
+            if not isinstance(range_config, dict) or "min" not in range_config or "max" not in range_config:
+                raise ValueError(f"{name} range for '{measurement}' must have both min and max")
+            lower = _parse_number(range_config["min"], measurement, name)
+            upper = _parse_number(range_config["max"], measurement, name)
+            if lower > upper:
+                raise ValueError(f"{name} range for '{measurement}' has min greater than max")
+            rules.append(Rule(name, severity, lower, upper, range_config["min"], range_config["max"]))
+        rule_sets[measurement] = RuleSet(measurement, tuple(rules))
+    return rule_sets
+
+
+def compile_threshold_rules(config: dict) -> Dict[str, RuleSet]:
+    """
+    Compiles a ThresholdCheck configuration into rule sets keyed by measurement.
+
+    Raises:
+        ValueError: If a measurement block or threshold is malformed.
+    """
+    severities = (
+        ("Critical", QACheckSeverity.Critical),
+        ("Warning", QACheckSeverity.Warning),
+        ("Information", QACheckSeverity.Information),
+    )
+    rule_sets = {}
+    for measurement, block in _measurement_blocks(config):
+        rules = []
+        for name, severity in severities:
+            if name not in block:
+                continue
+            threshold = _parse_number(block[name], measurement, name)
+            rules.append(Rule(name, severity, upper=threshold, upper_text=block[name]))
+        rule_sets[measurement] = RuleSet(measurement, tuple(rules))
+    return rule_sets
+
+
+def _measurement_blocks(config: dict):
+    for measurement, block in config.items():
+        if measurement in RESERVED_KEYS:
+            continue
+        if not isinstance(block, dict):
+            raise ValueError(f"configuration for '{measurement}' must be a mapping")
+        yield measurement, block
+
+
+def _parse_number(value, measurement: str, name: str) -> Decimal:
+    if isinstance(value, bool):
+        raise ValueError(f"{name} value for '{measurement}' is not a number: {value!r}")
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"{name} value for '{measurement}' is not a number: {value!r}") from None
@@ -21,6 +21,15 @@ class RunNameCheck(ICheck):
         )
 
     def perform_checks(self, run_id, context) -> List[QACheck]:
+        qa_check = self.check_run_name(run_id, context)
+        if qa_check is not None:
+            return [qa_check]
+
+    def perform_checks_batch(self, run_id, contexts) -> List[QACheck]:
+        qa_checks = [self.check_run_name(run_id, context) for context in contexts]
+        return [qa_check for qa_check in qa_checks if qa_check is not None] or None
+
+    def check_run_name(self, run_id, context) -> QACheck | None:
         if self.has_check_result(context, "run_name_check"):
             return
         if len(context.RunName) > self.name_max_length:
@@ -33,4 +42,4 @@ class RunNameCheck(ICheck):
                 f"which exceeds the maximum of {self.name_max_length}."
             )
             qa_check.Label = "run_name_check"
-            return [qa_check]
+            return qa_check
@@ -1,8 +1,8 @@
 from typing import List
-from decimal import Decimal
 import HilltopHost
-from HilltopHost.Sampler import QACheck, QACheckSeverity
+from HilltopHost.Sampler import QACheck
 from .i_check import ICheck
+from .rules import compile_threshold_rules
 
 
 class ThresholdCheck(ICheck):
@@ -10,6 +10,22 @@ class ThresholdCheck(ICheck):
     An implementation of the ICheck interface that checks test results against specified thresholds.
     """
 
+    label = "threshold_check"
+    requires_result = True
+
+    def __init__(self, config, repository):
+        super().__init__(config, repository)
+        self.rules = {}
+        if self.disabled:
+            return
+        try:
+            self.rules = compile_threshold_rules(self.config)
+        except ValueError as e:
+            HilltopHost.LogError(
+                f"sampler_qa_checks_demo - ThresholdCheck configuration error, check disabled: {e}"
+            )
+            self.disabled = True
+
     def perform_checks(self, run_id, context) -> List[QACheck]:
         if self.has_check_result(context, "threshold_check"):
             return
@@ -25,12 +41,25 @@ class ThresholdCheck(ICheck):
             return
 
         measurement = metadata["MeasurementName"]
-        if measurement not in self.config:
+        if measurement not in self.rules:
             return
 
-        result = Decimal(context.Result.ResultValue)
+        result = self.result_value(context)
         return self.evaluate_result_against_thresholds(run_id, context, measurement, result)
 
+    def perform_checks_batch(self, run_id, contexts) -> List[QACheck]:
+        return self.perform_rule_checks_batch(
+            run_id,
+            contexts,
+            self.rules,
+            lambda run_id, context, measurement, result, rule: self.build_qa_check(
+                run_id, context, measurement, result, rule.severity, rule.upper_text
+            ),
+        )
+
+    def configured_measurements(self) -> set:
+        return set(self.rules)
+
     def evaluate_result_against_thresholds(self, run_id, context, measurement, result):
         """
         Args:
@@ -42,36 +71,15 @@ class ThresholdCheck(ICheck):
         Returns:
             A list of threshold QA checks if any threshold is exceeded, otherwise None.
         """
-        thresholds = self.config[measurement]
-
-        if "Critical" in thresholds and result > Decimal(thresholds["Critical"]):
-            return self.build_qa_check(
-                run_id,
-                context,
-                measurement,
-                result,
-                QACheckSeverity.Critical,
-                thresholds["Critical"],
-            )
-
-        if "Warning" in thresholds and result > Decimal(thresholds["Warning"]):
-            return self.build_qa_check(
-                run_id,
-                context,
-                measurement,
-                result,
-                QACheckSeverity.Warning,
-                thresholds["Warning"],
-            )
-
-        if "Information" in thresholds and result > Decimal(thresholds["Information"]):
+        rule = self.rules[measurement].evaluate(result)
+        if rule is not None:
             return self.build_qa_check(
                 run_id,
                 context,
                 measurement,
                 result,
-                QACheckSeverity.Information,
-                thresholds["Information"],
+                rule.severity,
+                rule.upper_text,
             )
 
     def build_qa_check(
@@ -1,15 +1,34 @@
 import yaml
 import os
+import hashlib
+import threading
 import HilltopHost
 
 
 class ConfigLoader:
     """
     A class that loads the YAML configuration file for the sampler_qa_checks_demo plugin.
+
+    The parsed configuration is cached and only re-read when the file's modification time or
+    size changes, and only re-parsed when its content hash changes.
     """
 
+    _cache = None  # (path, (mtime, size), content hash, config)
+    _lock = threading.Lock()
+
     @staticmethod
     def load() -> dict:
+        config, _ = ConfigLoader.load_versioned()
+        return config
+
+    @staticmethod
+    def load_versioned() -> tuple:
+        """
+        Loads the configuration, returning it with a version that changes whenever the file content does.
+
+        Returns:
+            tuple: (config dict, content hash of the configuration file)
+        """
         config_section = HilltopHost.System.GetConfigSection("sampler_qa_checks_demo")
         if not config_section:
             raise ValueError("sampler_qa_checks_demo configuration section not found")
@@ -19,7 +38,20 @@ class ConfigLoader:
         if not os.path.exists(config_file_path):
             raise FileNotFoundError(f"configuration file not found: {config_file_path}")
 
-        with open(config_file_path, "r") as file:
-            config = yaml.safe_load(file)
-        HilltopHost.LogInfo(f"sampler_qa_checks_demo - using configuration file from {config_file_path}")
-        return config
+        stat = os.stat(config_file_path)
+        file_stamp = (stat.st_mtime_ns, stat.st_size)
+        with ConfigLoader._lock:
+            cache = ConfigLoader._cache
+            if cache is not None and cache[0] == config_file_path and cache[1] == file_stamp:
+                return cache[3], cache[2]
+
+            with open(config_file_path, "rb") as file:
+                content = file.read()
+            version = hashlib.sha1(content).hexdigest()
+            if cache is not None and cache[0] == config_file_path and cache[2] == version:
+                config = cache[3]  # touched but unchanged
+            else:
+                config = yaml.safe_load(content)
+                HilltopHost.LogInfo(f"sampler_qa_checks_demo - using configuration file from {config_file_path}")
+            ConfigLoader._cache = (config_file_path, file_stamp, version, config)
+            return config, version
@@ -0,0 +1,161 @@
+from typing import Callable, Dict
+from contextlib import contextmanager
+import atexit
+import threading
+import time
+
+
+class ConnectionPool:
+    """
+    A bounded pool of database connections that is kept open across plugin invocations.
+
+    Connections are checked out for the duration of a query and checked back in afterwards,
+    so each worker thread uses its own connection. Idle connections are health checked before
+    reuse and closed once they have been idle for longer than `idle_timeout`.
+    """
+
+    def __init__(
+        self,
+        connect: Callable,
+        size: int = 4,
+        idle_timeout: float = 300,
+        health_check_interval: float = 30,
+    ):
+        """
+        Args:
+            connect (Callable): Opens a new DB-API connection.
+            size (int): Maximum number of connections checked out at once.
+            idle_timeout (float): Seconds after which an unused connection is closed.
+            health_check_interval (float): Connections idle for longer than this are tested before reuse.
+        """
+        self.connect = connect
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.created = 0
+        self._idle = []  # [(last used, connection)], most recently used last
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks out a connection for the duration of the with block. Connections that raise
+        an error are discarded rather than returned to the pool.
+        """
+        connection = self.checkout()
+        try:
+            yield connection
+        except Exception:
+            self.checkin(connection, discard=True)
+            raise
+        self.checkin(connection)
+
+    def checkout(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        raise RuntimeError("connection pool is closed")
+                    self._close_expired()
+                    if not self._idle:
+                        break
+                    last_used, connection = self._idle.pop()
+                if time.monotonic() - last_used < self.health_check_interval or self._healthy(connection):
+                    return connection
+                self._close(connection)
+            connection = self.connect()
+            with self._lock:
+                self.created += 1
+            return connection
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, connection, discard: bool = False) -> None:
+        try:
+            with self._lock:
+                if discard or self._closed:
+                    self._close(connection)
+                else:
+                    self._idle.append((time.monotonic(), connection))
+        finally:
+            self._slots.release()
+
+    def close_idle(self) -> None:
+        """
+        Closes connections that have been idle for longer than the idle timeout.
+        """
+        with self._lock:
+            self._close_expired()
+
+    def close(self) -> None:
+        """
+        Closes every idle connection; connections still checked out are closed when checked in.
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for _, connection in idle:
+            self._close(connection)
+
+    def _close_expired(self) -> None:
+        now = time.monotonic()
+        expired = [c for last_used, c in self._idle if now - last_used > self.idle_timeout]
+        self._idle = [(last_used, c) for last_used, c in self._idle if now - last_used <= self.idle_timeout]
+        for connection in expired:
+            self._close(connection)
+
+    @staticmethod
+    def _healthy(connection) -> bool:
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass  # Suppress errors during cleanup
+
+
+# connection string -> pool, shared across plugin invocations in the host process
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connection_string: str, connect: Callable, size: int = 4, idle_timeout: float = 300) -> ConnectionPool:
+    """
+    Returns the shared pool for a connection string, creating it (or replacing it if its
+    settings have changed) as needed.
+    """
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is not None and pool.size == max(1, size) and pool.idle_timeout == idle_timeout:
+            pool.close_idle()
+            return pool
+        if pool is not None:
+            pool.close()
+        pool = ConnectionPool(connect, size, idle_timeout)
+        _pools[connection_string] = pool
+        return pool
+
+
+@atexit.register
+def close_all() -> None:
+    """
+    Closes every pool; registered to run when the Hilltop host process shuts down.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
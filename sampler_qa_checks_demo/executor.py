@@ -0,0 +1,103 @@
+from typing import Iterable, Iterator, List, NamedTuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import HilltopHost
+from HilltopHost.Sampler import QACheck
+from .checks.i_check import ICheck
+from .profiler import CheckCosts, Profiler
+
+
+class CheckUnit(NamedTuple):
+    """
+    A single check to perform against a run, sample or test.
+    """
+
+    check: ICheck
+    run_id: int
+    context: object
+
+    @property
+    def contexts(self) -> list:
+        return [self.context]
+
+    def perform(self) -> List[QACheck]:
+        return list(self.check.iter_checks(self.run_id, self.context))
+
+
+class BatchUnit(NamedTuple):
+    """
+    A check to perform against several contexts of one run with the check's perform_checks_batch.
+    """
+
+    check: ICheck
+    run_id: int
+    contexts: list
+
+    def perform(self) -> List[QACheck]:
+        return list(self.check.perform_checks_batch(self.run_id, self.contexts) or [])
+
+
+class CheckExecutor:
+    """
+    Performs check units either serially or on a pool of worker threads.
+
+    Results are always yielded in the order the units were given, so the QA checks
+    saved are the same whichever mode is used. Units are taken from the iterable as they are
+    needed, with at most `max_in_flight` submitted to the pool ahead of the results consumed.
+    If `costs` is given, the time each unit takes is recorded in it per context checked.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        profiler: Profiler | None = None,
+        max_in_flight: int = 0,
+        costs: CheckCosts | None = None,
+    ):
+        self.workers = max(1, workers)
+        self.profiler = profiler or Profiler()
+        self.max_in_flight = max_in_flight if max_in_flight > 0 else self.workers * 4
+        self.costs = costs
+
+    def run(self, units: Iterable[CheckUnit | BatchUnit]) -> Iterator[List[QACheck]]:
+        """
+        Performs each unit and yields its QA checks (or None) in unit order.
+        """
+        if self.workers == 1:
+            return self._run_serial(units)
+        try:
+            pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="sampler_qa_checks_demo"
+            )
+        except RuntimeError as e:
+            HilltopHost.LogWarning(
+                f"sampler_qa_checks_demo - thread pool unavailable, running checks serially: {e}"
+            )
+            return self._run_serial(units)
+        return self._run_pool(pool, units)
+
+    def _run_serial(self, units: Iterable[CheckUnit]) -> Iterator[List[QACheck]]:
+        for unit in units:
+            yield self.perform(unit)
+
+    def _run_pool(self, pool: ThreadPoolExecutor, units: Iterable[CheckUnit]) -> Iterator[List[QACheck]]:
+        in_flight = deque()
+        with pool:
+            for unit in units:
+                in_flight.append(pool.submit(self.perform, unit))
+                if len(in_flight) >= self.max_in_flight:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    def perform(self, unit: CheckUnit) -> List[QACheck]:
+        start_time = time.perf_counter()
+        qa_checks = unit.perform()
+        seconds = time.perf_counter() - start_time
+        name = unit.check.__class__.__name__
+        self.profiler.record(name, seconds, len(qa_checks) if qa_checks else 0)
+        if self.costs is not None:
+            self.costs.record(name, seconds, len(unit.contexts))
+        return qa_checks
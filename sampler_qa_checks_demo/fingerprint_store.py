@@ -0,0 +1,137 @@
+from typing import Dict, Iterable, Tuple
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+
+
+class FingerprintStore:
+    """
+    A local SQLite store of the fingerprint of each (SampleID, LabTestID) evaluated by the test checks.
+
+    A fingerprint combines the result value, the labels of the QA checks already saved against the
+    test, and a hash of the check configuration, so a test whose fingerprint is unchanged since the
+    last pass does not need to be evaluated again.
+    """
+
+    chunk_size = 500  # stay under SQLite's host parameter limit
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                sample_id INTEGER NOT NULL,
+                lab_test_id INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                updated TEXT NOT NULL,
+                PRIMARY KEY (sample_id, lab_test_id)
+            ) WITHOUT ROWID
+            """
+        )
+        self._pending = []
+
+    @staticmethod
+    def fingerprint(result_value, labels: Iterable[str], config_hash: str) -> str:
+        text = json.dumps([result_value, sorted(labels), config_hash])
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def config_hash(config) -> str:
+        """
+        Returns a stable hash of any JSON-like configuration value.
+        """
+        text = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def load(self, sample_ids: Iterable[int]) -> Dict[Tuple[int, int], str]:
+        """
+        Loads the stored fingerprints for every lab test of the given samples.
+        """
+        sample_ids = sorted(set(sample_ids))
+        fingerprints = {}
+        for i in range(0, len(sample_ids), self.chunk_size):
+            chunk = sample_ids[i:i + self.chunk_size]
+            rows = self.connection.execute(
+                "SELECT sample_id, lab_test_id, fingerprint FROM fingerprints "
+                f"WHERE sample_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            for sample_id, lab_test_id, fingerprint in rows:
+                fingerprints[(sample_id, lab_test_id)] = fingerprint
+        return fingerprints
+
+    def record(self, sample_id: int, lab_test_id: int, fingerprint: str) -> None:
+        self._pending.append((sample_id, lab_test_id, fingerprint, datetime.now().isoformat(timespec="seconds")))
+
+    def commit(self) -> None:
+        """
+        Writes the recorded fingerprints in one transaction.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO fingerprints (sample_id, lab_test_id, fingerprint, updated) "
+                "VALUES (?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class IncrementalPass:
+    """
+    Tracks which tests in a payload are unchanged since they were last evaluated, and records
+    the fingerprints of the tests evaluated in this pass once it completes.
+    """
+
+    def __init__(self, store: FingerprintStore, config_hash: str, full_rescan: bool = False):
+        self.store = store
+        self.config_hash = config_hash
+        self.full_rescan = full_rescan
+        self.unchanged = set()
+        self._evaluated = {}  # (SampleID, LabTestID) -> (result value, labels)
+
+    def begin(self, tests: Iterable) -> None:
+        """
+        Compares every test in the payload with its stored fingerprint.
+
+        Args:
+            tests: The lab test objects in the payload, with test sets expanded.
+        """
+        tests = list(tests)
+        stored = {} if self.full_rescan else self.store.load(test.SampleID for test in tests)
+        for test in tests:
+            key = (test.SampleID, test.LabTestID)
+            result_value = test.Result.ResultValue if test.Result is not None else None
+            labels = getattr(test, "Labels", None)
+            labels = set(labels) if labels is not None else {check.Label for check in test.QAChecks or []}
+            if stored.get(key) == self.store.fingerprint(result_value, labels, self.config_hash):
+                self.unchanged.add(key)
+            else:
+                self._evaluated[key] = (result_value, labels)
+
+    def is_unchanged(self, test) -> bool:
+        return (test.SampleID, test.LabTestID) in self.unchanged
+
+    def add_saved(self, qa_checks) -> None:
+        """
+        Adds the labels of QA checks saved in this pass, so the next pass sees the same fingerprint.
+        """
+        for qa_check in qa_checks or []:
+            key = (getattr(qa_check, "SampleID", None), getattr(qa_check, "LabTestID", None))
+            evaluated = self._evaluated.get(key)
+            if evaluated is not None:
+                evaluated[1].add(qa_check.Label)
+
+    def commit(self) -> int:
+        """
+        Stores the fingerprints of the tests evaluated in this pass and returns how many were stored.
+        """
+        for (sample_id, lab_test_id), (result_value, labels) in self._evaluated.items():
+            self.store.record(
+                sample_id, lab_test_id, self.store.fingerprint(result_value, labels, self.config_hash)
+            )
+        self.store.commit()
+        return len(self._evaluated)
@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+import atexit
+import threading
+import time
+
+import Hilltop
+import HilltopHost
+
+
+class HilltopFileManager:
+    """
+    Keeps Hilltop data file handles open across plugin invocations.
+
+    A handle is only used by one reader at a time. Up to `max_handles` handles are opened per file so
+    that many threads can read it at once; further readers wait for a handle to be released. Released
+    handles stay open, so the next read of the same file does not have to reopen it, until they have
+    been idle for longer than `idle_timeout`. Callers with their own settings pass them to `use` and
+    `close_idle` rather than changing the defaults, since the manager is shared by the whole process.
+    """
+
+    def __init__(self, idle_timeout: float = 600, max_handles: int = 1):
+        self.idle_timeout = idle_timeout
+        self.max_handles = max_handles
+        self._handles = {}  # path -> [[handle, in use, last released]]
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def use(self, path: str, max_handles: int | None = None):
+        """
+        Provides a handle for a data file for the duration of the with block, or None if it can't be opened.
+
+        Args:
+            path (str): The data file.
+            max_handles (int): Handles to open for the file at most, instead of `max_handles`.
+        """
+        handle = self.acquire(path, max_handles)
+        try:
+            yield handle
+        finally:
+            if handle is not None:
+                self.release(path, handle)
+
+    def acquire(self, path: str, max_handles: int | None = None):
+        """
+        Returns an open handle for the data file that no other reader is using, opening one if needed.
+        """
+        if max_handles is None:
+            max_handles = self.max_handles
+        with self._condition:
+            while True:
+                entries = self._handles.setdefault(path, [])
+                for entry in entries:
+                    if not entry[1] and entry[0] is not None:
+                        entry[1] = True
+                        return entry[0]
+                if len(entries) < max(1, max_handles):
+                    break
+                self._condition.wait()
+            entry = [None, True, time.monotonic()]  # reserves the slot while connecting
+            entries.append(entry)
+        try:
+            handle = Hilltop.Connect(path)
+        except Exception:
+            with self._condition:
+                entries.remove(entry)  # frees the slot for the waiting readers
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            if handle is None:
+                entries.remove(entry)
+                self._condition.notify_all()
+                HilltopHost.LogError(
+                    f"sampler_qa_checks_demo - Hilltop data file '{path}' not connected."
+                )
+                return
+            entry[0] = handle
+        HilltopHost.LogInfo(f"sampler_qa_checks_demo - connected to Hilltop data file '{path}'")
+        return handle
+
+    def release(self, path: str, handle) -> None:
+        with self._condition:
+            for entry in self._handles.get(path, []):
+                if entry[0] is handle:
+                    entry[1] = False
+                    entry[2] = time.monotonic()
+            self._condition.notify_all()
+
+    def close_idle(self, idle_timeout: float | None = None) -> None:
+        """
+        Closes the handles that are not in use and have been idle for longer than the timeout.
+        """
+        if idle_timeout is None:
+            idle_timeout = self.idle_timeout
+        now = time.monotonic()
+        closed = []
+        with self._condition:
+            for path, entries in self._handles.items():
+                idle = [e for e in entries if e[0] is not None and not e[1] and now - e[2] > idle_timeout]
+                for entry in idle:
+                    entries.remove(entry)
+                    closed.append((path, entry[0]))
+        for path, handle in closed:
+            self._disconnect(handle)
+            HilltopHost.LogInfo(f"sampler_qa_checks_demo - closed idle Hilltop data file '{path}'")
+
+    def close_all(self) -> None:
+        with self._condition:
+            handles = [entry[0] for entries in self._handles.values() for entry in entries if entry[0] is not None]
+            self._handles.clear()
+        for handle in handles:
+            self._disconnect(handle)
+
+    @staticmethod
+    def _disconnect(handle) -> None:
+        try:
+            Hilltop.Disconnect(handle)
+        except Exception:
+            pass  # Suppress errors during cleanup
+
+
+# shared by every check for the lifetime of the Hilltop host process
+hilltop_files = HilltopFileManager()
+atexit.register(hilltop_files.close_all)
@@ -0,0 +1,117 @@
+"""
+Minimal stand-ins for the HilltopHost module outside the Hilltop host.
+
+Workers are started as plain Python processes, outside the Hilltop host, so the HilltopHost module
+isn't available to them. Before starting workers the plugin describes the host constants the checks
+use in an environment variable; a worker that can't import HilltopHost installs this shim from it.
+Log messages are buffered in `LOG` and returned to the parent process, which logs them to Hilltop.
+QA checks can't be saved from a worker.
+
+Command line tools such as the percentile index build install `install_logging` instead, which only
+provides the log functions and writes to the `logging` module.
+"""
+import enum
+import json
+import logging
+import os
+import sys
+import types
+
+ENVIRONMENT_VARIABLE = "SAMPLER_QA_CHECKS_DEMO_HOST"
+
+LOG = []  # (level, message)
+
+
+def describe_host() -> str:
+    """
+    Returns the host constants used by the checks as JSON. Called in the Hilltop host process.
+    """
+    import HilltopHost
+
+    return json.dumps(
+        {
+            "RunStatus": _constants(HilltopHost.RunStatus),
+            "QACheckSeverity": _constants(HilltopHost.Sampler.QACheckSeverity),
+        }
+    )
+
+
+def install() -> types.ModuleType:
+    """
+    Installs the shim as the HilltopHost and HilltopHost.Sampler modules and returns it.
+
+    Raises:
+        ImportError: If this isn't a worker process started by the plugin.
+    """
+    description = os.environ.get(ENVIRONMENT_VARIABLE)
+    if not description:
+        raise ImportError("HilltopHost is only available inside the Hilltop host")
+    host = json.loads(description)
+
+    module = types.ModuleType("HilltopHost")
+    module.LogInfo = lambda message: LOG.append(("info", message))
+    module.LogWarning = lambda message: LOG.append(("warning", message))
+    module.LogError = lambda message: LOG.append(("error", message))
+    module.RunStatus = types.SimpleNamespace(**host["RunStatus"])
+    module.System = types.SimpleNamespace(GetConfigSection=lambda name: None)
+
+    sampler = types.ModuleType("HilltopHost.Sampler")
+    sampler.QACheck = QACheck
+    sampler.QACheckSeverity = enum.IntEnum("QACheckSeverity", host["QACheckSeverity"])
+    sampler.SaveQACheck = _save_qa_check
+    for name in ("QAChecksPayload", "QACheckRun", "QACheckSample", "QACheckLabTest"):
+        setattr(sampler, name, type(name, (), {}))
+    module.Sampler = sampler
+
+    sys.modules["HilltopHost"] = module
+    sys.modules["HilltopHost.Sampler"] = sampler
+    return module
+
+
+def install_logging() -> types.ModuleType:
+    """
+    Installs a HilltopHost module whose log functions write to the `sampler_qa_checks_demo` logger and returns it.
+    """
+    logger = logging.getLogger("sampler_qa_checks_demo")
+    module = types.ModuleType("HilltopHost")
+    module.LogInfo = logger.info
+    module.LogWarning = logger.warning
+    module.LogError = logger.error
+    sys.modules["HilltopHost"] = module
+    return module
+
+
+def drain_log() -> list:
+    """
+    Returns and clears the buffered log messages.
+    """
+    messages = list(LOG)
+    LOG.clear()
+    return messages
+
+
+class QACheck:
+    def __init__(self):
+        self.RunID = None
+        self.SampleID = None
+        self.LabTestID = None
+        self.Label = None
+        self.Title = None
+        self.Severity = None
+        self.Details = None
+
+
+def _save_qa_check(qa_check) -> None:
+    raise RuntimeError("QA checks are saved by the Hilltop host process, not by workers")
+
+
+def _constants(namespace) -> dict:
+    constants = {}
+    for name in dir(namespace):
+        if name.startswith("_"):
+            continue
+        try:
+            constants[name] = int(getattr(namespace, name))
+        except (TypeError, ValueError):
+            continue
+    return constants
@@ -0,0 +1,90 @@
+from typing import Tuple
+
+import numpy as np
+import HilltopHost
+import Hilltop
+
+from .profiler import Profiler
+
+# the percentiles PercentileCheck compares against, 1st to 100th
+PERCENTILES = np.arange(1, 101)
+
+# NumPy percentile methods that can be used with the getdata source
+INTERPOLATION_METHODS = ("linear", "lower", "higher", "nearest", "midpoint", "weibull", "hazen", "median_unbiased")
+
+
+class HistoryStatsProvider:
+    """
+    Reads the point count and percentiles of a site and measurement's history from a data file.
+
+    With the `pdist` source, the default, percentiles come from Hilltop.PDist. PDist doesn't report how
+    many points they were computed from (its extrema hold no count), so the series is first counted with
+    Hilltop.GetData and PDist is only read for histories with enough points: two reads per history.
+    With the opt-in `getdata` source, the series is read once with Hilltop.GetData, and the count and
+    percentiles are both computed from it with NumPy using the configured interpolation method, which
+    may not match Hilltop's own percentiles exactly.
+
+    The point count is the number of finite values, taken from the value column of a (time, value) series.
+    """
+
+    def __init__(self, source: str = "pdist", interpolation: str = "linear", min_data_points: int = 20):
+        """
+        Args:
+            source (str): 'pdist' or 'getdata'.
+            interpolation (str): NumPy percentile method used with the getdata source.
+            min_data_points (int): Percentiles are not computed for histories with fewer points.
+
+        Raises:
+            ValueError: If the source or interpolation method is not recognised.
+        """
+        if source not in ("pdist", "getdata"):
+            raise ValueError(f"unknown history_source '{source}', expected 'pdist' or 'getdata'")
+        if interpolation not in INTERPOLATION_METHODS:
+            raise ValueError(
+                f"unknown percentile_interpolation '{interpolation}', expected one of {', '.join(INTERPOLATION_METHODS)}"
+            )
+        self.source = source
+        self.interpolation = interpolation
+        self.min_data_points = min_data_points
+
+    def read(self, dfile, site, measurement, start_date, end_date, profiler: Profiler) -> Tuple[int, object]:
+        """
+        Returns:
+            tuple: (point count, percentiles or None)
+        """
+        if self.source == "getdata":
+            return self.read_getdata(dfile, site, measurement, start_date, end_date, profiler)
+        return self.read_pdist(dfile, site, measurement, start_date, end_date, profiler)
+
+    def read_getdata(self, dfile, site, measurement, start_date, end_date, profiler: Profiler):
+        profiler.count("hilltop_getdata")
+        values = self.values(Hilltop.GetData(dfile, site, measurement, start_date, end_date))
+        if len(values) < max(1, self.min_data_points):
+            return len(values), None
+        return len(values), np.percentile(values, PERCENTILES, method=self.interpolation)
+
+    def read_pdist(self, dfile, site, measurement, start_date, end_date, profiler: Profiler):
+        profiler.count("hilltop_getdata")
+        size = len(self.values(Hilltop.GetData(dfile, site, measurement, start_date, end_date)))
+        if size < self.min_data_points:
+            return size, None
+        profiler.count("hilltop_pdist")
+        pdist = Hilltop.PDist(dfile, site, measurement, start_date, end_date)
+        if not pdist:
+            HilltopHost.LogWarning(
+                f"sampler_qa_checks_demo - No percentiles returned for {measurement} at {site}"
+            )
+            return size, None
+        # pdist is a tuple of (percentiles: numpy, extrema: dict)
+        percentiles, extrema = pdist
+        return size, percentiles
+
+    @staticmethod
+    def values(series) -> np.ndarray:
+        """
+        Returns the finite values of a GetData series as a flat float array.
+        """
+        values = np.asarray(series, dtype=float)
+        if values.ndim > 1:
+            values = values[:, -1]  # value column of a (time, value) series
+        return values[np.isfinite(values)]
@@ -0,0 +1,281 @@
+"""
+A compact, columnar copy of a QAChecksPayload.
+
+Every attribute read from a HilltopHost payload object crosses the bridge into the host process, and
+the checks read the same attributes many times over. `PayloadSnapshot` reads each run, sample and
+lab test once and holds them as columns: NumPy arrays for the ids and test set flags, and lists for
+the strings, the results parsed as Decimals and the labels of existing QA checks, which are held as
+frozensets.
+
+The checks read the snapshot through light view objects with the same attribute names as the
+HilltopHost types (`RunID`, `Samples`, `Result.ResultValue`, `IsTestSet`, `Tests`, `QAChecks`, ...),
+so a check works unchanged on either. Views also expose `Labels`, the set of existing QA check labels,
+`Value`, the parsed result of a test, and `snapshot` and `index`, which locate the object's row for checks
+that evaluate columns at once. The views are built once, on first use, and their `Samples` and `Tests`
+lists are shared, so treat them as read-only. A snapshot only holds plain Python and NumPy values, so it
+can be pickled to a worker process.
+"""
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Iterable, Iterator, List, NamedTuple
+
+import numpy as np
+import HilltopHost
+
+from .streaming import RunSlice
+
+NO_LABELS = frozenset()
+
+
+class QACheckLabel(NamedTuple):
+    """
+    An existing QA check, of which the snapshot only keeps the label.
+    """
+
+    Label: str
+
+
+class TestResult(NamedTuple):
+    ResultValue: str
+
+
+class PayloadSnapshot:
+    """
+    The runs, samples and lab tests of a payload, copied in one pass into columns.
+
+    Tests are held in payload order, with the tests of each test set following the test set itself;
+    `test_ends[i]` is the row after test set i's last test, and `parents[i]` the row of the test set
+    a test belongs to, or -1. `run_samples` and `sample_tests` are offsets into the sample and test rows.
+    """
+
+    def __init__(self, slices: Iterable[RunSlice] = (), skip: Callable | None = None):
+        """
+        Args:
+            slices: The runs and samples to copy, from a payload or another snapshot.
+            skip: Optionally returns True for lab tests to leave out, e.g. tests unchanged since they were last
+                checked. Test sets are always kept.
+        """
+        run_ids, run_names, run_labels, run_first, run_samples = [], [], [], [], [0]
+        sample_ids, sample_status, sample_times, sample_labels, sample_tests = [], [], [], [], [0]
+        test_sample_ids, lab_test_ids, is_test_set, test_ends, parents, result_values, test_labels = (
+            [], [], [], [], [], [], []
+        )
+
+        def add_test(test, parent: int) -> None:
+            test_sample_ids.append(test.SampleID)
+            lab_test_ids.append(test.LabTestID)
+            is_test_set.append(bool(test.IsTestSet))
+            test_ends.append(len(lab_test_ids))
+            parents.append(parent)
+            result = test.Result
+            result_values.append(None if result is None else result.ResultValue)
+            test_labels.append(labels_of(test))
+
+        for run, samples, first in slices:
+            run_ids.append(run.RunID)
+            run_names.append(run.RunName)
+            run_labels.append(labels_of(run))
+            run_first.append(first)
+            for sample in samples:
+                sample_ids.append(sample.SampleID)
+                sample_status.append(sample.StatusID)
+                sample_times.append(sample.SampleTime)
+                sample_labels.append(labels_of(sample))
+                for test in sample.Tests:
+                    if test.IsTestSet:
+                        row = len(lab_test_ids)
+                        add_test(test, -1)
+                        for t in test.Tests:
+                            if skip is None or not skip(t):
+                                add_test(t, row)
+                        test_ends[row] = len(lab_test_ids)
+                    elif skip is None or not skip(test):
+                        add_test(test, -1)
+                sample_tests.append(len(lab_test_ids))
+            run_samples.append(len(sample_ids))
+
+        self.run_ids = np.array(run_ids, dtype=np.int64)
+        self.run_names = run_names
+        self.run_labels = run_labels
+        self.run_first = np.array(run_first, dtype=bool)
+        self.run_samples = np.array(run_samples, dtype=np.int64)
+        self.sample_ids = np.array(sample_ids, dtype=np.int64)
+        self.sample_status = sample_status
+        self.sample_times = sample_times
+        self.sample_labels = sample_labels
+        self.sample_tests = np.array(sample_tests, dtype=np.int64)
+        self.test_sample_ids = np.array(test_sample_ids, dtype=np.int64)
+        self.lab_test_ids = np.array(lab_test_ids, dtype=np.int64)
+        self.is_test_set = np.array(is_test_set, dtype=bool)
+        self.test_ends = np.array(test_ends, dtype=np.int64)
+        self.parents = np.array(parents, dtype=np.int64)
+        self.result_values = result_values
+        self.results = [None if value is None else TestResult(value) for value in result_values]
+        self.values = parse_values(result_values)
+        self.test_labels = test_labels
+        self._views = None
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        state["_views"] = None  # rebuilt on first use
+        return state
+
+    @property
+    def views(self) -> "SnapshotViews":
+        if self._views is None:
+            self._views = SnapshotViews(self)
+        return self._views
+
+    @classmethod
+    def from_payload(cls, payload: HilltopHost.Sampler.QAChecksPayload) -> "PayloadSnapshot":
+        return cls(RunSlice(run, run.Samples, True) for run in payload.Runs)
+
+    @property
+    def Runs(self) -> List["RunView"]:
+        return self.views.runs
+
+    def slices(self) -> Iterator[RunSlice]:
+        """
+        Yields a RunSlice for each run, marking the runs whose run checks belong to this snapshot as first.
+        """
+        for i, run in enumerate(self.views.runs):
+            yield RunSlice(run, run.Samples, bool(self.run_first[i]))
+
+
+class SnapshotViews:
+    """
+    The view objects of a snapshot and the lists returned by their `Samples` and `Tests`, built in one pass.
+    """
+
+    def __init__(self, snapshot: PayloadSnapshot):
+        self.runs = [RunView(snapshot, i) for i in range(len(snapshot.run_ids))]
+        samples = [SampleView(snapshot, i) for i in range(len(snapshot.sample_ids))]
+        tests = [TestView(snapshot, i) for i in range(len(snapshot.lab_test_ids))]
+        run_samples = snapshot.run_samples.tolist()
+        self.run_samples = [samples[start:end] for start, end in zip(run_samples, run_samples[1:])]
+        top_level = (snapshot.parents < 0).tolist()
+        sample_tests = snapshot.sample_tests.tolist()
+        self.sample_tests = [
+            [tests[i] for i in range(start, end) if top_level[i]] for start, end in zip(sample_tests, sample_tests[1:])
+        ]
+        test_ends = snapshot.test_ends.tolist()
+        self.test_set_tests = {i: tests[i + 1:test_ends[i]] for i in np.flatnonzero(snapshot.is_test_set).tolist()}
+
+
+def parse_values(result_values: List[str | None]) -> List[Decimal | None]:
+    """
+    Returns the result values as Decimals, with None for missing, empty and non-numeric results.
+    """
+    values = []
+    for value in result_values:
+        try:
+            values.append(Decimal(value) if value else None)
+        except InvalidOperation:
+            values.append(None)
+    return values
+
+
+def labels_of(context) -> frozenset:
+    """
+    Returns the labels of the QA checks already raised against a payload object or snapshot view.
+    """
+    labels = getattr(context, "Labels", None)
+    if labels is not None:
+        return labels
+    qa_checks = getattr(context, "QAChecks", None)
+    if not qa_checks:
+        return NO_LABELS
+    return frozenset(qa_check.Label for qa_check in qa_checks)
+
+
+class _View:
+    __slots__ = ("snapshot", "index")
+
+    _labels = ""  # the snapshot's label column for this type of view
+
+    def __init__(self, snapshot: PayloadSnapshot, index: int):
+        self.snapshot = snapshot
+        self.index = index
+
+    @property
+    def Labels(self) -> frozenset:
+        return getattr(self.snapshot, self._labels)[self.index]
+
+    @property
+    def QAChecks(self) -> List[QACheckLabel]:
+        return [QACheckLabel(label) for label in sorted(self.Labels)]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.index})"
+
+
+class RunView(_View):
+    __slots__ = ()
+
+    _labels = "run_labels"
+
+    @property
+    def RunID(self) -> int:
+        return self.snapshot.run_ids.item(self.index)
+
+    @property
+    def RunName(self) -> str:
+        return self.snapshot.run_names[self.index]
+
+    @property
+    def Samples(self) -> List["SampleView"]:
+        return self.snapshot.views.run_samples[self.index]
+
+
+class SampleView(_View):
+    __slots__ = ()
+
+    _labels = "sample_labels"
+
+    @property
+    def SampleID(self) -> int:
+        return self.snapshot.sample_ids.item(self.index)
+
+    @property
+    def StatusID(self):
+        return self.snapshot.sample_status[self.index]
+
+    @property
+    def SampleTime(self):
+        return self.snapshot.sample_times[self.index]
+
+    @property
+    def Tests(self) -> List["TestView"]:
+        return self.snapshot.views.sample_tests[self.index]
+
+
+class TestView(_View):
+    __slots__ = ()
+
+    _labels = "test_labels"
+
+    @property
+    def SampleID(self) -> int:
+        return self.snapshot.test_sample_ids.item(self.index)
+
+    @property
+    def LabTestID(self) -> int:
+        return self.snapshot.lab_test_ids.item(self.index)
+
+    @property
+    def IsTestSet(self) -> bool:
+        return self.snapshot.is_test_set.item(self.index)
+
+    @property
+    def Result(self) -> TestResult | None:
+        return self.snapshot.results[self.index]
+
+    @property
+    def Value(self) -> Decimal | None:
+        """
+        The result as a Decimal, None if it is missing or not numeric.
+        """
+        return self.snapshot.values[self.index]
+
+    @property
+    def Tests(self) -> List["TestView"]:
+        return self.snapshot.views.test_set_tests.get(self.index, [])
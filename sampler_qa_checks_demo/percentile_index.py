@@ -0,0 +1,274 @@
+"""
+Builds and reads a precomputed index of PercentileCheck histories.
+
+The index holds the point count and the 1st to 100th percentiles of every configured site and
+measurement, so PercentileCheck can look them up instead of reading the Hilltop archive. It is
+stored as two files: `<output>.json`, which maps each (data file, site, measurement) to a row and
+records the period and settings the index was built with, and a `.npy` float array with one row per
+history (the count followed by the 100 percentiles) that is memory-mapped when read. Each build writes
+a new `.npy` file named in the JSON file, so an index can be rebuilt while the plugin has one mapped.
+Older `.npy` files are removed by the build; one that is still mapped is removed by a later build.
+
+Build it with:
+
+    python -m sampler_qa_checks_demo.percentile_index build --config sampler_qa_checks_demo.yaml --output percentiles
+
+The build runs outside the Hilltop host, where HilltopHost isn't available, so its messages go to `logging`.
+"""
+from typing import Dict, List, Tuple
+from datetime import date, datetime, timedelta
+import argparse
+import glob
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pyodbc
+import yaml
+
+try:
+    import HilltopHost  # noqa: F401
+except ImportError:
+    # the index build, run from the command line; hilltop_files and history_stats log through HilltopHost
+    from .hilltop_shim import install_logging
+    install_logging()
+from .hilltop_files import hilltop_files
+from .history_stats import HistoryStatsProvider
+from .profiler import Profiler
+
+logger = logging.getLogger(__name__)
+
+SITES_QUERY = """
+SELECT DISTINCT
+    st.SiteName COLLATE SQL_Latin1_General_CP1_CI_AS AS SiteName
+FROM
+    Samples smp
+    JOIN Sites st ON smp.SiteID = st.SiteID
+"""
+
+
+class PercentileIndex:
+    """
+    A read-only view of a percentile index. Lookups are a dictionary lookup and a read of one
+    memory-mapped row.
+    """
+
+    def __init__(self, path: str):
+        base = index_base(path)
+        with open(f"{base}.json", "r") as file:
+            self.header = json.load(file)
+        directory = os.path.dirname(base)
+        self.rows = np.load(os.path.join(directory, self.header["rows_file"]), mmap_mode="r")
+        self.entries = {
+            (data_file, site, measurement): row for data_file, site, measurement, row in self.header["entries"]
+        }
+
+    def covers(self, period_years: int, source: str, interpolation: str, max_age_days: int) -> bool:
+        """
+        Returns True if the index was built with the same history settings and recently enough to use.
+        """
+        header = self.header
+        if (header["period_years"], header["source"], header["interpolation"]) != (period_years, source, interpolation):
+            return False
+        built = date.fromisoformat(header["end_date"])
+        return (date.today() - built).days <= max_age_days
+
+    def get(self, data_file: str, site: str, measurement: str, min_data_points: int) -> Tuple[int, object] | None:
+        """
+        Returns:
+            tuple: (point count, percentiles or None), or None if the history is not in the index.
+        """
+        row = self.entries.get((data_file, site, measurement))
+        if row is None:
+            return
+        values = self.rows[row]
+        size = int(values[0])
+        if size < min_data_points or np.isnan(values[1]):
+            return size, None
+        return size, np.asarray(values[1:])
+
+
+# index path -> (modification time of the sidecar, PercentileIndex), shared across plugin invocations
+_indexes: Dict[str, tuple] = {}
+_indexes_lock = threading.Lock()
+
+
+def load_index(path: str) -> PercentileIndex | None:
+    """
+    Returns the index at path, reloading it if it has been rebuilt, or None if it doesn't exist.
+    """
+    sidecar = f"{index_base(path)}.json"
+    try:
+        mtime = os.stat(sidecar).st_mtime_ns
+    except OSError:
+        return
+    with _indexes_lock:
+        cached = _indexes.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        index = PercentileIndex(path)
+        _indexes[path] = (mtime, index)
+        return index
+
+
+def index_base(path: str) -> str:
+    """
+    Returns the index path without its .npy or .json extension.
+    """
+    root, extension = os.path.splitext(path)
+    return root if extension in (".npy", ".json") else path
+
+
+def history_period(period_years: int, today: datetime | None = None) -> tuple:
+    """
+    Returns the (start_date, end_date) PercentileCheck compares against, in YYYY-MM-DD format.
+    """
+    today = today or datetime.today()
+    # this ignores leap years
+    start_date = (today - timedelta(days=period_years * 365)).strftime("%Y-%m-%d")
+    return start_date, today.strftime("%Y-%m-%d")
+
+
+def configured_measurements(check_config: dict) -> List[str]:
+    """
+    Returns the measurements that have a percentile range configured.
+    """
+    return [
+        name
+        for name, value in check_config.items()
+        if isinstance(value, dict) and ("critical" in value or "warning" in value)
+    ]
+
+
+def data_file_for(check_config: dict, site: str, measurement: str) -> str | None:
+    """
+    Returns the data file holding a history, in the same order of precedence as PercentileCheck,
+    or None if no data file is configured for it.
+    """
+    measurement_config = check_config.get(measurement)
+    if isinstance(measurement_config, dict) and measurement_config.get("data_file"):
+        return measurement_config["data_file"]
+    for data_file, sites in (check_config.get("site_data_files") or {}).items():
+        if site in sites:
+            return data_file
+    return check_config.get("data_file")
+
+
+def query_sites(config: dict) -> List[str]:
+    """
+    Returns the name of every site with samples in the Sampler database.
+    """
+    connection_string = (
+        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+        f"SERVER={config.get('db_server', 'localhost')};DATABASE={config.get('db_name', '')};Trusted_Connection=yes;"
+    )
+    connection = pyodbc.connect(connection_string)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(SITES_QUERY)
+        return sorted(row[0] for row in cursor.fetchall())
+    finally:
+        connection.close()
+
+
+def build(config: dict, output: str, sites: List[str] | None = None) -> int:
+    """
+    Reads every configured site and measurement history and writes the index.
+
+    Returns:
+        int: The number of histories written.
+    """
+    check_config = config.get("PercentileCheck") or {}
+    period_years = check_config.get("period_years", 15)
+    min_data_points = check_config.get("min_data_points", 20)
+    source = check_config.get("history_source", "pdist")
+    interpolation = check_config.get("percentile_interpolation", "linear")
+    provider = HistoryStatsProvider(source, interpolation, min_data_points)
+    start_date, end_date = history_period(period_years)
+    if sites is None:
+        sites = query_sites(config)
+    measurements = configured_measurements(check_config)
+
+    entries = []
+    rows = []
+    unconfigured = 0
+    profiler = Profiler()
+    for measurement in measurements:
+        for site in sites:
+            data_file = data_file_for(check_config, site, measurement)
+            if data_file is None:
+                unconfigured += 1
+                continue
+            with hilltop_files.use(data_file) as dfile:
+                if dfile is None:
+                    continue
+                size, percentiles = provider.read(dfile, site, measurement, start_date, end_date, profiler)
+            row = np.full(101, np.nan)
+            row[0] = size
+            if percentiles is not None:
+                row[1:] = np.asarray(percentiles, dtype=float)[:100]
+            entries.append([data_file, site, measurement, len(rows)])
+            rows.append(row)
+    if unconfigured:
+        logger.warning("%d histories not indexed, no data_file configured for them", unconfigured)
+
+    base = index_base(output)
+    built = datetime.now()
+    rows_file = f"{base}.{built:%Y%m%d%H%M%S}.npy"
+    np.save(rows_file, np.array(rows, dtype=float).reshape(len(rows), 101))
+    header = {
+        "built": built.isoformat(timespec="seconds"),
+        "rows_file": os.path.basename(rows_file),
+        "start_date": start_date,
+        "end_date": end_date,
+        "period_years": period_years,
+        "source": source,
+        "interpolation": interpolation,
+        "entries": entries,
+    }
+    with open(f"{base}.json.tmp", "w") as file:
+        json.dump(header, file)
+    os.replace(f"{base}.json.tmp", f"{base}.json")
+    remove_old_rows_files(base, rows_file)
+    return len(entries)
+
+
+def remove_old_rows_files(base: str, rows_file: str) -> None:
+    """
+    Removes the `.npy` files of earlier builds of the index, including any a previous build couldn't remove.
+    A file that can't be removed, for example because a running plugin still has it mapped, is logged and
+    left for the next build.
+    """
+    for path in glob.glob(f"{glob.escape(base)}.{'[0-9]' * 14}.npy"):
+        if os.path.basename(path) == os.path.basename(rows_file):
+            continue
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning("old percentile index rows '%s' not removed, retrying on the next build: %s", path, e)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m sampler_qa_checks_demo.percentile_index",
+        description="Build the PercentileCheck percentile index.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="read every configured history and write the index")
+    build_parser.add_argument("--config", required=True, help="the plugin's YAML configuration file")
+    build_parser.add_argument("--output", required=True, help="index path, written as <output>.json and a dated .npy file")
+    build_parser.add_argument("--sites", nargs="+", help="sites to index, instead of every site in the Sampler database")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    with open(args.config, "r") as file:
+        config = yaml.safe_load(file)
+    count = build(config, args.output, args.sites)
+    hilltop_files.close_all()
+    print(f"wrote {count} histories to {index_base(args.output)}.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+from typing import Dict, List, Tuple
+from collections import Counter
+import math
+
+from .checks.i_check import ICheck
+from .payload_snapshot import labels_of
+from .repository import Repository
+
+
+class CheckPlan:
+    """
+    The test check evaluations planned for a window of the payload, and the lookups they need.
+    """
+
+    def __init__(self, checks: List[ICheck]):
+        self.checks = checks
+        self.entries: Dict[Tuple[int, int], tuple] = {}  # (SampleID, LabTestID) -> (run_id, test, [ICheck])
+        self.pruned = Counter()  # (check name, reason) -> tests not passed to the check
+        self.unknown_lab_tests = set()  # LabTestIDs whose measurement has to be queried
+
+    def add(self, run_id: int, test, checks: List[ICheck]) -> None:
+        self.entries[(test.SampleID, test.LabTestID)] = (run_id, test, checks)
+
+    def prune(self, check: ICheck, reason: str, count: int = 1) -> None:
+        self.pruned[(check.__class__.__name__, reason)] += count
+
+    def checks_for(self, test) -> List[ICheck]:
+        """
+        Returns the checks planned for a test, in pipeline order.
+        """
+        entry = self.entries.get((test.SampleID, test.LabTestID))
+        return entry[2] if entry is not None else []
+
+    def tests_for(self, check: ICheck) -> List[tuple]:
+        """
+        Returns (run_id, test) for every test planned for a check, in payload order.
+        """
+        return [(run_id, test) for run_id, test, checks in self.entries.values() if check in checks]
+
+    def planned_tests(self) -> List[tuple]:
+        """
+        Returns (run_id, test) for every test with at least one planned check.
+        """
+        return [(run_id, test) for run_id, test, _ in self.entries.values()]
+
+    def metadata_lab_tests(self) -> List[tuple]:
+        """
+        Returns the (SampleID, LabTestID) pairs planned for a check that reads the sample metadata.
+        """
+        return [
+            key for key, (_, _, checks) in self.entries.items() if any(check.uses_sample_metadata for check in checks)
+        ]
+
+    def evaluations(self) -> Counter:
+        """
+        Returns the number of tests planned for each check.
+        """
+        counts = Counter()
+        for _, _, checks in self.entries.values():
+            counts.update(check.__class__.__name__ for check in checks)
+        return counts
+
+    def summary_lines(self, chunk_size: int) -> List[str]:
+        """
+        Formats the plan for the explain log: the evaluations and pruned tests for each check, the metadata
+        and measurement queries, and the most history reads the evaluations would make.
+
+        Args:
+            chunk_size (int): Samples or lab tests per query, as used by the repository.
+        """
+        evaluations = self.evaluations()
+        lines = []
+        for check in self.checks:
+            name = check.__class__.__name__
+            pruned = ", ".join(
+                f"{count} {reason}" for (check_name, reason), count in sorted(self.pruned.items()) if check_name == name
+            )
+            lines.append(f"plan: {name} {evaluations[name]} evaluations" + (f" (skipped {pruned})" if pruned else ""))
+        samples = {sample_id for sample_id, _ in self.metadata_lab_tests()}
+        reads = sum(check.planned_reads(self.tests_for(check)) for check in self.checks)
+        lines.append(
+            f"plan: {math.ceil(len(samples) / chunk_size)} sample metadata queries for {len(samples)} samples, "
+            f"{math.ceil(len(self.unknown_lab_tests) / chunk_size)} measurement queries for "
+            f"{len(self.unknown_lab_tests)} lab tests, up to {reads} history reads"
+        )
+        return lines
+
+
+class CheckPlanner:
+    """
+    Decides which test checks to perform for each test before any metadata or history is read.
+
+    A check is skipped for a test that already has the check's label or, if the check requires one, has no
+    result. The measurement of each remaining test is then looked up, from the lab test cache or with one
+    measurement query for the window's unknown lab tests, and checks are skipped for tests whose measurement
+    they aren't configured for. Only the tests left for checks that read sample metadata have it prefetched.
+    Tests whose measurement can't be found are still passed to the checks, which report them.
+    """
+
+    def __init__(self, checks: List[ICheck], repository: Repository):
+        self.checks = [check for check in checks if not check.disabled]
+        self.repository = repository
+        self.measurements = {check: check.configured_measurements() for check in self.checks}
+
+    def plan(self, tests: List[tuple]) -> CheckPlan:
+        """
+        Plans the test checks for a window of tests.
+
+        Args:
+            tests: (run_id, test) tuples for the tests to check.
+        """
+        plan = CheckPlan(self.checks)
+        self.add_tests(plan, tests)
+        measured = [check for check in self.checks if self.measurements[check] is not None]
+        if measured:
+            self.prune_measurements(plan, self.find_measurements(plan, measured))
+        return plan
+
+    def add_tests(self, plan: CheckPlan, tests: List[tuple]) -> None:
+        """
+        Adds each test to the plan with the checks it doesn't already have a label for and, for checks that
+        require one, has a result for.
+        """
+        checked = Counter()  # check -> tests that already have its label
+        without_result = Counter()  # check -> tests skipped for not having a result
+        for run_id, test in tests:
+            labels = labels_of(test)
+            result = test.Result
+            has_result = result is not None and result.ResultValue != ""
+            checks = []
+            for check in self.checks:
+                if check.label is not None and check.label in labels:
+                    checked[check] += 1
+                elif check.requires_result and not has_result:
+                    without_result[check] += 1
+                else:
+                    checks.append(check)
+            if checks:
+                plan.add(run_id, test, checks)
+        for check, count in checked.items():
+            plan.prune(check, "already checked", count)
+        for check, count in without_result.items():
+            plan.prune(check, "without a result", count)
+
+    def find_measurements(self, plan: CheckPlan, measured: List[ICheck]) -> Dict[int, str | None]:
+        """
+        Looks up the measurement of every lab test planned for a check that is configured by measurement,
+        querying the lab tests that aren't in the lab test cache, which are kept in `plan.unknown_lab_tests`.
+
+        Returns:
+            dict: LabTestID -> measurement name, None if it isn't known.
+        """
+        lab_test_ids = {
+            key[1] for key, (_, _, checks) in plan.entries.items() if any(check in measured for check in checks)
+        }
+        plan.unknown_lab_tests = {
+            i
+            for i in lab_test_ids
+            if self.repository.cached_measurement(i) is None and not self.repository.is_missing_lab_test(i)
+        }
+        if plan.unknown_lab_tests:
+            self.repository.prefetch_measurements(plan.unknown_lab_tests)
+        measurements = {}
+        for i in lab_test_ids:
+            lab_test = self.repository.cached_measurement(i)
+            measurements[i] = lab_test["MeasurementName"] if lab_test is not None else None
+        return measurements
+
+    def prune_measurements(self, plan: CheckPlan, measurements: Dict[int, str | None]) -> None:
+        """
+        Drops the checks that aren't configured for a test's measurement. Tests whose measurement isn't known
+        keep their checks.
+        """
+        for key, (run_id, test, checks) in list(plan.entries.items()):
+            measurement = measurements.get(key[1])
+            if measurement is None:
+                continue
+            kept = []
+            for check in checks:
+                configured = self.measurements[check]
+                if configured is not None and measurement not in configured:
+                    plan.prune(check, "measurement not configured")
+                else:
+                    kept.append(check)
+            if kept:
+                plan.entries[key] = (run_id, test, kept)
+            else:
+                del plan.entries[key]
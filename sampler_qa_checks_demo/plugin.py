@@ -0,0 +1,471 @@
+from typing import Iterator, List
+from itertools import groupby
+from operator import itemgetter
+import pyodbc
+import traceback
+import time
+import HilltopHost
+from .checks.i_check import ICheck
+from .config_loader import ConfigLoader
+from .check_pipeline import CheckPipeline, get_pipeline
+from .repository import Repository, lab_test_cache
+from .executor import BatchUnit, CheckExecutor, CheckUnit
+from .streaming import RunSlice, iter_tests, iter_windows
+from .scheduler import CheckBacklog, CheckScheduler
+from . import process_pool
+from .async_io import AsyncPrefetcher
+from .planner import CheckPlan
+from .payload_snapshot import PayloadSnapshot
+from .sinks import QACheckReport, QACheckSink
+from .profiler import Profiler
+from .fingerprint_store import FingerprintStore, IncrementalPass
+from .connection_pool import ConnectionPool, get_pool
+from HilltopHost.Sampler import QACheck
+
+
+class SamplerQAChecksPluginDemo:
+    """
+    A plugin that demonstrates how to perform QA checks on runs, samples, and tests.
+    """
+
+    def sampler_qa_checks(self, payload: HilltopHost.Sampler.QAChecksPayload) -> None:
+        start_time = time.time()
+        self.started = time.perf_counter()
+        HilltopHost.LogInfo("sampler_qa_checks_demo - checks started")
+        self.sink = None
+        self.incremental = None
+        completed = False
+        try:
+
+            self.config, config_version = ConfigLoader.load_versioned()
+
+            self.save = self.config.get("save_qachecks_to_database", False)
+            if self.save:
+                HilltopHost.LogInfo(
+                    "sampler_qa_checks_demo - 'save_qachecks_to_database' set to true, saving checks to database"
+                )
+            else:
+                HilltopHost.LogInfo(
+                    "sampler_qa_checks_demo - not saving checks to database"
+                )
+            report = None if self.save else self.open_report()
+            self.sink = QACheckSink(self.save, self.config.get("save_batch_size", 500), report)
+
+            self.pool = self.get_db_pool()
+
+            profiling = self.config.get("profiling") or {}
+            self.profiler = Profiler(profiling.get("enabled", False))
+
+            pipeline = get_pipeline(self.config, config_version, self.pool)
+            with pipeline.lock:
+                pipeline.begin_run(self.profiler)
+                self.run_pipeline(payload, pipeline)
+            HilltopHost.LogInfo(
+                f"sampler_qa_checks_demo - lab test cache: {lab_test_cache.stats()}"
+            )
+            self.log_profile(profiling.get("json_file"))
+            HilltopHost.LogInfo(
+                f"sampler_qa_checks_demo - checks finished in {time.time() - start_time:.2f} seconds"
+            )
+            completed = True
+        except Exception as e:
+            HilltopHost.LogError(
+                f"sampler_qa_checks_demo - error occurred: {e}: {traceback.format_exc()}"
+            )
+        finally:
+            # errors here are logged rather than raised, so they never reach the Hilltop host
+            if self.sink is not None:
+                try:
+                    self.sink.close(completed)
+                except Exception as e:
+                    HilltopHost.LogError(
+                        f"sampler_qa_checks_demo - error occurred saving QA checks: {e}: {traceback.format_exc()}"
+                    )
+            if self.incremental is not None:
+                try:
+                    self.incremental.store.close()
+                except Exception as e:
+                    HilltopHost.LogError(
+                        f"sampler_qa_checks_demo - error occurred closing the fingerprint store: {e}"
+                    )
+
+    def open_report(self) -> QACheckReport | None:
+        """
+        Opens the configured dry-run report, or returns None to log each QA check instead.
+        """
+        report_config = self.config.get("dry_run_report") or {}
+        if not report_config.get("path"):
+            return
+        try:
+            report = QACheckReport(report_config["path"], report_config.get("format", "ndjson"))
+        except (ValueError, OSError) as e:
+            HilltopHost.LogError(f"sampler_qa_checks_demo - dry run report not written, logging QA checks instead: {e}")
+            return
+        HilltopHost.LogInfo(f"sampler_qa_checks_demo - writing QA checks to {report.format} report '{report.path}'")
+        return report
+
+    def run_pipeline(self, payload: HilltopHost.Sampler.QAChecksPayload, pipeline: CheckPipeline) -> None:
+        """
+        Performs every check in the pipeline against the payload and saves the resulting QA checks.
+
+        The payload is streamed through the pipeline a window of samples at a time: metadata is prefetched
+        for the window, its checks are performed and their QA checks passed to the sink, then the window's
+        metadata is released before the next window is read.
+        """
+        repository = pipeline.repository
+        test_checks = pipeline.test_checks
+        self.configure_lab_test_cache()
+
+        execution = self.config.get("execution") or {}
+        if execution.get("payload_snapshot", False) or execution.get("processes", 0) > 1:
+            payload = self.take_snapshot(payload)
+        self.begin_incremental_pass(payload, test_checks)
+
+        repository.validate_lab_test_cache()
+        if execution.get("explain", False):
+            self.explain(payload, pipeline)
+            return
+        if execution.get("processes", 0) > 1:
+            self.run_processes(payload, pipeline, execution)
+        elif self.has_time_budget(execution):
+            self.run_scheduled(payload, pipeline, execution)
+        else:
+            self.run_windows(iter_windows(payload, execution.get("window_size", 10000)), pipeline)
+        self.commit_incremental_pass()
+
+    def take_snapshot(self, payload: HilltopHost.Sampler.QAChecksPayload) -> PayloadSnapshot:
+        """
+        Copies the payload into a PayloadSnapshot, so the checks read it without crossing into the host.
+        """
+        start_time = time.perf_counter()
+        snapshot = PayloadSnapshot.from_payload(payload)
+        self.profiler.phase("PayloadSnapshot", time.perf_counter() - start_time)
+        return snapshot
+
+    def run_windows(self, windows: Iterator[List[RunSlice]], pipeline: CheckPipeline) -> None:
+        """
+        Plans the test checks for each window, prefetches the metadata they need, performs the checks and
+        saves the resulting QA checks.
+        """
+        repository = pipeline.repository
+        execution = self.config.get("execution") or {}
+        executor = CheckExecutor(execution.get("workers", 1), self.profiler, execution.get("max_in_flight", 0))
+        prefetcher = AsyncPrefetcher(execution.get("io_concurrency", 4)) if execution.get("async_io", False) else None
+        for window in windows:
+            plan = self.plan_window(pipeline, window)
+            lab_tests = plan.metadata_lab_tests()
+            if prefetcher is None or not self.prefetch_async(prefetcher, repository, lab_tests, plan):
+                repository.prefetch(lab_tests)
+            units = self.iter_units(window, pipeline.run_checks, pipeline.sample_checks, plan)
+            for qa_checks in executor.run(units):
+                self.save_qa_checks(qa_checks)
+            repository.evict(self.collect_lab_tests(window))
+
+    def has_time_budget(self, execution: dict) -> bool:
+        if execution.get("time_budget_seconds", 0) <= 0:
+            return False
+        if not execution.get("backlog_path"):
+            HilltopHost.LogWarning(
+                "sampler_qa_checks_demo - backlog_path is required for time_budget_seconds, checking without a time budget"
+            )
+            return False
+        return True
+
+    def run_scheduled(
+        self, payload: HilltopHost.Sampler.QAChecksPayload, pipeline: CheckPipeline, execution: dict
+    ) -> None:
+        """
+        Performs the run and sample checks, then the test checks cheapest first until execution.time_budget_seconds
+        from the start of the call have passed, deferring the rest to the backlog.
+
+        The backlog's tests are performed ahead of the payload's other tests for the same check. A deferred test
+        that is in the payload again is checked as it is in the payload: if it has changed it is planned like any
+        other test, and if incremental mode skips it as unchanged only its deferred checks are performed.
+        """
+        repository = pipeline.repository
+        backlog = CheckBacklog(execution["backlog_path"], pipeline.test_checks)
+        backlog.load()
+        pipeline.costs.seed(backlog.costs)
+        executor = CheckExecutor(
+            execution.get("workers", 1), self.profiler, execution.get("max_in_flight", 0), pipeline.costs
+        )
+        slices = [RunSlice(run, run.Samples, True) for run in payload.Runs]
+        plan = self.plan_window(pipeline, slices)
+        # an empty plan yields only the run and sample checks
+        for qa_checks in executor.run(self.iter_units(slices, pipeline.run_checks, pipeline.sample_checks, CheckPlan([]))):
+            self.save_qa_checks(qa_checks)
+
+        payload_tests = {(t.SampleID, t.LabTestID): t for _, t in iter_tests(slices)}
+        deferred = {}  # check -> [(run_id, test)] from the backlog, performed ahead of the planned tests
+        retried = {}  # check -> (SampleID, LabTestID) pairs deferred before and planned again
+        for test_check, run_id, test in backlog.tests():
+            key = (test.SampleID, test.LabTestID)
+            current = payload_tests.get(key)
+            if current is None:
+                deferred.setdefault(test_check, []).append((run_id, test))
+            elif self.is_unchanged(current):
+                # skipped by incremental mode, so the deferred check is the only one left to perform
+                deferred.setdefault(test_check, []).append((run_id, current))
+            else:
+                retried.setdefault(test_check, set()).add(key)
+        pending = {}  # check -> units, the backlog's tests first
+        for test_check in plan.checks:
+            tests = plan.tests_for(test_check)
+            again = retried.get(test_check)
+            if again:
+                tests.sort(key=lambda item: (item[1].SampleID, item[1].LabTestID) not in again)
+            pending[test_check] = list(self.check_test_list(test_check, deferred.get(test_check, []) + tests))
+
+        scheduler = CheckScheduler(pipeline.costs, self.started + execution["time_budget_seconds"], repository)
+        for qa_checks in executor.run(scheduler.schedule(pending)):
+            self.save_qa_checks(qa_checks)
+        repository.evict(scheduler.prefetched)
+        held = backlog.save(scheduler.deferred, pipeline.costs)
+        HilltopHost.LogInfo(
+            f"sampler_qa_checks_demo - time budget: performed {scheduler.performed} test checks, "
+            f"{held} deferred to the backlog"
+        )
+
+    def plan_window(self, pipeline: CheckPipeline, window: List[RunSlice]) -> CheckPlan:
+        """
+        Plans the test checks to perform for the changed tests in a window.
+        """
+        start_time = time.perf_counter()
+        tests = [(run_id, t) for run_id, t in iter_tests(window) if not self.is_unchanged(t)]
+        plan = pipeline.planner.plan(tests)
+        self.profiler.phase("CheckPlanner", time.perf_counter() - start_time)
+        return plan
+
+    def explain(self, payload: HilltopHost.Sampler.QAChecksPayload, pipeline: CheckPipeline) -> None:
+        """
+        Logs the test check evaluations, queries and history reads planned for the payload without performing them.
+
+        Planning makes the measurement query for lab tests that aren't in the lab test cache, as a real call would,
+        so the evaluations are pruned as they would be when the checks are performed.
+        """
+        window = [RunSlice(run, run.Samples, True) for run in payload.Runs]
+        plan = self.plan_window(pipeline, window)
+        HilltopHost.LogInfo("sampler_qa_checks_demo - explain mode, no checks performed")
+        for line in plan.summary_lines(pipeline.repository.prefetch_chunk_size):
+            HilltopHost.LogInfo(f"sampler_qa_checks_demo - {line}")
+
+    def run_processes(self, snapshot: PayloadSnapshot, pipeline: CheckPipeline, execution: dict) -> None:
+        """
+        Partitions the payload by run or site and performs the checks for each partition in a worker process.
+
+        QA checks are saved here, in partition order, along with the workers' log messages and profiling figures.
+        """
+        repository = pipeline.repository
+        partition_by = execution.get("partition", "run")
+        if partition_by == "site":
+            repository.prefetch(self.collect_lab_tests(list(snapshot.slices())))
+        partitions = process_pool.partition_payload(snapshot, partition_by, repository, self.is_unchanged)
+        metadata = None
+        if partition_by == "site":
+            # the workers load the metadata read to find the sites rather than querying it again
+            metadata = [repository.export_sample_metadata(partition.test_sample_ids.tolist()) for partition in partitions]
+        runner = process_pool.get_runner(
+            type(self),
+            self.config,
+            pipeline.version,
+            self.connection_string,
+            self.config.get("db_name", ""),
+            execution["processes"],
+            execution.get("python_executable"),
+        )
+        HilltopHost.LogInfo(
+            f"sampler_qa_checks_demo - checking {len(partitions)} partitions by {partition_by} in worker processes"
+        )
+        try:
+            for qa_checks, log, profile in runner.run(partitions, repository.lab_test_version, metadata):
+                for level, message in log:
+                    getattr(HilltopHost, f"Log{level.title()}")(message)
+                self.profiler.merge(profile)
+                self.save_qa_checks(qa_checks)
+        except Exception:
+            process_pool.discard_runner()
+            raise
+
+    def prefetch_async(
+        self,
+        prefetcher: AsyncPrefetcher,
+        repository: Repository,
+        lab_tests: List[tuple],
+        plan: CheckPlan,
+    ) -> bool:
+        """
+        Overlaps the window's metadata queries and the test checks' slow reads before the checks are performed.
+        """
+        start_time = time.perf_counter()
+        if not prefetcher.prefetch(repository, lab_tests, plan.checks, plan.planned_tests()):
+            return False
+        self.profiler.phase("AsyncPrefetcher", time.perf_counter() - start_time)
+        return True
+
+    def iter_units(
+        self,
+        window: List[RunSlice],
+        run_checks: List[ICheck],
+        sample_checks: List[ICheck],
+        plan: CheckPlan,
+    ) -> Iterator[CheckUnit | BatchUnit]:
+        """
+        Yields every check to perform against a window of the payload: for each run slice, its run checks,
+        then each sample check over the slice's samples, then each test check over the tests planned for it.
+        """
+        for run, samples, first in window:
+            if first:
+                yield from self.check_run(run_checks, run)
+            yield from self.check_samples(sample_checks, run, samples)
+            yield from self.check_tests(plan, run, samples)
+
+    def check_run(self, run_checks: List[ICheck], run: HilltopHost.Sampler.QACheckRun) -> Iterator[CheckUnit | BatchUnit]:
+        for run_check in run_checks:
+            if run_check.disabled:
+                continue
+            yield from self.check_contexts(run_check, run.RunID, [run])
+
+    def check_samples(
+        self,
+        sample_checks: List[ICheck],
+        run: HilltopHost.Sampler.QACheckRun,
+        samples: List[HilltopHost.Sampler.QACheckSample],
+    ) -> Iterator[CheckUnit | BatchUnit]:
+        for sample_check in sample_checks:
+            if sample_check.disabled:
+                continue
+            yield from self.check_contexts(sample_check, run.RunID, samples)
+
+    def check_tests(
+        self,
+        plan: CheckPlan,
+        run: HilltopHost.Sampler.QACheckRun,
+        samples: List[HilltopHost.Sampler.QACheckSample],
+    ) -> Iterator[CheckUnit | BatchUnit]:
+        planned = {test_check: [] for test_check in plan.checks}  # check -> tests in payload order
+        for sample in samples:
+            for test in sample.Tests:
+                for t in test.Tests if test.IsTestSet else [test]:
+                    for test_check in plan.checks_for(t):
+                        planned[test_check].append(t)
+        for test_check, tests in planned.items():
+            yield from self.check_contexts(test_check, run.RunID, tests)
+
+    def check_test_list(self, check: ICheck, tests: List[tuple]) -> Iterator[CheckUnit | BatchUnit]:
+        """
+        Yields the units to check a list of (run_id, test) tuples, batching consecutive tests of the same run.
+        """
+        for run_id, run_tests in groupby(tests, key=itemgetter(0)):
+            yield from self.check_contexts(check, run_id, [t for _, t in run_tests])
+
+    def check_contexts(self, check: ICheck, run_id: int, contexts: list) -> Iterator[CheckUnit | BatchUnit]:
+        """
+        Yields batches of up to execution.batch_size contexts for a check that implements perform_checks_batch,
+        otherwise a unit for each context.
+        """
+        if not check.supports_batch():
+            for context in contexts:
+                yield CheckUnit(check, run_id, context)
+            return
+        batch_size = (self.config.get("execution") or {}).get("batch_size", 500)
+        for i in range(0, len(contexts), batch_size):
+            yield BatchUnit(check, run_id, contexts[i:i + batch_size])
+
+    def log_profile(self, json_file: str | None) -> None:
+        """
+        Logs the per-check profiling summary and optionally writes it to a JSON file.
+        """
+        if not self.profiler.enabled:
+            return
+        for line in self.profiler.summary_lines():
+            HilltopHost.LogInfo(f"sampler_qa_checks_demo - {line}")
+        if json_file:
+            self.profiler.write_json(json_file)
+
+    def configure_lab_test_cache(self) -> None:
+        cache_config = self.config.get("lab_test_cache") or {}
+        lab_test_cache.configure(
+            max_size=cache_config.get("max_size", 5000),
+            ttl_seconds=cache_config.get("ttl_seconds", 24 * 60 * 60),
+        )
+        lab_test_cache.reset_stats()
+
+    def collect_lab_tests(self, window: List[RunSlice]) -> List[tuple]:
+        """
+        Collects the (SampleID, LabTestID) pair of every test in a window, including tests in test sets.
+        """
+        return [(t.SampleID, t.LabTestID) for _, t in iter_tests(window) if not self.is_unchanged(t)]
+
+    def begin_incremental_pass(self, payload: HilltopHost.Sampler.QAChecksPayload, test_checks: List[ICheck]) -> None:
+        """
+        Opens the fingerprint store and finds the tests unchanged since the last pass, if incremental mode is enabled.
+        """
+        incremental = self.config.get("incremental") or {}
+        if not incremental.get("enabled", False):
+            return
+        store_path = incremental.get("store_path")
+        if not store_path:
+            HilltopHost.LogWarning(
+                "sampler_qa_checks_demo - store_path is required for incremental mode, checking all tests"
+            )
+            return
+        config_hash = FingerprintStore.config_hash(
+            [
+                (test_check.__class__.__name__, test_check.config, test_check.state_key())
+                for test_check in test_checks
+                if not test_check.disabled
+            ]
+        )
+        full_rescan = incremental.get("full_rescan", False)
+        self.incremental = IncrementalPass(FingerprintStore(store_path), config_hash, full_rescan)
+        self.incremental.begin(t for _, t in iter_tests(RunSlice(run, run.Samples, True) for run in payload.Runs))
+        HilltopHost.LogInfo(
+            f"sampler_qa_checks_demo - incremental mode skipping {len(self.incremental.unchanged)} unchanged tests"
+            + (" (full rescan)" if full_rescan else "")
+        )
+
+    def commit_incremental_pass(self) -> None:
+        if self.incremental is None:
+            return
+        recorded = self.incremental.commit()
+        HilltopHost.LogInfo(f"sampler_qa_checks_demo - recorded fingerprints for {recorded} tests")
+
+    def is_unchanged(self, test: HilltopHost.Sampler.QACheckLabTest) -> bool:
+        return self.incremental is not None and self.incremental.is_unchanged(test)
+
+    def save_qa_checks(self, qa_checks: List[QACheck]) -> None:
+        self.sink.add(qa_checks)
+        if self.incremental is not None and self.save:
+            self.incremental.add_saved(qa_checks)
+
+    def get_db_pool(self) -> ConnectionPool:
+        """
+        Returns the database connection pool shared across plugin invocations.
+        """
+        db_server = self.config.get("db_server", "localhost")
+        db_name = self.config.get("db_name", "")
+        connection_string = (
+            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+            f"SERVER={db_server};DATABASE={db_name};Trusted_Connection=yes;"
+        )
+        self.connection_string = connection_string
+        pool_config = self.config.get("db_pool") or {}
+        return get_pool(
+            connection_string,
+            lambda: self.open_db_connection(connection_string, db_name),
+            size=pool_config.get("size", 4),
+            idle_timeout=pool_config.get("idle_timeout_seconds", 300),
+        )
+
+    @staticmethod
+    def open_db_connection(connection_string: str, db_name: str) -> pyodbc.Connection:
+        HilltopHost.LogInfo(
+            f"sampler_qa_checks_demo - connecting to database '{db_name}'"
+        )
+        conn = pyodbc.connect(connection_string)
+        cursor = conn.cursor()
+        cursor.execute("SELECT @@version;")
+        result = cursor.fetchone()
+        cursor.close()
+        HilltopHost.LogInfo(f"sampler_qa_checks_demo - connected to database: {result}")
+        return conn
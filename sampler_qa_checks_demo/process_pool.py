@@ -0,0 +1,223 @@
+from typing import Callable, List
+from concurrent.futures import ProcessPoolExecutor
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+
+try:
+    import HilltopHost
+except ImportError:
+    # a worker process started outside the Hilltop host, before anything else has imported HilltopHost
+    from .hilltop_shim import install
+    HilltopHost = install()
+from HilltopHost.Sampler import QACheck, QACheckSeverity
+from . import hilltop_shim, utils
+from .check_pipeline import CheckPipeline
+from .connection_pool import ConnectionPool
+from .payload_snapshot import PayloadSnapshot
+from .profiler import Profiler
+from .repository import Repository
+from .streaming import RunSlice, split_windows
+
+
+def partition_payload(
+    snapshot: PayloadSnapshot, by: str, repository: Repository, skip: Callable | None = None
+) -> List[PayloadSnapshot]:
+    """
+    Splits a payload snapshot into smaller snapshots to check in separate processes.
+
+    Args:
+        snapshot: The payload's snapshot.
+        by: 'run' for a partition per run, or 'site' for a partition per site (the repository's
+            metadata for the samples must already be prefetched).
+        repository: Used to find the site of each sample.
+        skip: Optionally returns True for lab tests to leave out of the partitions.
+    """
+    if by != "site":
+        return [PayloadSnapshot([run_slice], skip) for run_slice in snapshot.slices()]
+    partitions = {}  # site -> [RunSlice]
+    for run, samples, _ in snapshot.slices():
+        by_site = {}
+        for sample in samples:
+            by_site.setdefault(_site(sample, repository), []).append(sample)
+        for index, (site, site_samples) in enumerate(by_site.items()):
+            # the run checks go with the run's first site
+            partitions.setdefault(site, []).append(RunSlice(run, site_samples, index == 0))
+        if not by_site:
+            partitions.setdefault("", []).append(RunSlice(run, [], True))
+    return [PayloadSnapshot(slices, skip) for slices in partitions.values()]
+
+
+def _site(sample, repository: Repository) -> str:
+    for test in sample.Tests:
+        for t in test.Tests if test.IsTestSet else [test]:
+            metadata = repository.get_sample_metadata(t.SampleID, t.LabTestID)
+            if metadata is not None:
+                return metadata["SiteName"]
+    return ""
+
+
+def qa_check_from_record(record: dict) -> QACheck:
+    """
+    Rebuilds a QA check returned by a worker, resolving its severity by name.
+    """
+    qa_check = QACheck()
+    for name, value in record.items():
+        if value is not None:  # left unset, as on a QA check built by a check
+            setattr(qa_check, name, value)
+    if isinstance(record["Severity"], str):
+        qa_check.Severity = getattr(QACheckSeverity, record["Severity"])
+    return qa_check
+
+
+class RecordSink:
+    """
+    Collects the QA checks raised in a worker as records for the parent process to save.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, qa_checks) -> None:
+        for qa_check in qa_checks or []:
+            self.records.append(utils.qa_check_record(qa_check))
+
+
+# the worker process's plugin and pipeline, created by init_worker
+_worker = None
+
+
+def init_worker(plugin_path: str, config: dict, version: str, connection_string: str, db_name: str) -> None:
+    """
+    Builds the worker's own connection pool, Hilltop file handles and check pipeline.
+
+    Args:
+        plugin_path: The plugin class as 'module:qualname'. It is passed by name and imported here, after this
+            module has installed the HilltopHost shim, rather than unpickled with the arguments, which would
+            import the plugin's module before the shim if it were unpickled first.
+    """
+    global _worker
+    module_name, _, class_name = plugin_path.partition(":")
+    plugin_class = importlib.import_module(module_name)
+    for name in class_name.split("."):
+        plugin_class = getattr(plugin_class, name)
+    pool_config = config.get("db_pool") or {}
+    pool = ConnectionPool(
+        lambda: plugin_class.open_db_connection(connection_string, db_name),
+        size=pool_config.get("size", 4),
+        idle_timeout=pool_config.get("idle_timeout_seconds", 300),
+    )
+    plugin = plugin_class()
+    plugin.config = config
+    plugin.save = False
+    plugin.incremental = None
+    _worker = (plugin, CheckPipeline(config, version, pool))
+    hilltop_shim.drain_log()  # the checks' start-up messages were already logged by the parent
+
+
+def run_partition(snapshot: PayloadSnapshot, lab_test_version: tuple | None = None, metadata: tuple | None = None) -> tuple:
+    """
+    Performs the checks for a partition in a worker process.
+
+    Args:
+        snapshot: The partition.
+        lab_test_version: The LabTests/Tests version the parent validated its lab test cache against, if any.
+        metadata: The partition's sample metadata from the parent's `Repository.export_sample_metadata`, if the
+            parent has already loaded it.
+
+    Returns:
+        tuple: (QA check records, log messages, exported profiler figures)
+    """
+    plugin, pipeline = _worker
+    profiling = plugin.config.get("profiling") or {}
+    execution = plugin.config.get("execution") or {}
+    plugin.profiler = Profiler(profiling.get("enabled", False))
+    plugin.sink = RecordSink()
+    with pipeline.lock:
+        pipeline.begin_run(plugin.profiler)
+        plugin.configure_lab_test_cache()
+        pipeline.repository.validate_lab_test_cache(lab_test_version)
+        if metadata is not None:
+            pipeline.repository.load_sample_metadata(metadata)
+        plugin.run_windows(split_windows(snapshot.slices(), execution.get("window_size", 10000)), pipeline)
+    return plugin.sink.records, hilltop_shim.drain_log(), plugin.profiler.export()
+
+
+class ProcessRunner:
+    """
+    Performs the checks for payload partitions on a pool of worker processes.
+
+    Partitions are sent to the workers as payload snapshots. Workers are started once and reused by later
+    plugin invocations while the configuration is unchanged. Each builds its own pipeline, database connections
+    and Hilltop data file handles, and returns its QA checks as records that the parent process rebuilds and saves.
+    """
+
+    def __init__(self, pool: ProcessPoolExecutor, key: tuple):
+        self.pool = pool
+        self.key = key
+
+    def run(
+        self, partitions: List[PayloadSnapshot], lab_test_version: tuple | None = None, metadata: List[tuple] | None = None
+    ):
+        """
+        Yields (QA checks, log messages, exported profiler figures) for each partition, in partition order.
+
+        Args:
+            partitions: The partitions to check.
+            lab_test_version: The version the parent's lab test cache was validated against, so the workers don't
+                query it again.
+            metadata: Optionally, each partition's prefetched sample metadata (see `run_partition`).
+        """
+        versions = [lab_test_version] * len(partitions)
+        metadata = metadata or [None] * len(partitions)
+        for records, log, profile in self.pool.map(run_partition, partitions, versions, metadata):
+            yield [qa_check_from_record(record) for record in records], log, profile
+
+
+def discard_runner() -> None:
+    """
+    Stops the shared worker processes, e.g. after a worker has failed, so the next invocation starts new ones.
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is not None:
+            _runner.pool.shutdown(wait=False, cancel_futures=True)
+            _runner = None
+
+
+_runner: ProcessRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def get_runner(
+    plugin_class, config: dict, version: str, connection_string: str, db_name: str, processes: int, executable: str | None
+) -> ProcessRunner:
+    """
+    Returns the shared process runner, starting new workers if the configuration or process count has changed.
+    """
+    global _runner
+    key = (version, connection_string, processes, executable)
+    with _runner_lock:
+        if _runner is not None and _runner.key == key:
+            return _runner
+        if _runner is not None:
+            _runner.pool.shutdown(wait=False, cancel_futures=True)
+        context = multiprocessing.get_context("spawn")
+        if executable:
+            context.set_executable(executable)  # the host's own executable can't start Python workers
+        os.environ[hilltop_shim.ENVIRONMENT_VARIABLE] = hilltop_shim.describe_host()
+        pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(f"{plugin_class.__module__}:{plugin_class.__qualname__}", config, version, connection_string, db_name),
+        )
+        HilltopHost.LogInfo(f"sampler_qa_checks_demo - started {processes} worker processes")
+        _runner = ProcessRunner(pool, key)
+        return _runner
+
+
+# stop the worker processes when the Hilltop host process shuts down
+atexit.register(discard_runner)
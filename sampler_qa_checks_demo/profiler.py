@@ -0,0 +1,181 @@
+from typing import List
+import json
+import threading
+
+
+class Profiler:
+    """
+    Collects per-check call counts, latencies and emitted QA check counts, the time spent in the
+    plugin's own phases such as planning and prefetching, and named counters such as database queries
+    and Hilltop calls, for one plugin invocation.
+
+    A disabled profiler ignores everything it is given so it can always be called.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.timings = {}  # check name -> [seconds]
+        self.emitted = {}  # check name -> number of QA checks
+        self.phases = {}  # phase name -> [seconds]
+        self.counters = {}  # counter name -> count
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, emitted: int = 0) -> None:
+        """
+        Records one call of a check.
+
+        Args:
+            name (str): The check class name.
+            seconds (float): How long the call took.
+            emitted (int): Number of QA checks the call returned.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.timings.setdefault(name, []).append(seconds)
+            self.emitted[name] = self.emitted.get(name, 0) + emitted
+
+    def phase(self, name: str, seconds: float) -> None:
+        """
+        Records one pass of a plugin phase that isn't a check, such as planning a window.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.phases.setdefault(name, []).append(seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def export(self) -> tuple:
+        """
+        Returns the collected figures in a picklable form that `merge` accepts, e.g. to return them from a worker process.
+        """
+        with self._lock:
+            return dict(self.timings), dict(self.emitted), dict(self.phases), dict(self.counters)
+
+    def merge(self, exported: tuple) -> None:
+        """
+        Adds figures exported by another profiler to this one.
+        """
+        if not self.enabled:
+            return
+        timings, emitted, phases, counters = exported
+        with self._lock:
+            for name, seconds in timings.items():
+                self.timings.setdefault(name, []).extend(seconds)
+            for name, n in emitted.items():
+                self.emitted[name] = self.emitted.get(name, 0) + n
+            for name, seconds in phases.items():
+                self.phases.setdefault(name, []).extend(seconds)
+            for name, n in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        checks = {}
+        for name, timings in self.timings.items():
+            ordered = sorted(timings)
+            checks[name] = {
+                "calls": len(ordered),
+                "total_seconds": sum(ordered),
+                "p50_ms": self.percentile(ordered, 50) * 1000,
+                "p95_ms": self.percentile(ordered, 95) * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "emitted": self.emitted.get(name, 0),
+            }
+        phases = {
+            name: {"calls": len(timings), "total_seconds": sum(timings)} for name, timings in self.phases.items()
+        }
+        return {"checks": checks, "phases": phases, "counters": dict(self.counters)}
+
+    def summary_lines(self) -> List[str]:
+        """
+        Formats the collected figures as a table, one line per check followed by the phases and counters.
+        """
+        data = self.to_dict()
+        lines = [
+            f"{'check':<24}{'calls':>8}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'emitted':>9}"
+        ]
+        for name, c in sorted(data["checks"].items(), key=lambda item: -item[1]["total_seconds"]):
+            lines.append(
+                f"{name:<24}{c['calls']:>8}{c['total_seconds']:>10.3f}{c['p50_ms']:>10.2f}"
+                f"{c['p95_ms']:>10.2f}{c['max_ms']:>10.2f}{c['emitted']:>9}"
+            )
+        if data["phases"]:
+            lines.append(f"{'phase':<24}{'calls':>8}{'total s':>10}")
+            for name, p in sorted(data["phases"].items(), key=lambda item: -item[1]["total_seconds"]):
+                lines.append(f"{name:<24}{p['calls']:>8}{p['total_seconds']:>10.3f}")
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"{name:<24}{value:>8}")
+        return lines
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @staticmethod
+    def percentile(ordered: List[float], percent: int) -> float:
+        """
+        Returns the nearest-rank percentile of an already sorted list.
+        """
+        if not ordered:
+            return 0.0
+        rank = max(1, -(-len(ordered) * percent // 100))
+        return ordered[rank - 1]
+
+
+class CheckCosts:
+    """
+    Estimated seconds per run, sample or lab test for each check, measured as checks are performed.
+
+    Each estimate is the average over the check's measured calls, weighted by the contexts they were
+    given, so a single cold first call doesn't fix it. Once a check has been measured over
+    `max_contexts` contexts its totals are halved, so the estimate follows changes such as a history
+    cache warming up. The totals are kept with the pipeline between plugin calls.
+    """
+
+    max_contexts = 10000
+
+    def __init__(self):
+        self.totals = {}  # check name -> [seconds, contexts]
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, contexts: int) -> None:
+        """
+        Records one call of a check that was given `contexts` runs, samples or lab tests.
+        """
+        if contexts <= 0:
+            return
+        with self._lock:
+            totals = self.totals.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += contexts
+            if totals[1] > self.max_contexts:
+                totals[0] /= 2
+                totals[1] /= 2
+
+    def estimate(self, name: str) -> float | None:
+        """
+        Returns the estimated seconds per context for a check, or None if it hasn't been measured.
+        """
+        totals = self.totals.get(name)
+        return None if totals is None else totals[0] / totals[1]
+
+    def export(self) -> dict:
+        """
+        Returns the totals in a JSON-serialisable form that `seed` accepts.
+        """
+        with self._lock:
+            return {name: list(totals) for name, totals in self.totals.items()}
+
+    def seed(self, totals: dict) -> None:
+        """
+        Adds totals saved by an earlier process for the checks not measured in this one.
+        """
+        with self._lock:
+            for name, value in totals.items():
+                if isinstance(value, list) and len(value) == 2 and value[1] > 0:
+                    self.totals.setdefault(name, [float(value[0]), value[1]])
@@ -1,92 +1,419 @@
+from types import MappingProxyType
+from typing import Iterable, Mapping, Tuple
+import xml.etree.ElementTree as ET
 import HilltopHost
+from . import utils
+from .cache import LRUCache
+from .connection_pool import ConnectionPool
+from .profiler import Profiler
+
+
+# SampleInfo is shredded once per sample, giving a row for each of its tests (including tests in
+# test sets), and the shredded TestID is joined to LabTests as a plain column
+SAMPLE_METADATA_QUERY = """
+WITH SampleTests AS (
+    SELECT
+        smp.SampleID,
+        x.testElement.value('@ID', 'INT') AS TestID,
+        x.testElement.value('Value[1]', 'varchar(30)') AS TestValue -- Extract the <Value> element
+    FROM
+        Samples smp
+        CROSS APPLY smp.SampleInfo.nodes('(SampleInfo/Test, SampleInfo/TestSet/Test)') AS x(testElement)
+    WHERE
+        {where}
+)
+SELECT
+    l.LabName,
+    t.TestName,
+    m.MeasurementName,
+    m.Units,
+    m.Divisor,
+    stt.TestValue,
+    smp.SampleID,
+    smp.SiteID,
+    st.SiteName COLLATE SQL_Latin1_General_CP1_CI_AS AS SiteName,
+    r.RunID,
+    r.RunName,
+    r.RunDate,
+    COALESCE(sp.SampleTypeCode, p.SampleTypeCode) AS SampleTypeCode,
+    COALESCE(sp.ProjectID, p.ProjectID) AS ProjectID,
+    COALESCE(sp.ProjectName, p.ProjectName) AS ProjectName,
+    stt.TestID,
+    lt.LabTestName,
+    lt.LabMethod,
+    lt.LabTestID
+FROM
+    SampleTests stt
+    JOIN Samples smp ON smp.SampleID = stt.SampleID
+    JOIN LabTests lt ON lt.LabTestID = stt.TestID
+    JOIN Labs l ON l.LabID = lt.LabID
+    JOIN Tests t ON lt.TestID = t.TestID
+    JOIN Measurements m ON t.HilltopMeasurementID = m.MeasurementID
+    JOIN Sites st ON smp.SiteID = st.SiteID
+    JOIN Runs r ON smp.RunID = r.RunID
+    LEFT JOIN Projects p ON r.ProjectID = p.ProjectID -- Left join in case ProjectID is present only in Sample
+    LEFT JOIN Projects sp ON smp.ProjectID = sp.ProjectID -- Join to handle Project from Sample
+"""
+
+# The full XML of each test element, only read when a check asks for it
+TEST_INFO_QUERY = """
+SELECT
+    smp.SampleID,
+    x.testElement.value('@ID', 'INT') AS TestID,
+    x.testElement.query('.') AS TestInfo
+FROM
+    Samples smp
+    CROSS APPLY smp.SampleInfo.nodes('(SampleInfo/Test, SampleInfo/TestSet/Test)') AS x(testElement)
+WHERE
+    {where}
+"""
+
+MEASUREMENT_QUERY = """
+SELECT
+    lt.LabTestName,
+    lt.LabMethod,
+    lt.LabTestID,
+    l.LabName,
+    t.TestName,
+    m.MeasurementName
+FROM
+    LabTests lt
+    JOIN Labs l ON l.LabID = lt.LabID
+    JOIN Tests t ON lt.TestID = t.TestID
+    JOIN Measurements m ON t.HilltopMeasurementID = m.MeasurementID
+WHERE
+    {where}
+"""
+
+# Cheap probe used to detect changes to the lab test to measurement mapping, covering every
+# MEASUREMENT_COLUMNS value the lab test cache holds, including the lab, test and measurement names
+LAB_TEST_VERSION_QUERY = """
+SELECT
+    COUNT_BIG(*),
+    CHECKSUM_AGG(BINARY_CHECKSUM(
+        lt.LabTestID, lt.LabID, lt.TestID, lt.LabTestName, lt.LabMethod, t.HilltopMeasurementID,
+        l.LabName, t.TestName, m.MeasurementName
+    ))
+FROM
+    LabTests lt
+    JOIN Labs l ON l.LabID = lt.LabID
+    JOIN Tests t ON lt.TestID = t.TestID
+    JOIN Measurements m ON t.HilltopMeasurementID = m.MeasurementID
+"""
+
+MEASUREMENT_COLUMNS = (
+    "LabTestName",
+    "LabMethod",
+    "LabTestID",
+    "LabName",
+    "TestName",
+    "MeasurementName",
+)
+
+# the parameters of a lab test without TestInfo
+NO_PARAMETERS = MappingProxyType({})
+
+# LabTestID -> measurement lookup, shared across plugin invocations in the host process
+lab_test_cache = LRUCache(max_size=5000, ttl_seconds=24 * 60 * 60)
 
 
 class Repository:
+    """
+    Data access for the Hilltop metadata database.
+
+    Per-test lookups can be served from an in-memory result loaded for a whole
+    payload with `prefetch()`, which uses a handful of set-based queries instead
+    of one round trip per lab test. Measurement lookups are also kept in the
+    process-lifetime `lab_test_cache`, which is invalidated by `validate_lab_test_cache()`.
+    The TestInfo XML of each test is left out of the metadata and read per sample by `get_test_info()`,
+    and `get_test_parameters()` parses it at most once per (SampleID, LabTestID) into a bounded cache.
+
+    Each query checks a connection out of the shared `ConnectionPool` and returns it afterwards,
+    so worker threads never share a pyodbc connection.
+    """
+
+    # SQL Server allows at most 2100 parameters per statement
+    prefetch_chunk_size = 500
+
+    def __init__(self, pool: ConnectionPool, test_info_cache_size: int = 10000):
+        self.pool = pool
+        self.profiler = Profiler()
+        self._sample_metadata = {}  # (SampleID, LabTestID) -> dict or None
+        self._test_info = {}  # (SampleID, LabTestID) -> TestInfo XML or None
+        self._test_parameters = LRUCache(max_size=test_info_cache_size)  # (SampleID, LabTestID) -> parameters
+        self._test_info_samples = set()  # SampleIDs whose TestInfo has been read for every test
+        self._loaded_samples = set()  # SampleIDs whose metadata has been read for every test
+        self._missing_lab_tests = set()  # LabTestIDs known not to have a measurement
+        self.lab_test_version = None  # the LabTests/Tests version the lab test cache was last validated against
+
+    def begin_run(self) -> None:
+        """
+        Discards the sample metadata prefetched for the previous payload.
+        """
+        self._sample_metadata = {}
+        self._test_info = {}
+        self._test_parameters.clear()
+        self._test_info_samples = set()
+        self._loaded_samples = set()
+        self._missing_lab_tests = set()
+
+    def validate_lab_test_cache(self, version: tuple | None = None) -> None:
+        """
+        Discards the shared lab test cache if the lab tests or their lab, test or measurement names have changed
+        since it was filled.
+
+        Args:
+            version: The mapping's version if it has just been read, e.g. by the parent of a worker process,
+                otherwise it is queried. The version is kept in `lab_test_version`.
+        """
+        if version is not None:
+            self.lab_test_version = version
+            if not lab_test_cache.validate(version):
+                HilltopHost.LogInfo("sampler_qa_checks_demo - lab test cache invalidated")
+            return
+        self.lab_test_version = None
+        try:
+            with self.pool.connection() as connection, connection.cursor() as cursor:
+                self.profiler.count("db_queries")
+                cursor.execute(LAB_TEST_VERSION_QUERY)
+                version = tuple(cursor.fetchone())
+        except Exception as e:
+            HilltopHost.LogError(f"sampler_qa_checks_demo - Error occurred: {str(e)}")
+            lab_test_cache.clear()
+            return
+        self.validate_lab_test_cache(version)
+
+    def prefetch(self, lab_tests: Iterable[Tuple[int, int]]) -> None:
+        """
+        Loads sample metadata and measurements for every (SampleID, LabTestID) pair in one pass.
+
+        Pairs that are not found are remembered as missing so the per-test lookups
+        don't query for them again.
+
+        Args:
+            lab_tests: (SampleID, LabTestID) pairs, e.g. every test in a QAChecksPayload.
+        """
+        pairs = set(lab_tests)
+        if not pairs:
+            return
+        try:
+            for chunk in self.sample_chunks(pairs):
+                self.fetch_sample_metadata(chunk)
+            missing = set()
+            for chunk in self.measurement_chunks(pairs):
+                missing.update(self.fetch_measurements(chunk))
+        except Exception as e:
+            HilltopHost.LogError(f"sampler_qa_checks_demo - Error occurred during prefetch: {str(e)}")
+            return
+        self.complete_prefetch(pairs, missing)
+
+    def sample_chunks(self, pairs: set) -> list:
+        """
+        Splits the samples of the (SampleID, LabTestID) pairs whose metadata isn't loaded yet into chunks
+        of one metadata query each.
+        """
+        return list(self._chunks(sorted({sample_id for sample_id, _ in pairs} - self._loaded_samples)))
 
-    def __init__(self, connection):
-        self.connection = connection
+    def measurement_chunks(self, pairs: set) -> list:
+        """
+        Splits the lab tests of the pairs that aren't in the lab test cache into chunks of one measurement
+        query each. Call it once the sample metadata is loaded, since that fills the cache.
+        """
+        lab_test_ids = {lab_test_id for _, lab_test_id in pairs}
+        return list(self._chunks(sorted(i for i in lab_test_ids if lab_test_cache.peek(i) is None)))
+
+    def fetch_measurements(self, lab_test_ids: list) -> set:
+        """
+        Loads the measurements for lab tests into the lab test cache.
+
+        Returns:
+            set: The LabTestIDs that don't have a measurement.
+        """
+        missing = set(lab_test_ids)
+        where = f"lt.LabTestID IN ({', '.join('?' * len(lab_test_ids))})"
+        for row in self._fetch_all(MEASUREMENT_QUERY.format(where=where), lab_test_ids):
+            lab_test_cache.put(row["LabTestID"], row)
+            missing.discard(row["LabTestID"])
+        return missing
+
+    def complete_prefetch(self, pairs: set, missing: set) -> None:
+        """
+        Remembers the pairs and lab tests that weren't found so per-test lookups don't query for them again.
+        """
+        for pair in pairs:
+            self._sample_metadata.setdefault(pair, None)
+        self._missing_lab_tests.update(missing)
+        HilltopHost.LogInfo(
+            f"sampler_qa_checks_demo - prefetched metadata for {len({sample_id for sample_id, _ in pairs})} samples "
+            f"and {len({lab_test_id for _, lab_test_id in pairs})} lab tests"
+        )
+
+    def export_sample_metadata(self, sample_ids: Iterable[int]) -> tuple:
+        """
+        Returns the loaded metadata of samples, to load into another repository with `load_sample_metadata`,
+        e.g. a worker process's.
+
+        Returns:
+            tuple: (metadata rows, SampleIDs whose metadata is loaded, LabTestIDs without a measurement)
+        """
+        loaded = set(sample_ids) & self._loaded_samples
+        rows = [row for (sample_id, _), row in self._sample_metadata.items() if row is not None and sample_id in loaded]
+        return rows, loaded, set(self._missing_lab_tests)
+
+    def load_sample_metadata(self, metadata: tuple) -> None:
+        """
+        Loads sample metadata returned by another repository's `export_sample_metadata`, so it isn't queried again.
+        """
+        rows, loaded, missing = metadata
+        for row in rows:
+            self._cache_sample_metadata(row)
+        self._loaded_samples.update(loaded)
+        self._missing_lab_tests.update(missing)
+
+    def evict(self, lab_tests: Iterable[Tuple[int, int]]) -> None:
+        """
+        Drops the prefetched sample metadata for (SampleID, LabTestID) pairs that have been checked,
+        so a streamed payload only holds metadata for the window being checked.
+        """
+        for pair in lab_tests:
+            self._sample_metadata.pop(pair, None)
+            self._test_info.pop(pair, None)
+            self._test_info_samples.discard(pair[0])
+            self._loaded_samples.discard(pair[0])
+
+    def prefetch_measurements(self, lab_test_ids: Iterable[int]) -> None:
+        """
+        Loads the measurements of lab tests that aren't in the lab test cache, without reading sample metadata.
+        """
+        lab_test_ids = {i for i in lab_test_ids if i not in self._missing_lab_tests}
+        try:
+            for chunk in self._chunks(sorted(i for i in lab_test_ids if lab_test_cache.peek(i) is None)):
+                self._missing_lab_tests.update(self.fetch_measurements(chunk))
+        except Exception as e:
+            HilltopHost.LogError(f"sampler_qa_checks_demo - Error occurred during prefetch: {str(e)}")
+
+    def cached_measurement(self, lab_test_id) -> dict | None:
+        """
+        Returns the measurement for a lab test if it is already known, without querying the database.
+        """
+        if lab_test_id in self._missing_lab_tests:
+            return
+        return lab_test_cache.peek(lab_test_id)
+
+    def is_missing_lab_test(self, lab_test_id) -> bool:
+        return lab_test_id in self._missing_lab_tests
+
+    def cached_sample_metadata(self, sample_id, lab_test_id) -> dict | None:
+        """
+        Returns the metadata for a lab test in a sample if it has already been read, without querying the database.
+        """
+        return self._sample_metadata.get((sample_id, lab_test_id))
 
     def get_sample_metadata(self, sample_id, lab_test_id) -> dict:
+        """
+        Returns the metadata for a lab test in a sample. If it wasn't prefetched, the metadata for every
+        test in the sample is loaded, since the sample's other tests are usually checked next.
+        """
+        key = (sample_id, lab_test_id)
+        if key in self._sample_metadata or sample_id in self._loaded_samples:
+            return self._sample_metadata.get(key)
+        try:
+            self.fetch_sample_metadata([sample_id])
+        except Exception as e:
+            HilltopHost.LogError(f"sampler_qa_checks_demo - Error occurred: {str(e)}")
+            return
+        return self._sample_metadata.setdefault(key, None)
+
+    def get_test_info(self, sample_id, lab_test_id) -> str:
+        """
+        Returns the TestInfo XML (the sample's <Test> element) for a lab test in a sample.
+
+        TestInfo isn't part of the sample metadata, so it is only read for checks that need it.
+        The first lookup for a sample reads the elements for all of its tests.
+        """
+        key = (sample_id, lab_test_id)
+        if key in self._test_info or sample_id in self._test_info_samples:
+            return self._test_info.get(key)
         try:
-            with self.connection.cursor() as cursor:
-                query = """
-                SELECT
-                    l.LabName,
-                    t.TestName,
-                    m.MeasurementName,
-                    m.Units,
-                    m.Divisor,
-                    x.testElement.value('Value[1]', 'varchar(30)') AS TestValue, -- Extract the <Value> element
-                    smp.SampleID,
-                    smp.SiteID,
-                    st.SiteName COLLATE SQL_Latin1_General_CP1_CI_AS AS SiteName,
-                    r.RunID,
-                    r.RunName,
-                    r.RunDate,
-                    COALESCE(sp.SampleTypeCode, p.SampleTypeCode) AS SampleTypeCode,
-                    COALESCE(sp.ProjectID, p.ProjectID) AS ProjectID,
-                    COALESCE(sp.ProjectName, p.ProjectName) AS ProjectName,
-                    smp.SampleInfo,
-                    x.testElement.query('.') AS TestInfo, -- Include the full XML of the test element
-                    x.testElement.value('@ID', 'INT') as TestID,
-                    lt.LabTestName,
-                    lt.LabMethod,
-                    lt.LabTestID
-                FROM
-                    Samples smp
-                    OUTER APPLY SampleInfo.nodes('(SampleInfo/Test, SampleInfo/TestSet/Test)') AS x(testElement)
-                    JOIN LabTests lt ON lt.LabTestID = x.testElement.value('@ID', 'INT') -- Joining on the extracted Test ID--
-                    JOIN Labs l ON l.LabID = lt.LabID
-                    JOIN Tests t ON lt.TestID = t.TestID
-                    JOIN Measurements m ON t.HilltopMeasurementID = m.MeasurementID
-                    JOIN Sites st ON smp.SiteID = st.SiteID
-                    JOIN Runs r ON smp.RunID = r.RunID
-                    LEFT JOIN Projects p ON r.ProjectID = p.ProjectID -- Left join in case ProjectID is present only in Sample
-                    LEFT JOIN Projects sp ON smp.ProjectID = sp.ProjectID -- Join to handle Project from Sample
-                WHERE
-                    smp.SampleID = ?
-                    AND lt.LabTestID = ?
-                """
-                cursor.execute(query, sample_id, lab_test_id)
-                row = cursor.fetchone()
-                if row is None:
-                    return
-
-                column_names = [
-                    column[0] for column in cursor.description
-                ]  # Extract column names
-                result_dict = dict(zip(column_names, row))  # Map column names to values
-                return result_dict
+            rows = self._fetch_all(TEST_INFO_QUERY.format(where="smp.SampleID = ?"), (sample_id,))
         except Exception as e:
             HilltopHost.LogError(f"sampler_qa_checks_demo - Error occurred: {str(e)}")
+            return
+        for row in rows:
+            self._test_info[(row["SampleID"], row["TestID"])] = row["TestInfo"]
+        self._test_info_samples.add(sample_id)
+        return self._test_info.get(key)
+
+    def get_test_parameters(self, sample_id, lab_test_id) -> Mapping[str, str]:
+        """
+        Returns the TestInfo parameters of a lab test in a sample as a read-only name -> value mapping.
+
+        TestInfo is read on first use and parsed once per lab test for the rest of the run, so checks
+        that read several parameters of a test share one parse. Missing or malformed TestInfo gives
+        an empty mapping. TestInfo that couldn't be read also gives an empty mapping, but isn't cached,
+        so the next call reads it again.
+        """
+        key = (sample_id, lab_test_id)
+        parameters = self._test_parameters.get(key)
+        if parameters is not None:
+            return parameters
+        xml = self.get_test_info(sample_id, lab_test_id)
+        if xml is None and key not in self._test_info and sample_id not in self._test_info_samples:
+            return NO_PARAMETERS  # the read failed
+        parameters = NO_PARAMETERS
+        if xml:
+            try:
+                parameters = utils.parse_test_info_parameters(xml)
+            except ET.ParseError as e:
+                HilltopHost.LogWarning(
+                    f"sampler_qa_checks_demo - TestInfo for sample {sample_id}, lab test {lab_test_id} not parsed: {e}"
+                )
+        self._test_parameters.put(key, parameters)
+        return parameters
 
     def get_measurement_by_lab_test_id(self, lab_test_id) -> dict:
+        if lab_test_id in self._missing_lab_tests:
+            return
+        measurement = lab_test_cache.get(lab_test_id)
+        if measurement is not None:
+            return measurement
         try:
-            with self.connection.cursor() as cursor:
-                query = """
-                SELECT
-                    lt.LabTestName,
-                    lt.LabMethod,
-                    lt.LabTestID,
-                    l.LabName,
-                    t.TestName,
-                    m.MeasurementName
-                FROM
-                    LabTests lt
-                    JOIN Labs l ON l.LabID = lt.LabID
-                    JOIN Tests t ON lt.TestID = t.TestID
-                    JOIN Measurements m ON t.HilltopMeasurementID = m.MeasurementID
-                WHERE
-                    lt.LabTestID = ?
-                        """
-                cursor.execute(query, lab_test_id)
-                row = cursor.fetchone()
-                if row is None:
-                    return
-                column_names = [
-                    column[0] for column in cursor.description
-                ]  # Extract column names
-                result_dict = dict(zip(column_names, row))  # Map column names to values
-                return result_dict
+            rows = self._fetch_all(
+                MEASUREMENT_QUERY.format(where="lt.LabTestID = ?"), (lab_test_id,), limit=1
+            )
+            if not rows:
+                return
+            lab_test_cache.put(lab_test_id, rows[0])
+            return rows[0]
         except Exception as e:
             HilltopHost.LogError(f"sampler_qa_checks_demo - Error occurred: {str(e)}")
+
+    def fetch_sample_metadata(self, sample_ids: list) -> None:
+        """
+        Loads the metadata for every test of the samples.
+        """
+        where = f"smp.SampleID IN ({', '.join('?' * len(sample_ids))})"
+        for row in self._fetch_all(SAMPLE_METADATA_QUERY.format(where=where), sample_ids):
+            self._cache_sample_metadata(row)
+        self._loaded_samples.update(sample_ids)
+
+    def _cache_sample_metadata(self, row: dict) -> None:
+        self._sample_metadata[(row["SampleID"], row["LabTestID"])] = row
+        # the sample metadata query already joins everything the measurement lookup needs
+        lab_test_cache.put(
+            row["LabTestID"], {column: row[column] for column in MEASUREMENT_COLUMNS}
+        )
+
+    def _fetch_all(self, query, params, limit=None) -> list:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            self.profiler.count("db_queries")
+            cursor.execute(query, *params)
+            rows = cursor.fetchall() if limit is None else cursor.fetchmany(limit)
+            column_names = [
+                column[0] for column in cursor.description
+            ]  # Extract column names
+            return [dict(zip(column_names, row)) for row in rows]  # Map column names to values
+
+    def _chunks(self, values: list):
+        for i in range(0, len(values), self.prefetch_chunk_size):
+            yield values[i:i + self.prefetch_chunk_size]
@@ -0,0 +1,210 @@
+"""
+Time-budgeted test checks.
+
+With execution.time_budget_seconds set, a plugin call performs its run and sample checks, then its test
+checks cheapest first until the budget is spent. `CheckScheduler` ranks the test checks by their measured
+cost per lab test and holds back the units that don't fit in the time left; `CheckBacklog` keeps those
+in a JSON file, and the next call performs them ahead of the other tests of the same check.
+"""
+from typing import Dict, Iterator, List, NamedTuple
+import json
+import math
+import os
+import time
+
+import HilltopHost
+from .checks.i_check import ICheck
+from .executor import BatchUnit, CheckUnit
+from .fingerprint_store import FingerprintStore
+from .payload_snapshot import TestResult, labels_of
+from .profiler import CheckCosts
+from .repository import Repository
+
+
+class DeferredTest(NamedTuple):
+    """
+    A lab test read back from the backlog, with the attributes the test checks read.
+    """
+
+    SampleID: int
+    LabTestID: int
+    Result: TestResult | None
+    Labels: frozenset
+    IsTestSet: bool = False
+    Tests: tuple = ()
+
+
+class CheckScheduler:
+    """
+    Orders test check units cheapest check first and holds back those that don't fit in the time budget.
+
+    A check that hasn't been measured yet is first probed with a single lab test so it can be ranked.
+    Each unit is then performed if its estimated cost fits in the time left before the deadline, and a
+    batch that only partly fits is cut down to the tests that do. The rest are kept in `deferred`.
+    Every check with pending work is given at least one lab test per call, its probe or the first test
+    of its first unit, and the backlog's tests come first, so each call makes progress on the oldest
+    deferred tests of every check, however expensive the check is or however little of the budget is
+    left. With worker threads, the units already queued for the pool can also run past the deadline.
+    """
+
+    def __init__(self, costs: CheckCosts, deadline: float, repository: Repository):
+        """
+        Args:
+            costs: The measured cost of each check, updated as the units are performed.
+            deadline: The time.perf_counter() value by which the checks should be finished.
+            repository: Used to prefetch the sample metadata of the units that are performed.
+        """
+        self.costs = costs
+        self.deadline = deadline
+        self.repository = repository
+        self.deferred: List[CheckUnit | BatchUnit] = []
+        self.performed = 0  # lab tests passed to a check
+        self.started = set()  # checks that have been given a lab test this call
+        self.prefetched = []  # (SampleID, LabTestID) pairs whose sample metadata was prefetched
+
+    def schedule(self, pending: Dict[ICheck, list]) -> Iterator[CheckUnit | BatchUnit]:
+        """
+        Yields the units to perform, taking them from `pending`, which maps each check to its units in the
+        order they should be performed.
+        """
+        for check, units in pending.items():
+            if units and self.estimate(check) is None and time.perf_counter() < self.deadline:
+                probe, rest = split_unit(units[0], 1)
+                units[0:1] = [rest] if rest is not None else []
+                self.started.add(check)
+                yield self.prepare(probe)
+        for check in sorted(pending, key=self.rank):
+            for unit in pending[check]:
+                count = self.fitting(check, len(unit.contexts))
+                if check not in self.started:
+                    self.started.add(check)
+                    count = max(1, count)
+                head, rest = split_unit(unit, count)
+                if head is not None:
+                    yield self.prepare(head)
+                if rest is not None:
+                    self.deferred.append(rest)
+
+    def estimate(self, check: ICheck) -> float | None:
+        return self.costs.estimate(check.__class__.__name__)
+
+    def rank(self, check: ICheck) -> float:
+        cost = self.estimate(check)
+        return math.inf if cost is None else cost
+
+    def fitting(self, check: ICheck, size: int) -> int:
+        """
+        Returns how many of `size` lab tests the check can be given in the time left.
+        """
+        remaining = self.deadline - time.perf_counter()
+        if remaining <= 0:
+            return 0
+        cost = self.estimate(check)
+        if cost is None:  # a probe still running on a worker thread
+            return 1
+        if cost <= 0:
+            return size
+        return min(size, int(remaining / cost))
+
+    def prepare(self, unit: CheckUnit | BatchUnit) -> CheckUnit | BatchUnit:
+        """
+        Prefetches the sample metadata a unit's tests need just before the unit is performed.
+        """
+        if unit.check.uses_sample_metadata:
+            lab_tests = [(t.SampleID, t.LabTestID) for t in unit.contexts]
+            self.repository.prefetch(lab_tests)
+            self.prefetched.extend(lab_tests)
+        self.performed += len(unit.contexts)
+        return unit
+
+
+def split_unit(unit: CheckUnit | BatchUnit, count: int) -> tuple:
+    """
+    Splits a unit into one for its first `count` contexts and one for the rest; either is None if empty.
+    """
+    if isinstance(unit, CheckUnit):
+        return (unit, None) if count > 0 else (None, unit)
+    head = BatchUnit(unit.check, unit.run_id, unit.contexts[:count]) if count > 0 else None
+    rest = BatchUnit(unit.check, unit.run_id, unit.contexts[count:]) if count < len(unit.contexts) else None
+    return head, rest
+
+
+class CheckBacklog:
+    """
+    Test checks deferred by the time budget, kept in a JSON file between plugin calls.
+
+    The file holds an entry per deferred check of a lab test, with the result value and QA check labels
+    the check reads, the configuration hash of each check and the measured check costs. Entries for a
+    check whose configuration has changed since they were deferred are discarded.
+    """
+
+    def __init__(self, path: str, test_checks: List[ICheck]):
+        self.path = path
+        self.checks = {check.__class__.__name__: check for check in test_checks if not check.disabled}
+        self.hashes = {
+            name: FingerprintStore.config_hash([name, check.config, check.state_key()])
+            for name, check in self.checks.items()
+        }
+        self.entries = []  # {"check", "run_id", "sample_id", "lab_test_id", "result", "labels"}
+        self.costs = {}
+
+    def load(self) -> None:
+        """
+        Reads the backlog file, if there is one. A file that can't be read is logged and replaced on save.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            HilltopHost.LogWarning(f"sampler_qa_checks_demo - backlog '{self.path}' not read, starting a new one: {e}")
+            return
+        self.costs = data.get("costs") or {}
+        hashes = data.get("checks") or {}
+        entries = data.get("entries") or []
+        self.entries = [
+            entry
+            for entry in entries
+            if entry["check"] in self.hashes and hashes.get(entry["check"]) == self.hashes[entry["check"]]
+        ]
+        if len(entries) > len(self.entries):
+            HilltopHost.LogWarning(
+                f"sampler_qa_checks_demo - discarded {len(entries) - len(self.entries)} deferred test checks "
+                "for checks that have been disabled or reconfigured"
+            )
+
+    def tests(self) -> Iterator[tuple]:
+        """
+        Yields (check, run_id, DeferredTest) for every entry, in the order they were deferred.
+        """
+        for entry in self.entries:
+            result = entry["result"]
+            yield self.checks[entry["check"]], entry["run_id"], DeferredTest(
+                entry["sample_id"],
+                entry["lab_test_id"],
+                None if result is None else TestResult(result),
+                frozenset(entry["labels"]),
+            )
+
+    def save(self, deferred: List[CheckUnit | BatchUnit], costs: CheckCosts) -> int:
+        """
+        Replaces the backlog with the deferred units and returns how many lab test checks it holds.
+        """
+        entries = [
+            {
+                "check": unit.check.__class__.__name__,
+                "run_id": unit.run_id,
+                "sample_id": t.SampleID,
+                "lab_test_id": t.LabTestID,
+                "result": None if t.Result is None else t.Result.ResultValue,
+                "labels": sorted(labels_of(t)),
+            }
+            for unit in deferred
+            for t in unit.contexts
+        ]
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"checks": self.hashes, "costs": costs.export(), "entries": entries}, file)
+        os.replace(temp_path, self.path)
+        return len(entries)
@@ -0,0 +1,176 @@
+from typing import List
+import csv
+import json
+import os
+import time
+
+import HilltopHost
+from HilltopHost.Sampler import QACheck
+from . import utils
+
+
+class QACheckReport:
+    """
+    A dry-run report that writes QA checks to a file instead of saving them, one record per check
+    with the fields in utils.QA_CHECK_FIELDS.
+
+    `ndjson` writes a JSON object per line and `csv` a header row and a row per check. The report is
+    written to a temporary file and moved into place when it is closed after a successful call, so the
+    file at `path` is always a complete report from one plugin call that can be diffed against another.
+    A call that fails leaves what it wrote at `{path}.partial` and the previous report untouched.
+    """
+
+    formats = ("ndjson", "csv")
+
+    def __init__(self, path: str, format: str = "ndjson"):
+        """
+        Raises:
+            ValueError: If the format is not recognised.
+            OSError: If the report file can't be created.
+        """
+        if format not in self.formats:
+            raise ValueError(f"unknown dry_run_report format '{format}', expected 'ndjson' or 'csv'")
+        self.path = path
+        self.format = format
+        self.written = 0
+        self._temp_path = f"{path}.tmp"
+        self._file = open(self._temp_path, "w", encoding="utf-8", newline="", buffering=1 << 16)
+        self._writer = None
+        if format == "csv":
+            self._writer = csv.DictWriter(self._file, fieldnames=utils.QA_CHECK_FIELDS)
+            self._writer.writeheader()
+
+    def write(self, qa_checks: List[QACheck]) -> None:
+        for qa_check in qa_checks:
+            record = utils.qa_check_record(qa_check)
+            if self._writer is not None:
+                self._writer.writerow(record)
+            else:
+                self._file.write(json.dumps(record, default=str) + "\n")
+        self.written += len(qa_checks)
+
+    @property
+    def partial_path(self) -> str:
+        return f"{self.path}.partial"
+
+    def close(self, complete: bool = True) -> bool:
+        """
+        Closes the report, moving it to `path` if the call completed or to `partial_path` if it didn't.
+        A report that can't be written or moved into place, for example because the previous report is
+        open in a viewer, is logged and kept under `partial_path`, leaving the previous report in place.
+
+        Returns:
+            bool: True if the report replaced the one at `path`.
+        """
+        try:
+            self._file.close()
+            if complete:
+                os.replace(self._temp_path, self.path)
+                return True
+        except OSError as e:
+            HilltopHost.LogError(f"sampler_qa_checks_demo - dry run report '{self.path}' not replaced: {e}")
+        try:
+            os.replace(self._temp_path, self.partial_path)
+        except OSError as e:
+            HilltopHost.LogError(f"sampler_qa_checks_demo - partial dry run report '{self.partial_path}' not written: {e}")
+        return False
+
+
+class QACheckSink:
+    """
+    A write-behind sink that buffers QA checks for a whole payload and saves them in batches.
+
+    Checks with the same (RunID, SampleID, LabTestID, Label) as one already accepted during
+    the payload are dropped, and titles are truncated once as checks are added.
+    """
+
+    title_length = 100
+
+    def __init__(self, save: bool, flush_size: int = 500, report: QACheckReport | None = None):
+        """
+        Args:
+            save (bool): Save checks with HilltopHost.Sampler.SaveQACheck, otherwise log them.
+            flush_size (int): Number of buffered checks that triggers a flush.
+            report (QACheckReport): When not saving, write checks to this report instead of logging them.
+        """
+        self.save = save
+        self.report = report
+        self.flush_size = max(1, flush_size)
+        self.saved = 0
+        self.duplicates = 0
+        self._buffer = []
+        self._seen = set()
+
+    def add(self, qa_checks: List[QACheck] | None) -> None:
+        if qa_checks is None:
+            return
+        for qa_check in qa_checks:
+            key = (
+                getattr(qa_check, "RunID", None),
+                getattr(qa_check, "SampleID", None),
+                getattr(qa_check, "LabTestID", None),
+                qa_check.Label,
+            )
+            if key in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(key)
+            if qa_check.Title is not None:
+                qa_check.Title = qa_check.Title[: self.title_length]
+            self._buffer.append(qa_check)
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Saves (or logs) every buffered QA check.
+        """
+        if not self._buffer:
+            return
+        start_time = time.time()
+        batch, self._buffer = self._buffer, []
+        if self.save:
+            for qa_check in batch:
+                HilltopHost.Sampler.SaveQACheck(qa_check)
+        elif self.report is not None:
+            self.report.write(batch)
+            self.saved += len(batch)
+            return  # the report is summarised once when the sink is closed
+        else:
+            for qa_check in batch:
+                HilltopHost.LogInfo(utils.dump(qa_check))
+        self.saved += len(batch)
+        HilltopHost.LogInfo(
+            f"sampler_qa_checks_demo - flushed {len(batch)} QA checks in {time.time() - start_time:.2f} seconds"
+        )
+
+    def close(self, complete: bool = True) -> None:
+        """
+        Flushes any remaining QA checks and logs a summary for the payload.
+
+        Args:
+            complete (bool): Whether the plugin call finished. A report from a call that didn't is kept
+                under its partial path rather than replacing the previous report.
+        """
+        if self.report is not None:
+            try:
+                self.flush()
+            except Exception:
+                self.report.close(complete=False)
+                raise
+            if not self.report.close(complete):
+                HilltopHost.LogWarning(
+                    f"sampler_qa_checks_demo - wrote {self.report.written} QA checks to partial report "
+                    f"'{self.report.partial_path}', '{self.report.path}' not replaced"
+                )
+                return
+            HilltopHost.LogInfo(
+                f"sampler_qa_checks_demo - wrote {self.report.written} QA checks to {self.report.format} report "
+                f"'{self.report.path}', skipped {self.duplicates} duplicates"
+            )
+            return
+        self.flush()
+        HilltopHost.LogInfo(
+            f"sampler_qa_checks_demo - {'saved' if self.save else 'logged'} {self.saved} QA checks, "
+            f"skipped {self.duplicates} duplicates"
+        )
@@ -0,0 +1,67 @@
+from typing import Iterable, Iterator, List, NamedTuple
+
+import HilltopHost
+
+
+class RunSlice(NamedTuple):
+    """
+    Some or all of the samples of one run in a payload window.
+
+    `first` is True for the first slice of each run, so run checks are performed once per run
+    however many windows its samples are spread across.
+    """
+
+    run: HilltopHost.Sampler.QACheckRun
+    samples: list
+    first: bool
+
+
+def iter_windows(payload: HilltopHost.Sampler.QAChecksPayload, max_tests: int) -> Iterator[List[RunSlice]]:
+    """
+    Splits a payload into windows of whole samples holding about `max_tests` lab tests each.
+
+    Windows are yielded as the payload is traversed, so only one window's tests (and the
+    metadata prefetched for them) need to be held at a time. A sample is never split, so a
+    window can exceed `max_tests` when a single sample holds more tests than that.
+
+    Args:
+        payload: The QAChecksPayload to traverse.
+        max_tests: Lab tests per window, counting each test in a test set; 0 for one window.
+    """
+    return split_windows((RunSlice(run, run.Samples, True) for run in payload.Runs), max_tests)
+
+
+def split_windows(slices: Iterable[RunSlice], max_tests: int) -> Iterator[List[RunSlice]]:
+    """
+    Splits run slices into windows as `iter_windows` does, keeping each run check with the first part of its slice.
+    """
+    window = []
+    size = 0
+    for run, run_samples, first in slices:
+        samples = []
+        for sample in run_samples:
+            samples.append(sample)
+            size += count_tests(sample)
+            if max_tests > 0 and size >= max_tests:
+                window.append(RunSlice(run, samples, first))
+                yield window
+                window, samples, size, first = [], [], 0, False
+        if samples or first:
+            window.append(RunSlice(run, samples, first))
+    if window:
+        yield window
+
+
+def iter_tests(slices: Iterable[RunSlice]) -> Iterator[tuple]:
+    """
+    Yields (RunID, test) for every test in the slices, including tests in test sets.
+    """
+    for run, samples, _ in slices:
+        for sample in samples:
+            for test in sample.Tests:
+                for t in test.Tests if test.IsTestSet else [test]:
+                    yield run.RunID, t
+
+
+def count_tests(sample: HilltopHost.Sampler.QACheckSample) -> int:
+    return sum(len(test.Tests) if test.IsTestSet else 1 for test in sample.Tests)
@@ -1,6 +1,10 @@
+from types import MappingProxyType
 import xml.etree.ElementTree as ET
 import json
 
+# the QACheck attributes carried by a QA check record, e.g. from a worker process
+QA_CHECK_FIELDS = ("RunID", "SampleID", "LabTestID", "Label", "Title", "Severity", "Details")
+
 
 def dump(obj) -> str:
     if isinstance(obj, dict):
@@ -12,11 +16,31 @@ def dump(obj) -> str:
     return json.dumps(properties)
 
 
-def get_parameter_value_from_test_info(xml: str, parameter : str) -> str:
+def qa_check_record(qa_check) -> dict:
+    """
+    Returns the QA_CHECK_FIELDS of a QA check as a plain dict, with the severity by name.
+    """
+    record = {field: getattr(qa_check, field, None) for field in QA_CHECK_FIELDS}
+    severity = record["Severity"]
+    record["Severity"] = getattr(severity, "name", severity)
+    return record
+
+
+def parse_test_info_parameters(xml: str) -> MappingProxyType:
+    """
+    Parses the Parameter elements of a TestInfo XML fragment into a read-only name -> value mapping.
+
+    The first Parameter with a name wins, as in a linear scan. Parsed parameters are cached per lab test
+    by `Repository.get_test_parameters`.
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If the XML is malformed.
+    """
     root = ET.fromstring(xml)
+    parameters = {}
     for param in root.findall(".//Parameter"):
-        if param.get("Name") == parameter:
-            return param.get("Value")
+        parameters.setdefault(param.get("Name"), param.get("Value"))
+    return MappingProxyType(parameters)
 
 
 def truncate(x : str, length=50) -> str:
@@ -0,0 +1,43 @@
+"""
+Puts the stand-in HilltopHost, Hilltop and pyodbc modules used by the benchmarks on the path, so the
+plugin's modules can be imported and tested without a Hilltop or Sampler installation.
+"""
+import copy
+import os
+import sys
+
+import pytest
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+FAKES_DIR = os.path.join(BENCHMARKS_DIR, "fakes")
+sys.path.insert(0, FAKES_DIR)
+sys.path.insert(1, BENCHMARKS_DIR)
+
+
+@pytest.fixture
+def run_plugin(tmp_path):
+    """
+    Returns a function that runs the plugin on a payload with the benchmark configuration updated by
+    `config`, and returns the QA checks it saved.
+    """
+    import yaml
+    import HilltopHost
+    from HilltopHost import Sampler
+    from run_benchmark import BENCHMARK_CONFIG
+    from sampler_qa_checks_demo import SamplerQAChecksPluginDemo
+
+    calls = []
+
+    def run(payload, config=None):
+        full_config = copy.deepcopy(BENCHMARK_CONFIG)
+        full_config.update(config or {})
+        path = tmp_path / f"sampler_qa_checks_demo.{len(calls)}.yaml"
+        path.write_text(yaml.safe_dump(full_config))
+        calls.append(path)
+        HilltopHost.System.config_sections["sampler_qa_checks_demo"] = {"ConfigFile": str(path)}
+        HilltopHost.LOG.clear()
+        Sampler.SAVED.clear()
+        SamplerQAChecksPluginDemo().sampler_qa_checks(payload)
+        return list(Sampler.SAVED)
+
+    return run
@@ -0,0 +1,8 @@
+def qa_check_keys(qa_checks) -> list:
+    """
+    Returns the fields of QA checks as sorted tuples, so the output of two runs can be compared.
+    """
+    return sorted(
+        (q.RunID or 0, q.SampleID or 0, q.LabTestID or 0, q.Label, q.Title, int(q.Severity), q.Details or "")
+        for q in qa_checks
+    )
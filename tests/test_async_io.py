@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+import HilltopHost
+from payloads import generate_payload
+
+from sampler_qa_checks_demo.async_io import AsyncPrefetcher
+from sampler_qa_checks_demo.checks.i_check import ICheck
+from sampler_qa_checks_demo.repository import Repository
+
+from .helpers import qa_check_keys
+
+
+class ReadingCheck(ICheck):
+    """
+    A check whose prefetch calls record how many of them are running at once.
+    """
+
+    def __init__(self, reads, fail=()):
+        super().__init__({}, None)
+        self.reads = reads
+        self.fail = set(fail)
+        self.done = []
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+
+    def prefetch_calls(self, tests):
+        return [lambda i=i: self.read(i) for i in range(self.reads)]
+
+    def read(self, i):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.01)
+        with self.lock:
+            self.running -= 1
+        if i in self.fail:
+            raise OSError(f"read {i} failed")
+        self.done.append(i)
+
+
+def test_reads_overlap_up_to_the_concurrency_limit():
+    check = ReadingCheck(8)
+    assert AsyncPrefetcher(3).prefetch(Repository(pool=None), [], [check], [])
+    assert sorted(check.done) == list(range(8))
+    assert check.most_running == 3
+
+
+def test_failed_reads_are_logged_and_the_rest_completed():
+    HilltopHost.LOG.clear()
+    check = ReadingCheck(4, fail=[1])
+    assert AsyncPrefetcher(2).prefetch(Repository(pool=None), [], [check], [])
+    assert sorted(check.done) == [0, 2, 3]
+    assert ("warning", "sampler_qa_checks_demo - prefetch read failed: read 1 failed") in HilltopHost.LOG
+
+
+def test_falls_back_inside_a_running_event_loop():
+    check = ReadingCheck(2)
+
+    async def prefetch():
+        return AsyncPrefetcher(2).prefetch(Repository(pool=None), [], [check], [])
+
+    assert asyncio.run(prefetch()) is False
+    assert check.done == []
+
+
+def test_async_io_saves_the_same_checks(run_plugin):
+    payload = generate_payload(2, 20, 6)
+    serial = run_plugin(payload)
+    prefetched = run_plugin(payload, {"execution": {"async_io": True, "io_concurrency": 3}})
+    assert serial
+    assert qa_check_keys(prefetched) == qa_check_keys(serial)
+    assert not [message for level, message in HilltopHost.LOG if level != "info"]
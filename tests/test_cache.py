@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from sampler_qa_checks_demo.cache import LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(ttl_seconds=10)
+    cache.put("a", 1)
+    clock.now += 10
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.peek("a") is None
+    assert cache.get("a", "default") == "default"
+    assert len(cache) == 0
+    assert cache.misses == 1
+
+
+def test_peek_does_not_count_or_reorder():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.peek("a") == 1
+    assert cache.peek("x") is None
+    cache.put("c", 3)  # "a" is still the least recently used
+    assert cache.peek("a") is None
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_configure_shrinks_and_validate_clears():
+    cache = LRUCache(max_size=3)
+    for key in "abc":
+        cache.put(key, key)
+    cache.configure(max_size=1)
+    assert len(cache) == 1 and cache.peek("c") == "c"
+    assert not cache.validate(1)
+    assert len(cache) == 0
+    cache.put("d", "d")
+    assert cache.validate(1)
+    assert cache.peek("d") == "d"
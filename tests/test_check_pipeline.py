@@ -0,0 +1,49 @@
+import os
+
+import HilltopHost
+import pytest
+import yaml
+from payloads import generate_payload
+
+from sampler_qa_checks_demo import check_pipeline, config_loader
+from sampler_qa_checks_demo.config_loader import ConfigLoader
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "sampler_qa_checks_demo.yaml"
+    path.write_text("RunNameCheck:\n  name_max_length: 100\n")
+    monkeypatch.setitem(HilltopHost.System.config_sections, "sampler_qa_checks_demo", {"ConfigFile": str(path)})
+    monkeypatch.setattr(ConfigLoader, "_cache", None)
+    return path
+
+
+def test_config_is_parsed_again_only_when_its_content_changes(config_file, monkeypatch):
+    parses = []
+    safe_load = yaml.safe_load
+    monkeypatch.setattr(config_loader.yaml, "safe_load", lambda content: parses.append(content) or safe_load(content))
+
+    config, version = ConfigLoader.load_versioned()
+    assert ConfigLoader.load_versioned() == (config, version)
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))  # touched, same content
+    assert ConfigLoader.load_versioned()[1] == version
+    assert len(parses) == 1
+
+    config_file.write_text("RunNameCheck:\n  name_max_length: 50\n")
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    changed, changed_version = ConfigLoader.load_versioned()
+    assert changed_version != version
+    assert changed["RunNameCheck"]["name_max_length"] == 50
+    assert len(parses) == 2
+
+
+def test_pipeline_is_rebuilt_when_the_config_version_changes(run_plugin):
+    payload = generate_payload(1, 5, 5)
+    run_plugin(payload)
+    pipeline = check_pipeline._current
+    run_plugin(payload)  # a new file with the same content
+    assert check_pipeline._current is pipeline
+    run_plugin(payload, {"RunNameCheck": {"name_max_length": 10}})
+    assert check_pipeline._current is not pipeline
+    assert check_pipeline._current.version != pipeline.version
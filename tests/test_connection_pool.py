@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from sampler_qa_checks_demo.connection_pool import ConnectionPool
+
+
+class Connection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+
+    def cursor(self):
+        if not self.healthy:
+            raise RuntimeError("connection lost")
+        return self
+
+    def execute(self, query):
+        pass
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def test_connections_are_reused():
+    pool = ConnectionPool(Connection, size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.created == 1
+
+
+def test_failed_query_discards_connection():
+    pool = ConnectionPool(Connection, size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as connection:
+            raise ValueError("query failed")
+    assert connection.closed
+    with pool.connection() as replacement:
+        assert replacement is not connection
+
+
+def test_unhealthy_idle_connection_is_replaced(clock):
+    pool = ConnectionPool(Connection, health_check_interval=30)
+    with pool.connection() as connection:
+        connection.healthy = False
+    clock.now += 10
+    with pool.connection() as reused:
+        assert reused is connection  # recently used, not health checked
+    clock.now += 31
+    with pool.connection() as replacement:
+        assert replacement is not connection
+    assert connection.closed
+
+
+def test_idle_connections_are_closed_after_timeout(clock):
+    pool = ConnectionPool(Connection, idle_timeout=60)
+    with pool.connection() as connection:
+        pass
+    clock.now += 61
+    pool.close_idle()
+    assert connection.closed
+
+
+def test_checkout_waits_for_a_free_slot():
+    pool = ConnectionPool(Connection, size=1)
+    connection = pool.checkout()
+    taken = []
+    waiter = threading.Thread(target=lambda: taken.append(pool.checkout()))
+    waiter.start()
+    waiter.join(0.05)
+    assert not taken
+    pool.checkin(connection)
+    waiter.join(1)
+    assert taken == [connection]
+
+
+def test_closed_pool_refuses_checkout():
+    pool = ConnectionPool(Connection)
+    connection = pool.checkout()
+    pool.close()
+    pool.checkin(connection)
+    assert connection.closed
+    with pytest.raises(RuntimeError):
+        pool.checkout()
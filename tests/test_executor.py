@@ -0,0 +1,60 @@
+import time
+
+from payloads import generate_payload
+
+from sampler_qa_checks_demo import executor
+from sampler_qa_checks_demo.checks.i_check import ICheck
+from sampler_qa_checks_demo.executor import CheckExecutor, CheckUnit
+
+from .helpers import qa_check_keys
+
+
+class SlowCheck(ICheck):
+    """
+    Returns the context after sleeping for longer the earlier the context is, so later units finish first.
+    """
+
+    def __init__(self):
+        super().__init__({}, None)
+
+    def perform_checks(self, run_id, context):
+        time.sleep(0.002 * (10 - context))
+        return [context]
+
+
+def test_pool_yields_results_in_unit_order():
+    check = SlowCheck()
+    units = [CheckUnit(check, 1, i) for i in range(10)]
+    assert list(CheckExecutor(4).run(units)) == [[i] for i in range(10)]
+
+
+def test_pool_takes_units_as_results_are_consumed():
+    check = SlowCheck()
+    taken = []
+
+    def units():
+        for i in range(10):
+            taken.append(i)
+            yield CheckUnit(check, 1, i)
+
+    results = CheckExecutor(2, max_in_flight=3).run(units())
+    assert next(results) == [0]
+    assert len(taken) == 3
+    assert list(results) == [[i] for i in range(1, 10)]
+
+
+def test_falls_back_to_serial_without_a_thread_pool(monkeypatch):
+    def unavailable(**kwargs):
+        raise RuntimeError("can't start new thread")
+
+    monkeypatch.setattr(executor, "ThreadPoolExecutor", unavailable)
+    units = [CheckUnit(SlowCheck(), 1, i) for i in range(3)]
+    assert list(CheckExecutor(4).run(units)) == [[0], [1], [2]]
+
+
+def test_workers_save_the_same_checks_in_the_same_order(run_plugin):
+    payload = generate_payload(2, 20, 6)
+    serial = run_plugin(payload)
+    pooled = run_plugin(payload, {"execution": {"workers": 4, "max_in_flight": 2}})
+    assert serial
+    assert [qa_check_keys([q]) for q in pooled] == [qa_check_keys([q]) for q in serial]
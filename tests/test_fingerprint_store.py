@@ -0,0 +1,53 @@
+from HilltopHost.Sampler import QACheck, QACheckLabTest
+
+from sampler_qa_checks_demo.fingerprint_store import FingerprintStore, IncrementalPass
+
+
+def qa_check(sample_id, lab_test_id, label):
+    check = QACheck()
+    check.SampleID = sample_id
+    check.LabTestID = lab_test_id
+    check.Label = label
+    return check
+
+
+def run_pass(store, tests, config_hash="config", saved=(), full_rescan=False):
+    incremental = IncrementalPass(store, config_hash, full_rescan)
+    incremental.begin(tests)
+    incremental.add_saved(saved)
+    incremental.commit()
+    return incremental
+
+
+def test_unchanged_tests_are_recognised(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.db"))
+    tests = [QACheckLabTest(1, 10, "7"), QACheckLabTest(2, 10, "8")]
+    assert run_pass(store, tests).unchanged == set()
+    assert run_pass(store, tests).unchanged == {(1, 10), (2, 10)}
+
+    changed = [QACheckLabTest(1, 10, "7.5"), QACheckLabTest(2, 10, "8")]
+    assert run_pass(store, changed).unchanged == {(2, 10)}
+    assert run_pass(store, changed, config_hash="other").unchanged == set()
+    assert run_pass(store, changed, config_hash="other", full_rescan=True).unchanged == set()
+    store.close()
+
+
+def test_saved_labels_are_part_of_the_fingerprint(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.db"))
+    run_pass(store, [QACheckLabTest(1, 10, "7")], saved=[qa_check(1, 10, "threshold_check")])
+    # the next payload carries the QA check saved in the last pass
+    resent = QACheckLabTest(1, 10, "7", qa_checks=[qa_check(1, 10, "threshold_check")])
+    assert run_pass(store, [resent]).is_unchanged(resent)
+    assert not run_pass(store, [QACheckLabTest(1, 10, "7")]).unchanged
+    store.close()
+
+
+def test_load_spans_chunks(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.db"))
+    store.chunk_size = 2
+    for sample_id in range(5):
+        store.record(sample_id, 10, f"f{sample_id}")
+    store.commit()
+    assert store.load(range(5)) == {(i, 10): f"f{i}" for i in range(5)}
+    assert FingerprintStore.config_hash({"b": 1, "a": 2}) == FingerprintStore.config_hash({"a": 2, "b": 1})
+    store.close()
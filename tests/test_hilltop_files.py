@@ -0,0 +1,68 @@
+import threading
+
+import Hilltop
+import pytest
+
+from sampler_qa_checks_demo.hilltop_files import HilltopFileManager
+
+
+def test_released_handle_is_reused(monkeypatch):
+    connected = []
+    monkeypatch.setattr(Hilltop, "Connect", lambda path: connected.append(path) or {"path": path})
+    files = HilltopFileManager()
+    with files.use("a.hts") as first:
+        pass
+    with files.use("a.hts") as second:
+        assert second is first
+    assert connected == ["a.hts"]
+
+
+def test_second_reader_waits_for_the_only_handle():
+    files = HilltopFileManager(max_handles=1)
+    handle = files.acquire("a.hts")
+    acquired = []
+    reader = threading.Thread(target=lambda: acquired.append(files.acquire("a.hts")))
+    reader.start()
+    reader.join(0.2)
+    assert reader.is_alive()
+    files.release("a.hts", handle)
+    reader.join(2)
+    assert acquired == [handle]
+
+
+def test_failed_connect_frees_the_slot(monkeypatch):
+    files = HilltopFileManager(max_handles=1)
+
+    def fail(path):
+        raise OSError("file locked")
+
+    monkeypatch.setattr(Hilltop, "Connect", fail)
+    with pytest.raises(OSError):
+        files.acquire("a.hts")
+
+    monkeypatch.setattr(Hilltop, "Connect", lambda path: {"path": path})
+    acquired = []
+    reader = threading.Thread(target=lambda: acquired.append(files.acquire("a.hts")))
+    reader.start()
+    reader.join(2)
+    assert not reader.is_alive()
+    assert acquired == [{"path": "a.hts"}]
+
+
+def test_close_idle_closes_only_released_handles(monkeypatch):
+    disconnected = []
+    monkeypatch.setattr(Hilltop, "Disconnect", disconnected.append)
+    files = HilltopFileManager(max_handles=2)
+    in_use = files.acquire("a.hts")
+    idle = files.acquire("a.hts")
+    files.release("a.hts", idle)
+    files.close_idle(idle_timeout=-1)
+    assert disconnected == [idle]
+    assert in_use is not idle
+
+
+def test_caller_handle_limit_overrides_the_default():
+    files = HilltopFileManager(max_handles=1)
+    with files.use("a.hts", max_handles=2) as first, files.use("a.hts", max_handles=2) as second:
+        assert first is not second
+    assert files.max_handles == 1
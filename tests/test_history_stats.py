@@ -0,0 +1,55 @@
+import Hilltop
+import numpy as np
+import pytest
+
+from sampler_qa_checks_demo.history_stats import HistoryStatsProvider
+from sampler_qa_checks_demo.profiler import Profiler
+
+
+@pytest.fixture
+def calls():
+    Hilltop.CALLS.update(GetData=0, PDist=0)
+    return Hilltop.CALLS
+
+
+def test_getdata_reads_each_history_once(calls):
+    size, percentiles = HistoryStatsProvider("getdata").read("f", "Site", "pH", None, None, Profiler())
+    assert size == Hilltop.points
+    assert percentiles.shape == (100,)
+    assert calls == {"GetData": 1, "PDist": 0}
+
+
+def test_pdist_is_the_default_and_counts_with_getdata(calls):
+    profiler = Profiler(enabled=True)
+    size, percentiles = HistoryStatsProvider().read("f", "Site", "pH", None, None, profiler)
+    assert size == Hilltop.points
+    assert percentiles.shape == (100,)
+    assert calls == {"GetData": 1, "PDist": 1}
+    assert profiler.counters == {"hilltop_getdata": 1, "hilltop_pdist": 1}
+
+
+def test_short_history_has_no_percentiles(calls):
+    provider = HistoryStatsProvider("pdist", min_data_points=Hilltop.points + 1)
+    assert provider.read("f", "Site", "pH", None, None, Profiler()) == (Hilltop.points, None)
+    assert calls["PDist"] == 0
+
+
+def test_values_drops_nan_and_takes_value_column():
+    series = np.array([[1.0, 5.0], [2.0, np.nan], [3.0, 7.0]])
+    assert HistoryStatsProvider.values(series).tolist() == [5.0, 7.0]
+
+
+def test_unknown_source_and_interpolation():
+    with pytest.raises(ValueError):
+        HistoryStatsProvider("other")
+    with pytest.raises(ValueError):
+        HistoryStatsProvider(interpolation="cubic")
+
+
+@pytest.mark.parametrize("source", ["getdata", "pdist"])
+def test_count_uses_the_value_column(source, monkeypatch):
+    series = np.column_stack([np.arange(30.0), np.arange(30.0)])  # (time, value): 60 numbers, 30 points
+    series[0, 1] = np.nan
+    monkeypatch.setattr(Hilltop, "GetData", lambda *args: series)
+    size, percentiles = HistoryStatsProvider(source, min_data_points=30).read("f", "Site", "pH", None, None, Profiler())
+    assert (size, percentiles) == (29, None)
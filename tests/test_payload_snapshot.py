@@ -0,0 +1,79 @@
+import pickle
+from decimal import Decimal
+
+from HilltopHost import RunStatus
+from HilltopHost.Sampler import QACheck, QACheckLabTest, QACheckRun, QACheckSample, QAChecksPayload
+
+from sampler_qa_checks_demo.checks.threshold_check import ThresholdCheck
+from sampler_qa_checks_demo.payload_snapshot import PayloadSnapshot, labels_of
+
+
+def qa_check(label):
+    check = QACheck()
+    check.Label = label
+    return check
+
+
+def make_payload():
+    test_set = QACheckLabTest(1, 10, tests=[QACheckLabTest(1, 11, "7.1"), QACheckLabTest(1, 12, "")])
+    sample = QACheckSample(
+        1,
+        RunStatus.SOME_RESULTS_BACK,
+        "2020-01-01T00:00:00",
+        [QACheckLabTest(1, 13, "5.5", qa_checks=[qa_check("threshold_check")]), test_set],
+    )
+    other = QACheckSample(2, RunStatus.ALL_RESULTS_BACK, "2020-01-02T00:00:00", [QACheckLabTest(2, 13)])
+    return QAChecksPayload([QACheckRun(7, "Run 7", [sample, other], [qa_check("run_name_check")])])
+
+
+def test_views_match_the_payload():
+    snapshot = PayloadSnapshot.from_payload(make_payload())
+    [run] = snapshot.Runs
+    assert (run.RunID, run.RunName, run.Labels) == (7, "Run 7", frozenset({"run_name_check"}))
+    sample, other = run.Samples
+    assert (sample.SampleID, sample.StatusID, sample.SampleTime) == (1, RunStatus.SOME_RESULTS_BACK, "2020-01-01T00:00:00")
+    test, test_set = sample.Tests
+    assert (test.SampleID, test.LabTestID, test.Result.ResultValue) == (1, 13, "5.5")
+    assert [check.Label for check in test.QAChecks] == ["threshold_check"]
+    assert test_set.IsTestSet and not test.IsTestSet
+    assert [(t.LabTestID, t.Result.ResultValue) for t in test_set.Tests] == [(11, "7.1"), (12, "")]
+    assert other.Tests[0].Result is None
+    assert labels_of(other) == frozenset()
+
+
+def test_skip_leaves_out_tests_but_keeps_test_sets():
+    snapshot = PayloadSnapshot.from_payload(make_payload())
+    skipped = PayloadSnapshot(snapshot.slices(), skip=lambda t: t.LabTestID in (11, 13))
+    sample, other = skipped.Runs[0].Samples
+    [test_set] = sample.Tests
+    assert [t.LabTestID for t in test_set.Tests] == [12]
+    assert other.Tests == []
+
+
+def test_snapshot_pickles():
+    original = PayloadSnapshot.from_payload(make_payload())
+    original.Runs  # builds the views, which are left out of the pickle
+    snapshot = pickle.loads(pickle.dumps(original))
+    assert snapshot._views is None
+    assert [t.LabTestID for t in snapshot.Runs[0].Samples[0].Tests[1].Tests] == [11, 12]
+
+
+def test_views_are_built_once():
+    snapshot = PayloadSnapshot.from_payload(make_payload())
+    [run] = snapshot.Runs
+    assert snapshot.Runs[0] is run
+    assert run.Samples is run.Samples
+    sample = run.Samples[0]
+    assert sample.Tests is sample.Tests
+    assert sample.Tests[1].Tests is sample.Tests[1].Tests
+    assert [s.SampleID for _, samples, _ in snapshot.slices() for s in samples] == [1, 2]
+
+
+def test_results_are_parsed_once():
+    snapshot = PayloadSnapshot.from_payload(make_payload())
+    test, test_set = snapshot.Runs[0].Samples[0].Tests
+    assert snapshot.values == [Decimal("5.5"), None, Decimal("7.1"), None, None]
+    assert test.Value == Decimal("5.5") and [t.Value for t in test_set.Tests] == [Decimal("7.1"), None]
+    check = ThresholdCheck({"pH": {"Warning": 5}}, repository=None)
+    assert check.result_value(test) is snapshot.values[test.index]
+    assert check.result_value(QACheckLabTest(1, 13, "5.50")) == Decimal("5.5")
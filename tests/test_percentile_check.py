@@ -0,0 +1,64 @@
+from contextlib import nullcontext
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from HilltopHost.Sampler import QACheckLabTest
+
+from sampler_qa_checks_demo.checks.percentile_check import PercentileCheck
+from sampler_qa_checks_demo.hilltop_files import hilltop_files
+
+from .helpers import qa_check_keys
+
+CONFIG = {"data_file": "history.hts", "pH": {"critical": "5,95", "warning": "10,90"}}
+PERCENTILES = np.array([round(6 + i * 0.01 + 0.003, 3) for i in range(100)])
+
+
+class Repository:
+    def get_sample_metadata(self, sample_id, lab_test_id):
+        return {
+            "RunID": 1,
+            "SampleID": sample_id,
+            "LabTestID": lab_test_id,
+            "SiteName": "River",
+            "MeasurementName": "pH",
+        }
+
+
+@pytest.fixture
+def check():
+    check = PercentileCheck(CONFIG, Repository())
+    check.get_history = lambda site, measurement, start_date, end_date: (100, PERCENTILES)
+    return check
+
+
+def boundary_results() -> list:
+    """
+    Results on and either side of each configured percentile, written as they would be entered.
+    """
+    results = ["5", "6.5", "7"]
+    for bound in PERCENTILES[[4, 9, 89, 94]].tolist():
+        results += [repr(bound), repr(bound) + "0001", str(Decimal(repr(bound)) - Decimal("1e-17"))]
+    return results
+
+
+def test_batch_matches_per_test_checks_on_boundaries(check):
+    tests = [QACheckLabTest(sample_id, 1, value) for sample_id, value in enumerate(boundary_results())]
+    per_test = [qa_check for test in tests for qa_check in check.perform_checks(1, test) or []]
+    batch = check.perform_checks_batch(1, tests)
+    assert per_test
+    assert qa_check_keys(batch) == qa_check_keys(per_test)
+
+
+def test_settings_are_kept_per_check(monkeypatch):
+    defaults = (hilltop_files.idle_timeout, hilltop_files.max_handles)
+    first = PercentileCheck(dict(CONFIG, history_cache_size=10, data_file_handles=4), Repository())
+    second = PercentileCheck(dict(CONFIG, history_cache_size=20, data_file_idle_timeout_seconds=5), Repository())
+    assert (hilltop_files.idle_timeout, hilltop_files.max_handles) == defaults
+    assert (first.history_cache.max_size, second.history_cache.max_size) == (10, 20)
+    assert (first.data_file_handles, second.data_file_handles) == (4, 1)
+
+    used = []
+    monkeypatch.setattr(hilltop_files, "use", lambda path, max_handles=None: used.append(max_handles) or nullcontext())
+    first.read_history("history.hts", "River", "pH", None, None)
+    assert used == [4]
@@ -0,0 +1,95 @@
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+
+import pytest
+import yaml
+
+from sampler_qa_checks_demo import percentile_index
+from sampler_qa_checks_demo.percentile_index import build, load_index
+
+from .conftest import FAKES_DIR
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG = {
+    "PercentileCheck": {
+        "data_file": "global.hts",
+        "site_data_files": {"river.hts": ["River"]},
+        "pH": {"warning": [5, 95]},
+    }
+}
+
+
+@pytest.fixture
+def base(tmp_path):
+    return str(tmp_path / "percentiles")
+
+
+def rows_files(base):
+    directory, name = os.path.split(base)
+    return sorted(f for f in os.listdir(directory) if f.startswith(name) and f.endswith(".npy"))
+
+
+def test_build_and_read(base):
+    assert build(CONFIG, base, ["Lake", "River"]) == 2
+    index = load_index(base)
+    size, percentiles = index.get("river.hts", "River", "pH", 20)
+    assert size > 0 and percentiles.shape == (100,)
+    assert index.get("global.hts", "River", "pH", 20) is None
+
+
+def test_histories_without_a_data_file_are_skipped(base, caplog):
+    config = {"PercentileCheck": {"site_data_files": {"river.hts": ["River"]}, "pH": {"warning": [5, 95]}}}
+    assert build(config, base, ["Lake", "River"]) == 1
+    assert load_index(base).entries.keys() == {("river.hts", "River", "pH")}
+    assert "1 histories not indexed" in caplog.text
+
+
+def test_rows_file_that_cant_be_removed_is_retried(base, monkeypatch, caplog):
+    old = f"{base}.20200101000000.npy"
+    open(old, "wb").close()
+    remove = os.remove
+
+    def locked(path):
+        if path == old:
+            raise PermissionError("in use")
+        remove(path)
+
+    monkeypatch.setattr(percentile_index.os, "remove", locked)
+    build(CONFIG, base, ["River"])
+    assert os.path.exists(old)
+    assert old in caplog.text
+
+    monkeypatch.setattr(percentile_index.os, "remove", remove)
+    build(CONFIG, base, ["River"])
+    assert rows_files(base) == [load_index(base).header["rows_file"]]
+
+
+def test_command_line_build_runs_without_hilltophost(tmp_path):
+    # only the Hilltop and pyodbc stand-ins, as on a machine with Hilltop's Python library but no host
+    modules = tmp_path / "modules"
+    modules.mkdir()
+    for name in ("Hilltop.py", "pyodbc.py"):
+        shutil.copy(os.path.join(FAKES_DIR, name), modules)
+    config = tmp_path / "config.yaml"
+    config.write_text(yaml.safe_dump(CONFIG))
+    output = tmp_path / "percentiles"
+    script = textwrap.dedent(
+        f"""
+        import sys
+        sys.path[:0] = [{str(modules)!r}, {REPO_DIR!r}]
+        from sampler_qa_checks_demo.percentile_index import main
+        main(["build", "--config", {str(config)!r}, "--output", {str(output)!r}, "--sites", "Lake", "River"])
+        """
+    )
+    environment = {k: v for k, v in os.environ.items() if k not in ("PYTHONPATH", "SAMPLER_QA_CHECKS_DEMO_HOST")}
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env=environment, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert "wrote 2 histories" in result.stdout
+    assert "connected to Hilltop data file" in result.stderr
+    assert len(load_index(str(output)).entries) == 2
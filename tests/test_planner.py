@@ -0,0 +1,88 @@
+from HilltopHost.Sampler import QACheck, QACheckLabTest
+
+from sampler_qa_checks_demo.checks.i_check import ICheck
+from sampler_qa_checks_demo.planner import CheckPlanner
+
+
+class Repository:
+    prefetch_chunk_size = 500
+
+    def __init__(self, measurements, cached=()):
+        self.measurements = measurements  # LabTestID -> measurement name
+        self.cached = set(cached)
+        self.queried = []
+
+    def cached_measurement(self, lab_test_id):
+        if lab_test_id in self.cached:
+            return {"MeasurementName": self.measurements[lab_test_id]}
+
+    def is_missing_lab_test(self, lab_test_id):
+        return lab_test_id not in self.measurements
+
+    def prefetch_measurements(self, lab_test_ids):
+        self.queried.append(sorted(lab_test_ids))
+        self.cached.update(i for i in lab_test_ids if i in self.measurements)
+
+
+class MeasuredCheck(ICheck):
+    label = "measured_check"
+    requires_result = True
+
+    def configured_measurements(self):
+        return {"pH"}
+
+
+class MetadataCheck(ICheck):
+    uses_sample_metadata = True
+
+
+def lab_test(sample_id, lab_test_id, value="7", labels=()):
+    qa_checks = []
+    for label in labels:
+        qa_check = QACheck()
+        qa_check.Label = label
+        qa_checks.append(qa_check)
+    return QACheckLabTest(sample_id, lab_test_id, value, qa_checks=qa_checks)
+
+
+def plan(repository, tests):
+    checks = [MeasuredCheck({}, repository), MetadataCheck({}, repository)]
+    return checks, CheckPlanner(checks, repository).plan([(1, test) for test in tests])
+
+
+def test_plan_prunes_checked_missing_results_and_unconfigured_measurements():
+    repository = Repository({10: "pH", 11: "Conductivity"}, cached=[10])
+    tests = [
+        lab_test(1, 10),
+        lab_test(2, 10, labels=["measured_check"]),
+        lab_test(3, 10, value=None),
+        lab_test(4, 11),
+    ]
+    (measured, metadata), result = plan(repository, tests)
+    assert repository.queried == [[11]]
+    assert [t.SampleID for _, t in result.tests_for(measured)] == [1]
+    assert [t.SampleID for _, t in result.tests_for(metadata)] == [1, 2, 3, 4]
+    assert result.pruned == {
+        ("MeasuredCheck", "already checked"): 1,
+        ("MeasuredCheck", "without a result"): 1,
+        ("MeasuredCheck", "measurement not configured"): 1,
+    }
+    assert sorted(result.metadata_lab_tests()) == [(1, 10), (2, 10), (3, 10), (4, 11)]
+
+
+def test_unknown_measurement_keeps_the_test():
+    repository = Repository({10: "pH"})
+    (measured, _), result = plan(repository, [lab_test(1, 10), lab_test(2, 99)])
+    assert [t.SampleID for _, t in result.tests_for(measured)] == [1, 2]
+
+
+def test_plan_summary_counts_pruned_evaluations():
+    repository = Repository({10: "pH", 11: "Conductivity"})
+    (measured, _), result = plan(repository, [lab_test(1, 10), lab_test(2, 11)])
+    assert repository.queried == [[10, 11]]
+    assert result.evaluations() == {"MeasuredCheck": 1, "MetadataCheck": 2}
+    assert result.summary_lines(500) == [
+        "plan: MeasuredCheck 1 evaluations (skipped 1 measurement not configured)",
+        "plan: MetadataCheck 2 evaluations",
+        "plan: 1 sample metadata queries for 2 samples, 1 measurement queries for 2 lab tests, up to 0 history reads",
+    ]
@@ -0,0 +1,47 @@
+import HilltopHost
+import pyodbc
+from HilltopHost import Sampler
+from payloads import generate_payload
+
+from sampler_qa_checks_demo.fingerprint_store import FingerprintStore
+from sampler_qa_checks_demo.repository import lab_test_cache
+
+
+def errors():
+    return [message for level, message in HilltopHost.LOG if level == "error"]
+
+
+def infos():
+    return [message for level, message in HilltopHost.LOG if level == "info"]
+
+
+def test_failed_final_save_is_logged_and_store_closed(run_plugin, tmp_path, monkeypatch):
+    closed = []
+    close = FingerprintStore.close
+
+    def save(qa_check):
+        raise RuntimeError("database unavailable")
+
+    def track_close(store):
+        closed.append(store)
+        close(store)
+
+    monkeypatch.setattr(Sampler, "SaveQACheck", save)
+    monkeypatch.setattr(FingerprintStore, "close", track_close)
+    config = {"incremental": {"enabled": True, "store_path": str(tmp_path / "fingerprints.db")}}
+    run_plugin(generate_payload(1, 5, 5), config)  # doesn't raise
+    assert any("database unavailable" in message for message in errors())
+    assert len(closed) == 1
+
+
+def test_explain_prunes_evaluations_as_a_real_call_would(run_plugin):
+    lab_test_cache.clear()
+    payload = generate_payload(1, 10, 5)
+    run_plugin(payload, {"execution": {"explain": True}})
+    nitrate = [
+        t for run in payload.Runs for sample in run.Samples for t in sample.Tests
+        if pyodbc.database.lab_tests[t.LabTestID] == "Nitrate - Nitrogen" and t.Result.ResultValue != ""
+    ]
+    plan = f"sampler_qa_checks_demo - plan: ThresholdCheck {len(nitrate)} evaluations "
+    assert any(message.startswith(plan) for message in infos())
+    assert Sampler.SAVED == []
@@ -0,0 +1,64 @@
+import json
+
+import pyodbc
+import pytest
+from HilltopHost.Sampler import QACheckSeverity
+from payloads import generate_payload
+
+from sampler_qa_checks_demo import process_pool
+
+from .helpers import qa_check_keys
+
+
+@pytest.fixture
+def share_database(tmp_path, monkeypatch):
+    """
+    Returns a function that saves the benchmark database for the worker processes to load.
+    """
+    def share():
+        database_file = tmp_path / "database.pickle"
+        pyodbc.database.save(database_file)
+        monkeypatch.setenv("BENCHMARK_DATABASE", str(database_file))
+
+    yield share
+    process_pool.discard_runner()
+
+
+@pytest.mark.parametrize("partition", ["run", "site"])
+def test_worker_processes_match_in_process_checks(run_plugin, share_database, tmp_path, partition):
+    payload = generate_payload(3, 20, 8, sites=4)
+    share_database()
+    profile = tmp_path / "profile.json"
+    in_process = run_plugin(payload)
+    in_workers = run_plugin(
+        payload,
+        {
+            "execution": {"processes": 2, "partition": partition},
+            "profiling": {"enabled": True, "json_file": str(profile)},
+        },
+    )
+    assert in_process
+    assert qa_check_keys(in_workers) == qa_check_keys(in_process)
+    if partition == "site":
+        # the workers load the metadata the parent read to find the sites rather than querying it again
+        assert json.loads(profile.read_text())["counters"]["db_queries"] <= 2
+
+
+class StrictQACheck:
+    """
+    Rejects None like the host's QACheck, whose properties are .NET value types.
+    """
+
+    def __setattr__(self, name, value):
+        if value is None:
+            raise TypeError(f"{name} can't be None")
+        super().__setattr__(name, value)
+
+
+def test_record_leaves_missing_fields_unset(monkeypatch):
+    monkeypatch.setattr(process_pool, "QACheck", StrictQACheck)
+    record = {"RunID": 1, "SampleID": None, "LabTestID": None, "Label": "run_check", "Title": "Run check",
+              "Severity": "Warning", "Details": None}
+    qa_check = process_pool.qa_check_from_record(record)
+    assert (qa_check.RunID, qa_check.Severity) == (1, QACheckSeverity.Warning)
+    assert not hasattr(qa_check, "SampleID")
@@ -0,0 +1,34 @@
+from sampler_qa_checks_demo.profiler import Profiler
+
+
+def test_phases_are_kept_apart_from_checks():
+    profiler = Profiler(enabled=True)
+    profiler.record("ThresholdCheck", 0.5, emitted=2)
+    profiler.phase("CheckPlanner", 0.25)
+    profiler.phase("CheckPlanner", 0.25)
+    data = profiler.to_dict()
+    assert list(data["checks"]) == ["ThresholdCheck"]
+    assert data["phases"] == {"CheckPlanner": {"calls": 2, "total_seconds": 0.5}}
+    lines = profiler.summary_lines()
+    assert lines.index(next(line for line in lines if line.startswith("phase"))) == 2
+
+
+def test_merge_exported_figures():
+    worker = Profiler(enabled=True)
+    worker.record("ThresholdCheck", 0.5, emitted=2)
+    worker.phase("CheckPlanner", 0.25)
+    worker.count("db_queries", 3)
+    profiler = Profiler(enabled=True)
+    profiler.phase("PayloadSnapshot", 0.1)
+    profiler.merge(worker.export())
+    data = profiler.to_dict()
+    assert data["checks"]["ThresholdCheck"]["emitted"] == 2
+    assert set(data["phases"]) == {"CheckPlanner", "PayloadSnapshot"}
+    assert data["counters"] == {"db_queries": 3}
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    profiler.record("ThresholdCheck", 0.5)
+    profiler.phase("CheckPlanner", 0.25)
+    assert profiler.to_dict() == {"checks": {}, "phases": {}, "counters": {}}
@@ -0,0 +1,129 @@
+from contextlib import contextmanager
+
+import pyodbc
+import pytest
+from payloads import generate_payload
+
+from sampler_qa_checks_demo import utils
+from sampler_qa_checks_demo.repository import (
+    LAB_TEST_VERSION_QUERY,
+    MEASUREMENT_COLUMNS,
+    SAMPLE_METADATA_QUERY,
+    Repository,
+    lab_test_cache,
+)
+
+
+@pytest.fixture
+def cache():
+    lab_test_cache.clear()
+    yield lab_test_cache
+    lab_test_cache.clear()
+
+
+def test_probes_do_not_count_cache_lookups(cache):
+    cache.put(1, {"LabTestID": 1})
+    cache.put(2, {"LabTestID": 2})
+    repository = Repository(pool=None)
+    counts = (cache.hits, cache.misses)
+    assert repository.measurement_chunks({(10, 1), (10, 2), (11, 3)}) == [[3]]
+    repository.prefetch_measurements([1, 2])  # all cached, so no query is made
+    assert (cache.hits, cache.misses) == counts
+
+
+class Pool:
+    """
+    Hands out connections to the benchmark database, optionally failing every query.
+    """
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    @contextmanager
+    def connection(self):
+        if self.fail:
+            raise ConnectionError("connection lost")
+        yield pyodbc.connect("benchmark")
+
+
+def test_test_parameters_are_parsed_once_per_lab_test(monkeypatch):
+    generate_payload(1, 2, 3)
+    parses = []
+    parse = utils.parse_test_info_parameters
+    monkeypatch.setattr(utils, "parse_test_info_parameters", lambda xml: parses.append(xml) or parse(xml))
+    repository = Repository(Pool())
+    sample_id, (lab_test_id, *_) = next((s, tests) for s, (_, _, tests) in pyodbc.database.samples.items())
+    queries = pyodbc.queries
+    for _ in range(3):
+        assert repository.get_test_parameters(sample_id, lab_test_id) == {"Method": "A"}
+    assert len(parses) == 1
+    assert pyodbc.queries - queries == 1
+
+
+def test_failed_test_info_read_is_not_cached():
+    generate_payload(1, 2, 3)
+    sample_id, (lab_test_id, *_) = next((s, tests) for s, (_, _, tests) in pyodbc.database.samples.items())
+    pool = Pool(fail=True)
+    repository = Repository(pool)
+    assert repository.get_test_parameters(sample_id, lab_test_id) == {}
+    pool.fail = False
+    assert repository.get_test_parameters(sample_id, lab_test_id) == {"Method": "A"}
+
+
+def test_lab_test_version_covers_every_cached_column():
+    checksum = LAB_TEST_VERSION_QUERY.split("BINARY_CHECKSUM(")[1].split(")")[0]
+    columns = {column.strip().split(".")[1] for column in checksum.split(",")}
+    assert set(MEASUREMENT_COLUMNS) <= columns
+
+
+def test_prefetch_serves_per_test_lookups_without_queries(cache):
+    generate_payload(2, 5, 4)
+    pairs = [(sample_id, lab_test_id) for sample_id, (_, _, tests) in pyodbc.database.samples.items() for lab_test_id in tests]
+    repository = Repository(Pool())
+    queries = pyodbc.queries
+    repository.prefetch(pairs + [(999, 1)])  # sample 999 isn't in the database
+    assert pyodbc.queries - queries == 1  # the metadata rows also fill the lab test cache
+    queries = pyodbc.queries
+    for sample_id, lab_test_id in pairs:
+        metadata = repository.get_sample_metadata(sample_id, lab_test_id)
+        assert (metadata["SampleID"], metadata["LabTestID"]) == (sample_id, lab_test_id)
+        measurement = repository.get_measurement_by_lab_test_id(lab_test_id)
+        assert measurement["MeasurementName"] == pyodbc.database.lab_tests[lab_test_id]
+    assert repository.get_sample_metadata(999, 1) is None
+    assert pyodbc.queries == queries
+
+
+def test_prefetch_chunks_samples(cache):
+    generate_payload(1, 10, 2)
+    repository = Repository(Pool())
+    repository.prefetch_chunk_size = 4
+    queries = pyodbc.queries
+    repository.prefetch([(sample_id, 1) for sample_id in pyodbc.database.samples])
+    assert pyodbc.queries - queries == 3
+
+
+def selected_columns(query):
+    """
+    Returns the column names of a query's outer SELECT list.
+    """
+    select = query.rsplit("SELECT", 1)[1].split("\nFROM", 1)[0]
+    return [line.strip().rstrip(",").split(" AS ")[-1].split(".")[-1] for line in select.strip().splitlines()]
+
+
+def test_metadata_query_returns_every_column_the_checks_read():
+    columns = selected_columns(SAMPLE_METADATA_QUERY)
+    assert set(MEASUREMENT_COLUMNS) | {"SampleID", "RunID", "SiteName", "TestID"} <= set(columns)
+    assert "TestInfo" not in columns and "SampleInfo" not in columns  # read on demand by TEST_INFO_QUERY
+    assert SAMPLE_METADATA_QUERY.count(".nodes(") == 1  # SampleInfo is shredded once
+    assert tuple(columns) == pyodbc.SAMPLE_COLUMNS  # the benchmark database answers with the same columns
+
+
+def test_metadata_rows_are_keyed_by_the_shredded_test_id(cache):
+    generate_payload(1, 2, 3)
+    sample_id, (_, _, lab_test_ids) = next(iter(pyodbc.database.samples.items()))
+    repository = Repository(Pool())
+    repository.fetch_sample_metadata([sample_id])
+    for lab_test_id in lab_test_ids:
+        row = repository.cached_sample_metadata(sample_id, lab_test_id)
+        assert (row["SampleID"], row["LabTestID"], row["TestID"]) == (sample_id, lab_test_id, lab_test_id)
+        assert cache.peek(lab_test_id) == {column: row[column] for column in MEASUREMENT_COLUMNS}
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+from HilltopHost.Sampler import QACheck, QACheckLabTest
+
+from sampler_qa_checks_demo.checks.outside_range_check import OutsideRangeCheck
+from sampler_qa_checks_demo.checks.threshold_check import ThresholdCheck
+
+MEASUREMENTS = {1: "pH", 2: "Nitrate - Nitrogen", 3: "Turbidity"}  # lab test 4 has no measurement
+
+
+class Repository:
+    def get_measurement_by_lab_test_id(self, lab_test_id):
+        if lab_test_id in MEASUREMENTS:
+            return {"LabTestID": lab_test_id, "MeasurementName": MEASUREMENTS[lab_test_id]}
+
+
+CHECKS = [
+    (ThresholdCheck, {"Nitrate - Nitrogen": {"Information": 1.0, "Warning": 3, "Critical": "10.0"}}),
+    (OutsideRangeCheck, {"pH": {"critical": {"min": 5, "max": 9}, "warning": {"min": "6.5", "max": 7.5}}}),
+]
+
+
+def lab_tests() -> list:
+    rng = random.Random(1)
+    values = ["", "1", "1.0", "3", "6.5", "7.5", "9", "10.0", "10.00001", "4.99"]
+    tests = []
+    for sample_id in range(200):
+        lab_test_id = rng.randint(1, 4)
+        value = rng.choice(values + [f"{rng.uniform(0, 12):.2f}"])
+        labels = []
+        if rng.random() < 0.1:
+            qa_check = QACheck()
+            qa_check.Label = rng.choice(["threshold_check", "outside_range_check"])
+            labels.append(qa_check)
+        tests.append(QACheckLabTest(sample_id, lab_test_id, value, qa_checks=labels))
+    return tests
+
+
+@pytest.mark.parametrize("check_class, config", CHECKS)
+def test_batch_matches_per_test_checks(check_class, config):
+    check = check_class(config, Repository())
+    tests = lab_tests()
+    per_test = [qa_check for test in tests for qa_check in check.perform_checks(7, test) or []]
+    batch = check.perform_checks_batch(7, tests)
+    assert per_test
+    # same checks, in the same order
+    assert [(q.SampleID, q.Title, q.Severity, q.Details) for q in batch] == [
+        (q.SampleID, q.Title, q.Severity, q.Details) for q in per_test
+    ]
+
+
+@pytest.mark.parametrize("check_class, config", CHECKS)
+def test_batch_without_breaches_returns_none(check_class, config):
+    check = check_class(config, Repository())
+    assert check.perform_checks_batch(7, [QACheckLabTest(1, 4, "100"), QACheckLabTest(2, 3, "")]) is None
@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+import pytest
+from HilltopHost.Sampler import QACheckSeverity
+
+from sampler_qa_checks_demo.checks.rules import compile_range_rules, compile_threshold_rules
+
+
+def test_range_rules_most_severe_first():
+    rule_sets = compile_range_rules({
+        "disabled": False,
+        "pH": {"warning": {"min": 6, "max": 8}, "critical": {"min": "4.5", "max": 10}},
+    })
+    assert list(rule_sets) == ["pH"]
+    rules = rule_sets["pH"]
+    assert [rule.name for rule in rules.rules] == ["critical", "warning"]
+    assert rules.get("critical").lower == Decimal("4.5")
+    assert rules.evaluate(Decimal("7")) is None
+    assert rules.evaluate(Decimal("9")).severity == QACheckSeverity.Warning
+    assert rules.evaluate(Decimal("11")).severity == QACheckSeverity.Critical
+    assert [r and r.name for r in rules.evaluate_all([Decimal("5"), Decimal("3")])] == ["warning", "critical"]
+
+
+def test_threshold_rules_are_upper_bounds():
+    rules = compile_threshold_rules({"E. coli": {"Information": 260, "Critical": 550}})["E. coli"]
+    assert [rule.name for rule in rules.rules] == ["Critical", "Information"]
+    assert rules.evaluate(Decimal("-1")) is None
+    assert rules.evaluate(Decimal("300")).severity == QACheckSeverity.Information
+    assert rules.evaluate(Decimal("550.1")).upper_text == 550
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"pH": [6, 8]},
+        {"pH": {"warning": {"min": 6}}},
+        {"pH": {"warning": {"min": 8, "max": 6}}},
+        {"pH": {"warning": {"min": "low", "max": 6}}},
+        {"pH": {"warning": {"min": True, "max": 6}}},
+    ],
+)
+def test_malformed_range_config(config):
+    with pytest.raises(ValueError):
+        compile_range_rules(config)
+
+
+def test_malformed_threshold_config():
+    with pytest.raises(ValueError):
+        compile_threshold_rules({"pH": {"Warning": "high"}})
@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+from sampler_qa_checks_demo.checks.i_check import ICheck
+from sampler_qa_checks_demo.executor import BatchUnit, CheckExecutor
+from sampler_qa_checks_demo.payload_snapshot import TestResult as Result
+from sampler_qa_checks_demo.profiler import CheckCosts
+from sampler_qa_checks_demo.scheduler import CheckBacklog, CheckScheduler, DeferredTest, split_unit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "perf_counter", clock)
+    return clock
+
+
+class TimedCheck(ICheck):
+    """
+    A test check that advances the fake clock by `cost` seconds for every test it is given.
+    """
+
+    def __init__(self, clock, cost):
+        super().__init__({}, None)
+        self.clock = clock
+        self.cost = cost
+        self.checked = []
+
+    def perform_checks_batch(self, run_id, contexts):
+        self.clock.now += self.cost * len(contexts)
+        self.checked.extend(t.SampleID for t in contexts)
+
+
+class CheapCheck(TimedCheck):
+    pass
+
+
+class ExpensiveCheck(TimedCheck):
+    pass
+
+
+def lab_tests(first, count):
+    return [DeferredTest(i, 1, Result("1.0"), frozenset()) for i in range(first, first + count)]
+
+
+def batches(check, contexts, size=50):
+    return [BatchUnit(check, 1, contexts[i:i + size]) for i in range(0, len(contexts), size)]
+
+
+def run_call(clock, path, checks, new_tests, budget, costs):
+    """
+    Performs one time-budgeted call the way the plugin does: the backlog's tests of each check first, then
+    the call's own tests, cheapest check first, saving what doesn't fit back to the backlog.
+    """
+    backlog = CheckBacklog(path, checks)
+    backlog.load()
+    costs.seed(backlog.costs)
+    deferred = {}
+    for check, _, test in backlog.tests():
+        deferred.setdefault(check, []).append(test)
+    pending = {check: batches(check, deferred.get(check, []) + new_tests) for check in checks}
+    scheduler = CheckScheduler(costs, clock.now + budget, repository=None)
+    for _ in CheckExecutor(1, costs=costs).run(scheduler.schedule(pending)):
+        pass
+    return backlog.save(scheduler.deferred, costs)
+
+
+def test_expensive_check_backlog_drains(clock, tmp_path):
+    cheap = CheapCheck(clock, 0.00001)
+    expensive = ExpensiveCheck(clock, 0.001)
+    path = str(tmp_path / "backlog.json")
+    costs = CheckCosts()
+
+    held = run_call(clock, path, [cheap, expensive], lab_tests(0, 500), 0.06, costs)
+    assert held > 0
+    assert len(cheap.checked) == 500  # the cheap check is performed in full first
+
+    for calls in range(1, 12):
+        held = run_call(clock, path, [cheap, expensive], [], 0.06, CheckCosts())
+        if held == 0:
+            break
+    assert held == 0
+    assert calls <= 10
+    assert sorted(expensive.checked) == list(range(500))
+
+
+def test_check_over_budget_is_given_one_lab_test(clock, tmp_path):
+    expensive = ExpensiveCheck(clock, 0.01)
+    costs = CheckCosts()
+    costs.record("ExpensiveCheck", 1.0, 1)  # a cold estimate far above the budget
+    pending = {expensive: batches(expensive, lab_tests(0, 100))}
+    scheduler = CheckScheduler(costs, clock.now + 0.05, repository=None)
+    performed = [len(unit.contexts) for unit in scheduler.schedule(pending)]
+    assert performed == [1]
+    assert sum(len(unit.contexts) for unit in scheduler.deferred) == 99
+
+
+def test_small_budget_caps_the_first_unit(clock, tmp_path):
+    cheap = CheapCheck(clock, 0.001)
+    costs = CheckCosts()
+    costs.record("CheapCheck", 0.001, 1)
+    pending = {cheap: [BatchUnit(cheap, 1, lab_tests(0, 500))]}
+    scheduler = CheckScheduler(costs, clock.now + 0.02, repository=None)
+    for _ in CheckExecutor(1, costs=costs).run(scheduler.schedule(pending)):
+        pass
+    assert len(cheap.checked) == 20
+    assert sum(len(unit.contexts) for unit in scheduler.deferred) == 480
+
+
+def test_check_costs_average_measured_calls():
+    costs = CheckCosts()
+    assert costs.estimate("PercentileCheck") is None
+    costs.record("PercentileCheck", 1.0, 1)  # cold probe
+    costs.record("PercentileCheck", 0.1, 99)
+    assert costs.estimate("PercentileCheck") == pytest.approx(1.1 / 100)
+
+    restored = CheckCosts()
+    restored.seed(costs.export())
+    assert restored.estimate("PercentileCheck") == pytest.approx(costs.estimate("PercentileCheck"))
+
+
+def test_backlog_discards_entries_of_reconfigured_checks(clock, tmp_path):
+    path = str(tmp_path / "backlog.json")
+    check = ExpensiveCheck(clock, 0.01)
+    CheckBacklog(path, [check]).save(batches(check, lab_tests(0, 3)), CheckCosts())
+
+    backlog = CheckBacklog(path, [check])
+    backlog.load()
+    assert [test.SampleID for _, _, test in backlog.tests()] == [0, 1, 2]
+
+    check.config = {"changed": True}
+    backlog = CheckBacklog(path, [check])
+    backlog.load()
+    assert list(backlog.tests()) == []
+
+
+def test_split_unit():
+    check = ExpensiveCheck(Clock(), 0.01)
+    head, rest = split_unit(BatchUnit(check, 1, lab_tests(0, 5)), 2)
+    assert len(head.contexts) == 2 and len(rest.contexts) == 3
+    assert split_unit(BatchUnit(check, 1, lab_tests(0, 5)), 0)[0] is None
+    assert split_unit(BatchUnit(check, 1, lab_tests(0, 5)), 5)[1] is None
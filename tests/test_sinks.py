@@ -0,0 +1,106 @@
+import csv
+import json
+import os
+
+import HilltopHost
+import pytest
+from HilltopHost.Sampler import QACheck, QACheckSeverity
+from payloads import generate_payload
+
+from sampler_qa_checks_demo.sinks import QACheckReport, QACheckSink
+
+
+def qa_check(sample_id, label="Check", title="Title"):
+    check = QACheck()
+    check.RunID = 1
+    check.SampleID = sample_id
+    check.LabTestID = 10
+    check.Label = label
+    check.Title = title
+    check.Severity = QACheckSeverity.Warning
+    check.Details = "details"
+    return check
+
+
+def test_ndjson_report(tmp_path):
+    path = tmp_path / "report.ndjson"
+    sink = QACheckSink(False, flush_size=2, report=QACheckReport(str(path)))
+    sink.add([qa_check(1), qa_check(2), qa_check(1)])
+    sink.add([qa_check(3, title="x" * 200)])
+    sink.close()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["SampleID"] for r in records] == [1, 2, 3]
+    assert records[0]["Severity"] == "Warning"
+    assert len(records[2]["Title"]) == QACheckSink.title_length
+    assert sink.duplicates == 1
+    assert not (tmp_path / "report.ndjson.tmp").exists()
+
+
+def test_csv_report(tmp_path):
+    path = tmp_path / "report.csv"
+    sink = QACheckSink(False, report=QACheckReport(str(path), "csv"))
+    sink.add([qa_check(1), qa_check(2)])
+    sink.close()
+    with open(path, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert [row["SampleID"] for row in rows] == ["1", "2"]
+    assert rows[0]["Label"] == "Check"
+
+
+def test_failed_call_keeps_previous_report(tmp_path):
+    path = tmp_path / "report.ndjson"
+    path.write_text("previous\n")
+    sink = QACheckSink(False, report=QACheckReport(str(path)))
+    sink.add([qa_check(1)])
+    sink.close(complete=False)
+    assert path.read_text() == "previous\n"
+    assert len((tmp_path / "report.ndjson.partial").read_text().splitlines()) == 1
+    assert not (tmp_path / "report.ndjson.tmp").exists()
+
+
+def test_locked_report_is_logged_and_kept_as_partial(tmp_path, monkeypatch):
+    path = tmp_path / "report.ndjson"
+    path.write_text("previous\n")
+    replace = os.replace
+
+    def locked(source, destination):
+        if destination == str(path):
+            raise PermissionError("open in a viewer")
+        replace(source, destination)
+
+    monkeypatch.setattr(os, "replace", locked)
+    HilltopHost.LOG.clear()
+    sink = QACheckSink(False, report=QACheckReport(str(path)))
+    sink.add([qa_check(1)])
+    sink.close()  # doesn't raise
+    assert path.read_text() == "previous\n"
+    assert (tmp_path / "report.ndjson.partial").exists()
+    assert any("not replaced" in message for level, message in HilltopHost.LOG if level == "error")
+
+
+def test_failed_report_write_keeps_previous_report(tmp_path, monkeypatch):
+    path = tmp_path / "report.ndjson"
+    path.write_text("previous\n")
+    report = QACheckReport(str(path))
+
+    def write(qa_checks):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(report, "write", write)
+    sink = QACheckSink(False, report=report)
+    sink.add([qa_check(1)])
+    with pytest.raises(OSError):
+        sink.close()
+    assert path.read_text() == "previous\n"
+    assert (tmp_path / "report.ndjson.partial").exists()
+
+
+def test_plugin_logs_report_errors(run_plugin, tmp_path, monkeypatch):
+    def write(report, qa_checks):
+        raise OSError("disk full")
+
+    path = tmp_path / "report.ndjson"
+    monkeypatch.setattr(QACheckReport, "write", write)
+    run_plugin(generate_payload(1, 2, 5), {"save_qachecks_to_database": False, "dry_run_report": {"path": str(path)}})
+    assert not path.exists()
+    assert any("disk full" in message for level, message in HilltopHost.LOG if level == "error")
@@ -0,0 +1,57 @@
+from HilltopHost import RunStatus
+from HilltopHost.Sampler import QACheckLabTest, QACheckRun, QACheckSample
+
+from sampler_qa_checks_demo.streaming import RunSlice, count_tests, split_windows
+
+
+def sample(sample_id, tests, test_set=0):
+    lab_tests = [QACheckLabTest(sample_id, i) for i in range(tests)]
+    if test_set:
+        lab_tests.append(QACheckLabTest(sample_id, 0, tests=[QACheckLabTest(sample_id, 100 + i) for i in range(test_set)]))
+    return QACheckSample(sample_id, RunStatus.ALL_RESULTS_BACK, "2020-01-01T00:00:00", lab_tests)
+
+
+def run(run_id, samples):
+    return RunSlice(QACheckRun(run_id, f"Run {run_id}", samples), samples, True)
+
+
+def layout(windows):
+    """
+    Returns each window as (RunID, [SampleID], first) for each of its slices.
+    """
+    return [[(s.run.RunID, [x.SampleID for x in s.samples], s.first) for s in window] for window in windows]
+
+
+def test_windows_end_on_sample_boundaries():
+    slices = [run(1, [sample(1, 2), sample(2, 2), sample(3, 2)]), run(2, [sample(4, 2)])]
+    assert layout(split_windows(slices, 4)) == [
+        [(1, [1, 2], True)],
+        [(1, [3], False), (2, [4], True)],
+    ]
+
+
+def test_run_ending_on_a_window_boundary_leaves_no_empty_slice():
+    slices = [run(1, [sample(1, 2), sample(2, 2)]), run(2, [sample(3, 2)])]
+    assert layout(split_windows(slices, 4)) == [[(1, [1, 2], True)], [(2, [3], True)]]
+
+
+def test_sample_larger_than_a_window_is_not_split():
+    slices = [run(1, [sample(1, 1), sample(2, 10), sample(3, 1)])]
+    assert layout(split_windows(slices, 4)) == [[(1, [1, 2], True)], [(1, [3], False)]]
+
+
+def test_test_sets_count_their_tests():
+    big = sample(1, 1, test_set=3)
+    assert count_tests(big) == 4
+    assert layout(split_windows([run(1, [big, sample(2, 1)])], 4)) == [[(1, [1], True)], [(1, [2], False)]]
+
+
+def test_run_without_samples_keeps_its_run_checks():
+    slices = [run(1, []), run(2, [sample(1, 1)])]
+    assert layout(split_windows(slices, 4)) == [[(1, [], True), (2, [1], True)]]
+
+
+def test_later_slice_of_a_run_stays_without_run_checks():
+    first, rest = run(1, [sample(1, 1)]), RunSlice(QACheckRun(1, "Run 1", []), [sample(2, 1)], False)
+    assert layout(split_windows([first, rest], 0)) == [[(1, [1], True), (1, [2], False)]]
+    assert layout(split_windows([], 4)) == []